@@ -0,0 +1,77 @@
+"""add usage rollups
+Revision ID: a3f9c27d5b18
+Revises: d81f0c3a6e52
+Create Date: 2024-09-11 10:12:44.518320
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = 'a3f9c27d5b18'
+down_revision = 'd81f0c3a6e52'
+branch_labels = None
+depends_on = None
+
+TABLE = "usage_rollups"
+
+# Days are counted in UTC, like the rollups written by the app
+DAY = "date(q.created_at AT TIME ZONE 'UTC')"
+
+# The id that each dimension is rolled up by, and the joins needed to reach it
+DIMENSIONS = {
+    "tenant": ("q.tenant_id", ""),
+    "user": ("s.user_id", "JOIN sessions AS s ON s.id = q.session_id"),
+    "assistant": ("s.assistant_id", "JOIN sessions AS s ON s.id = q.session_id"),
+    "completion_model": ("q.completion_model_id", ""),
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        TABLE,
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('tenant_id', sa.UUID(), nullable=False),
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('dimension_id', sa.UUID(), nullable=False),
+        sa.Column('questions', sa.BigInteger(), nullable=False),
+        sa.Column('input_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('output_tokens', sa.BigInteger(), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column(
+            'updated_at',
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('day', 'tenant_id', 'dimension', 'dimension_id'),
+    )
+
+    # Roll up the questions asked so far. Their num_tokens_question holds the
+    # tokens of the whole prompt, which is what the app rolls up as input
+    # tokens too, not only those of the question as it stores now
+    conn = op.get_bind()
+    for dimension, (dimension_id, join) in DIMENSIONS.items():
+        conn.execute(
+            sa.text(
+                f"INSERT INTO {TABLE} (day, tenant_id, dimension, dimension_id, "
+                "questions, input_tokens, output_tokens) "
+                f"SELECT {DAY}, q.tenant_id, :dimension, {dimension_id}, "
+                "count(*), sum(q.num_tokens_question), sum(q.num_tokens_answer) "
+                f"FROM questions AS q {join} "
+                f"WHERE {dimension_id} IS NOT NULL "
+                f"GROUP BY {DAY}, q.tenant_id, {dimension_id}"
+            ),
+            {"dimension": dimension},
+        )
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE)
@@ -0,0 +1,31 @@
+"""add provider batch to jobs
+Revision ID: b5d2e8f41c67
+Revises: e7c3b1a9d4f2
+Create Date: 2024-09-20 14:02:51.118203
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = 'b5d2e8f41c67'
+down_revision = 'e7c3b1a9d4f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('provider_batch_id', sa.String(), nullable=True))
+    op.add_column(
+        'jobs',
+        sa.Column(
+            'provider_batch', postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('jobs', 'provider_batch')
+    op.drop_column('jobs', 'provider_batch_id')
@@ -0,0 +1,38 @@
+"""add text search vector to info blob chunks
+Revision ID: c4e1a7d2b9f3
+Revises: bd5e20893670
+Create Date: 2024-09-02 10:12:44.518203
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = 'c4e1a7d2b9f3'
+down_revision = 'bd5e20893670'
+branch_labels = None
+depends_on = None
+
+TABLE = "info_blob_chunks"
+COLUMN = "text_search_vector"
+INDEX = "ix_info_blob_chunks_text_search_vector"
+
+
+def upgrade() -> None:
+    op.add_column(
+        TABLE,
+        sa.Column(
+            COLUMN,
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', text)", persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(INDEX, TABLE, [COLUMN], unique=False, postgresql_using="gin")
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX, table_name=TABLE, postgresql_using="gin")
+    op.drop_column(TABLE, COLUMN)
@@ -0,0 +1,124 @@
+"""denormalise group, website and embedding model onto info blob chunks
+Revision ID: d81f0c3a6e52
+Revises: c4e1a7d2b9f3
+Create Date: 2024-09-04 14:31:08.204117
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+from instorage.database.vector_index import (
+    INDEX_PREFIX,
+    create_vector_index_statement,
+    drop_vector_index_statement,
+)
+
+# revision identifiers, used by Alembic
+revision = 'd81f0c3a6e52'
+down_revision = 'c4e1a7d2b9f3'
+branch_labels = None
+depends_on = None
+
+TABLE = "info_blob_chunks"
+BATCH_SIZE = 1000
+
+
+def _backfill_in_batches(conn):
+    # Page through info blobs by id, committing each batch so that a large table
+    # is neither locked nor rewritten in one single transaction
+    last_id = None
+    while True:
+        stmt = "SELECT id FROM info_blobs"
+        if last_id is not None:
+            stmt += " WHERE id > :last_id"
+        stmt += " ORDER BY id LIMIT :batch_size"
+
+        ids = conn.execute(
+            sa.text(stmt), {"last_id": last_id, "batch_size": BATCH_SIZE}
+        ).scalars()
+        ids = list(ids)
+
+        if not ids:
+            break
+
+        conn.execute(
+            sa.text(
+                f"UPDATE {TABLE} AS c SET group_id = b.group_id, "
+                "website_id = b.website_id, "
+                "embedding_model_id = b.embedding_model_id "
+                "FROM info_blobs AS b "
+                "WHERE c.info_blob_id = b.id AND b.id = ANY(:ids)"
+            ),
+            {"ids": ids},
+        )
+
+        last_id = ids[-1]
+
+
+def upgrade() -> None:
+    op.add_column(TABLE, sa.Column('group_id', sa.UUID(), nullable=True))
+    op.add_column(TABLE, sa.Column('website_id', sa.UUID(), nullable=True))
+    op.add_column(TABLE, sa.Column('embedding_model_id', sa.UUID(), nullable=True))
+    op.create_foreign_key(
+        None, TABLE, 'groups', ['group_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_foreign_key(
+        None, TABLE, 'websites', ['website_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_foreign_key(
+        None,
+        TABLE,
+        'embedding_models',
+        ['embedding_model_id'],
+        ['id'],
+        ondelete='SET NULL',
+    )
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        _backfill_in_batches(conn)
+
+        for column in ['group_id', 'website_id', 'embedding_model_id']:
+            conn.execute(
+                sa.text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{TABLE}_{column} "
+                    f"ON {TABLE} ({column})"
+                )
+            )
+
+        # One partial HNSW index per embedding model in use
+        dimensions_per_model = conn.execute(
+            sa.text(
+                "SELECT m.id, "
+                f"(SELECT vector_dims(c.embedding) FROM {TABLE} AS c "
+                "WHERE c.embedding_model_id = m.id LIMIT 1) "
+                "FROM embedding_models AS m"
+            )
+        )
+        for embedding_model_id, dimensions in list(dimensions_per_model):
+            if dimensions is not None:
+                conn.execute(
+                    create_vector_index_statement(embedding_model_id, dimensions)
+                )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        index_names = conn.execute(
+            sa.text(
+                "SELECT indexname FROM pg_indexes "
+                "WHERE tablename = :table AND indexname LIKE :prefix"
+            ),
+            {"table": TABLE, "prefix": f"{INDEX_PREFIX}_%"},
+        ).scalars()
+
+        for index_name in list(index_names):
+            conn.execute(drop_vector_index_statement(index_name))
+
+    op.drop_index(op.f('ix_info_blob_chunks_embedding_model_id'), table_name=TABLE)
+    op.drop_index(op.f('ix_info_blob_chunks_website_id'), table_name=TABLE)
+    op.drop_index(op.f('ix_info_blob_chunks_group_id'), table_name=TABLE)
+    op.drop_column(TABLE, 'embedding_model_id')
+    op.drop_column(TABLE, 'website_id')
+    op.drop_column(TABLE, 'group_id')
@@ -0,0 +1,52 @@
+"""null legacy question token counts
+Revision ID: e7c3b1a9d4f2
+Revises: a3f9c27d5b18
+Create Date: 2024-09-18 09:41:27.305916
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = 'e7c3b1a9d4f2'
+down_revision = 'a3f9c27d5b18'
+branch_labels = None
+depends_on = None
+
+TABLE = "questions"
+BATCH_SIZE = 10000
+
+
+def _null_in_batches(conn):
+    # The rows saved so far hold the tokens of the whole prompt, not those of
+    # the question. Without a count, a question is counted when it is sent.
+    # Committed batch by batch, so that the table is not locked in one go
+    while True:
+        result = conn.execute(
+            sa.text(
+                f"UPDATE {TABLE} SET num_tokens_question = NULL "
+                f"WHERE id IN (SELECT id FROM {TABLE} "
+                "WHERE num_tokens_question IS NOT NULL LIMIT :batch_size)"
+            ),
+            {"batch_size": BATCH_SIZE},
+        )
+
+        if result.rowcount < BATCH_SIZE:
+            break
+
+
+def upgrade() -> None:
+    op.alter_column(TABLE, 'num_tokens_question', nullable=True)
+
+    with op.get_context().autocommit_block():
+        _null_in_batches(op.get_bind())
+
+
+def downgrade() -> None:
+    # The counts that were nulled are gone, the history counts them as nothing
+    op.execute(
+        f"UPDATE {TABLE} SET num_tokens_question = 0 "
+        "WHERE num_tokens_question IS NULL"
+    )
+    op.alter_column(TABLE, 'num_tokens_question', nullable=False)
@@ -0,0 +1,60 @@
+"""Compares the token based splitter used by the datastore with the LangChain
+splitter it replaced, which re-encoded every candidate fragment.
+
+Usage: python benchmarks/text_splitter.py path/to/large.pdf [more files ...]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from instorage.ai_models.embedding_models.datastore.datastore import settings
+from instorage.ai_models.embedding_models.datastore.text_splitter import (
+    TokenTextSplitter,
+)
+from instorage.ai_models.tokenizers import TiktokenTokenizer, get_encoding
+from instorage.files.text import TextExtractor
+
+
+def _time(split, text: str) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    chunks = split(text)
+    return time.perf_counter() - start, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+", type=Path)
+    args = parser.parse_args()
+
+    count_tokens = TiktokenTokenizer(get_encoding()).count_tokens
+    langchain_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap,
+        length_function=count_tokens,
+    )
+    token_splitter = TokenTextSplitter(
+        chunk_size=settings.chunk_size, chunk_overlap=settings.chunk_overlap
+    )
+    extractor = TextExtractor()
+
+    for filepath in args.files:
+        text = extractor.extract(filepath)
+        print(f"{filepath.name}: {len(text)} characters, {count_tokens(text)} tokens")
+
+        for name, splitter in [
+            ("langchain", langchain_splitter),
+            ("token", token_splitter),
+        ]:
+            seconds, chunks = _time(splitter.split_text, text)
+            largest = max((count_tokens(chunk) for chunk in chunks), default=0)
+            print(
+                f"  {name:<10} {seconds:8.2f} s  {len(chunks):6} chunks"
+                f"  largest {largest} tokens"
+            )
+
+
+if __name__ == "__main__":
+    main()
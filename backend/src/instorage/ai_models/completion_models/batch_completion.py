@@ -0,0 +1,92 @@
+from enum import Enum
+from typing import Optional, Protocol
+
+from pydantic import BaseModel
+
+from instorage.ai_models.completion_models.completion_model import (
+    CompletionModel,
+    CompletionModelFamily,
+    ModelKwargs,
+)
+from instorage.main.logging import get_logger
+
+logger = get_logger(__name__)
+
+# The families whose providers take requests in batches
+BATCH_MODEL_FAMILIES = {CompletionModelFamily.OPEN_AI, CompletionModelFamily.AZURE}
+
+
+class BatchStatus(str, Enum):
+    IN_PROGRESS = "in progress"
+    COMPLETE = "complete"
+    FAILED = "failed"
+
+
+class BatchRequest(BaseModel):
+    custom_id: str
+    query: list[dict]
+    model_kwargs: Optional[ModelKwargs] = None
+
+
+class BatchResult(BaseModel):
+    custom_id: str
+    completion: Optional[str] = None
+    error: Optional[str] = None
+    # As billed by the provider
+    input_tokens: Optional[int] = None
+
+
+class BatchModelAdapter(Protocol):
+    """Sends completion requests through the batch interface of a provider.
+    Such batches are finished within hours rather than seconds, and have rate
+    limits of their own, apart from those of interactive requests."""
+
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        """Submits the requests as one batch, and returns the id of the batch."""
+        ...
+
+    async def get_status(self, batch_id: str) -> BatchStatus: ...
+
+    async def get_results(self, batch_id: str) -> list[BatchResult]:
+        """The results of what was finished, once the batch is no longer in
+        progress."""
+        ...
+
+
+def supports_batch(model: CompletionModel):
+    return model.family in BATCH_MODEL_FAMILIES
+
+
+async def submit_batch(adapter: BatchModelAdapter, requests: list[BatchRequest]):
+    batch_id = await adapter.submit(requests)
+    logger.info(f"Submitted batch {batch_id} of {len(requests)} requests")
+
+    return batch_id
+
+
+async def collect_batch(
+    adapter: BatchModelAdapter, batch_id: str, custom_ids: list[str]
+) -> Optional[dict[str, BatchResult]]:
+    """Returns a result for every request, by `custom_id`, once the batch is
+    no longer in progress, and None until then. Requests that the batch did not
+    finish, as when it failed or expired, get an error.
+
+    Nothing waits on the batch in between, so that it can be polled for from
+    jobs of their own over the hours it takes."""
+    status = await adapter.get_status(batch_id)
+    if status == BatchStatus.IN_PROGRESS:
+        return None
+
+    logger.info(f"Batch {batch_id} is {status.value}")
+
+    results = {
+        result.custom_id: result for result in await adapter.get_results(batch_id)
+    }
+    for custom_id in custom_ids:
+        if custom_id not in results:
+            results[custom_id] = BatchResult(
+                custom_id=custom_id,
+                error=f"Not completed, the batch is {status.value}.",
+            )
+
+    return results
@@ -0,0 +1,20 @@
+import asyncio
+
+from instorage.ai_models.completion_models.completion_model import (
+    CompletionModel,
+    CompletionModelFamily,
+)
+from instorage.main.config import get_settings
+
+_limiters: dict[CompletionModelFamily, asyncio.Semaphore] = {}
+
+
+def get_completion_limiter(model: CompletionModel) -> asyncio.Semaphore:
+    # Shared per provider, so that all batches in a process together keep
+    # within the number of requests the provider is given at a time
+    if model.family not in _limiters:
+        _limiters[model.family] = asyncio.Semaphore(
+            get_settings().completion_max_in_flight_requests
+        )
+
+    return _limiters[model.family]
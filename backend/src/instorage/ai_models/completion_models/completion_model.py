@@ -79,18 +79,22 @@ class CompletionModelResponse(BaseModel):
     model: CompletionModel
     extended_logging: Optional[LoggingDetails] = None
     total_token_count: int
+    input_token_count: int
 
 
 class Message(BaseModel):
     question: str
     answer: str
     images: list[File] = []
+    num_tokens: Optional[int] = None
 
 
 class Context(BaseModel):
     input: str
     prompt: str = ""
     token_count: Optional[int] = None
+    input_token_count: Optional[int] = None
+    prompt_token_count: Optional[int] = None
     messages: list[Message] = []
     images: list[File] = []
 
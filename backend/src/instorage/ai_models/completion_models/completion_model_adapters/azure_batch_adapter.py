@@ -0,0 +1,22 @@
+from openai import AsyncAzureOpenAI
+
+from instorage.ai_models.completion_models.completion_model import CompletionModel
+from instorage.ai_models.completion_models.completion_model_adapters.openai_batch_adapter import (
+    OpenAIBatchModelAdapter,
+)
+from instorage.main.http_clients import http_clients
+
+
+class AzureOpenAIBatchModelAdapter(OpenAIBatchModelAdapter):
+    endpoint = "/chat/completions"
+
+    def __init__(
+        self,
+        model: CompletionModel,
+    ):
+        self.model = model
+        self.client: AsyncAzureOpenAI = http_clients.azure()
+
+    @property
+    def model_name(self):
+        return self.model.deployment_name
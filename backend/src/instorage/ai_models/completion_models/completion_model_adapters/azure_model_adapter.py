@@ -9,7 +9,7 @@ from instorage.ai_models.completion_models.completion_model import (
 from instorage.ai_models.completion_models.completion_model_adapters.openai_model_adapter import (
     OpenAIModelAdapter,
 )
-from instorage.main.config import get_settings
+from instorage.main.http_clients import http_clients
 
 
 class AzureOpenAIModelAdapter(OpenAIModelAdapter):
@@ -18,18 +18,15 @@ class AzureOpenAIModelAdapter(OpenAIModelAdapter):
         model: CompletionModel,
     ):
         self.model = model
-        self.client: AsyncAzureOpenAI = AsyncAzureOpenAI(
-            api_key=get_settings().azure_api_key,
-            azure_endpoint=get_settings().azure_endpoint,
-            api_version=get_settings().azure_api_version,
-        )
+        self.client: AsyncAzureOpenAI = http_clients.azure()
 
     async def get_response(
         self,
         context: Context,
         model_kwargs: ModelKwargs | None = None,
+        query: list[dict] | None = None,
     ):
-        query = self.create_query_from_context(context=context)
+        query = self._get_query(context, query)
         return await get_response_open_ai.get_response(
             client=self.client,
             model_name=self.model.deployment_name,
@@ -41,8 +38,9 @@ class AzureOpenAIModelAdapter(OpenAIModelAdapter):
         self,
         context: Context,
         model_kwargs: ModelKwargs | None = None,
+        query: list[dict] | None = None,
     ):
-        query = self.create_query_from_context(context=context)
+        query = self._get_query(context, query)
         return get_response_open_ai.get_response_streaming(
             client=self.client,
             model_name=self.model.deployment_name,
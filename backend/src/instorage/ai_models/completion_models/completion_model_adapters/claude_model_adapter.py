@@ -1,4 +1,5 @@
 import base64
+from typing import Optional
 
 from anthropic import AsyncAnthropic
 
@@ -9,7 +10,7 @@ from instorage.ai_models.completion_models.completion_model import (
     ModelKwargs,
 )
 from instorage.files.file_models import File
-from instorage.main.config import get_settings
+from instorage.main.http_clients import http_clients
 from instorage.main.logging import get_logger
 
 logger = get_logger(__name__)
@@ -21,12 +22,12 @@ class ClaudeModelAdapter:
     def __init__(
         self,
         model: CompletionModel,
-        async_client: AsyncAnthropic = AsyncAnthropic(
-            api_key=get_settings().anthropic_api_key
-        ),
+        async_client: Optional[AsyncAnthropic] = None,
     ):
         self.model = model
-        self.async_client = async_client
+        self.async_client = (
+            async_client if async_client is not None else http_clients.anthropic()
+        )
 
     def _get_kwargs(self, kwargs: ModelKwargs | None):
         if kwargs is None:
@@ -53,6 +54,12 @@ class ClaudeModelAdapter:
             },
         }
 
+    def _get_query(self, context: Context, query: list[dict] | None = None):
+        if query is None:
+            return self.create_query_from_context(context=context)
+
+        return query
+
     def _build_content(
         self,
         input: str,
@@ -101,8 +108,9 @@ class ClaudeModelAdapter:
         self,
         context: Context,
         model_kwargs: ModelKwargs | None = None,
+        query: list[dict] | None = None,
     ):
-        query = self.create_query_from_context(context=context)
+        query = self._get_query(context, query)
         return await get_response_claude.get_response(
             client=self.async_client,
             max_tokens=MAX_TOKENS,
@@ -116,8 +124,9 @@ class ClaudeModelAdapter:
         self,
         context: Context,
         model_kwargs: ModelKwargs | None = None,
+        query: list[dict] | None = None,
     ):
-        query = self.create_query_from_context(context=context)
+        query = self._get_query(context, query)
         return get_response_claude.get_response_streaming(
             client=self.async_client,
             max_tokens=MAX_TOKENS,
@@ -0,0 +1,120 @@
+import json
+from typing import Optional
+
+from openai import AsyncOpenAI
+
+from instorage.ai_models.completion_models.batch_completion import (
+    BatchRequest,
+    BatchResult,
+    BatchStatus,
+)
+from instorage.ai_models.completion_models.completion_model import (
+    CompletionModel,
+    ModelKwargs,
+)
+from instorage.main.config import get_settings
+from instorage.main.http_clients import http_clients
+
+IN_PROGRESS = {"validating", "in_progress", "finalizing", "cancelling"}
+COMPLETE = {"completed", "expired"}
+
+
+class OpenAIBatchModelAdapter:
+    endpoint = "/v1/chat/completions"
+
+    def __init__(
+        self,
+        model: CompletionModel,
+        client: Optional[AsyncOpenAI] = None,
+    ):
+        self.model = model
+        self.client = client if client is not None else http_clients.openai()
+
+    @property
+    def model_name(self):
+        return self.model.name
+
+    def _get_kwargs(self, kwargs: ModelKwargs | None):
+        if kwargs is None:
+            return {}
+
+        return kwargs.model_dump(exclude_none=True)
+
+    def _to_line(self, request: BatchRequest):
+        return json.dumps(
+            {
+                "custom_id": request.custom_id,
+                "method": "POST",
+                "url": self.endpoint,
+                "body": {
+                    "model": self.model_name,
+                    "messages": request.query,
+                    **self._get_kwargs(request.model_kwargs),
+                },
+            }
+        )
+
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        content = "\n".join(self._to_line(request) for request in requests)
+        input_file = await self.client.files.create(
+            file=("requests.jsonl", content.encode("utf-8")), purpose="batch"
+        )
+
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=self.endpoint,
+            completion_window=get_settings().completion_batch_window,
+        )
+
+        return batch.id
+
+    async def get_status(self, batch_id: str) -> BatchStatus:
+        batch = await self.client.batches.retrieve(batch_id)
+
+        if batch.status in IN_PROGRESS:
+            return BatchStatus.IN_PROGRESS
+        elif batch.status in COMPLETE:
+            return BatchStatus.COMPLETE
+
+        return BatchStatus.FAILED
+
+    @staticmethod
+    def _to_result(line: str):
+        data = json.loads(line)
+        custom_id = data["custom_id"]
+
+        if data.get("error"):
+            return BatchResult(custom_id=custom_id, error=data["error"]["message"])
+
+        response = data["response"]
+        if response["status_code"] != 200:
+            error = response["body"].get("error") or {}
+            return BatchResult(
+                custom_id=custom_id,
+                error=error.get("message", f"Status {response['status_code']}"),
+            )
+
+        body = response["body"]
+        completion = body["choices"][0]["message"]["content"]
+        usage = body.get("usage") or {}
+        return BatchResult(
+            custom_id=custom_id,
+            completion=completion.strip(),
+            input_tokens=usage.get("prompt_tokens"),
+        )
+
+    async def _read_results(self, file_id: Optional[str]):
+        if file_id is None:
+            return []
+
+        content = await self.client.files.content(file_id)
+
+        return [self._to_result(line) for line in content.text.splitlines() if line]
+
+    async def get_results(self, batch_id: str) -> list[BatchResult]:
+        batch = await self.client.batches.retrieve(batch_id)
+
+        # Failed requests are in a file of their own
+        return await self._read_results(batch.output_file_id) + (
+            await self._read_results(batch.error_file_id)
+        )
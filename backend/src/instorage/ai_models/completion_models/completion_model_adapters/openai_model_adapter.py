@@ -1,5 +1,6 @@
 import base64
 import json
+from typing import Optional
 
 from openai import AsyncOpenAI
 
@@ -11,7 +12,7 @@ from instorage.ai_models.completion_models.completion_model import (
 )
 from instorage.files.file_models import File
 from instorage.logging.logging import LoggingDetails
-from instorage.main.config import get_settings
+from instorage.main.http_clients import http_clients
 from instorage.main.logging import get_logger
 
 logger = get_logger(__name__)
@@ -24,10 +25,10 @@ class OpenAIModelAdapter:
     def __init__(
         self,
         model: CompletionModel,
-        client: AsyncOpenAI = AsyncOpenAI(api_key=get_settings().openai_api_key),
+        client: Optional[AsyncOpenAI] = None,
     ):
         self.model = model
-        self.client = client
+        self.client = client if client is not None else http_clients.openai()
 
     def _get_kwargs(self, kwargs: ModelKwargs | None):
         if kwargs is None:
@@ -38,8 +39,13 @@ class OpenAIModelAdapter:
     def get_token_limit_of_model(self):
         return self.model.token_limit - TOKENS_RESERVED_FOR_COMPLETION
 
-    def get_logging_details(self, context: Context, model_kwargs: ModelKwargs):
-        query = self.create_query_from_context(context=context)
+    def get_logging_details(
+        self,
+        context: Context,
+        model_kwargs: ModelKwargs,
+        query: list[dict] | None = None,
+    ):
+        query = self._get_query(context, query)
         return LoggingDetails(
             json_body=json.dumps(query), model_kwargs=self._get_kwargs(model_kwargs)
         )
@@ -52,6 +58,12 @@ class OpenAIModelAdapter:
             "image_url": {"url": f"data:{file.mimetype};base64,{image_data}"},
         }
 
+    def _get_query(self, context: Context, query: list[dict] | None = None):
+        if query is None:
+            return self.create_query_from_context(context=context)
+
+        return query
+
     def _build_content(
         self,
         input: str,
@@ -102,8 +114,9 @@ class OpenAIModelAdapter:
         self,
         context: Context,
         model_kwargs: ModelKwargs | None = None,
+        query: list[dict] | None = None,
     ):
-        query = self.create_query_from_context(context=context)
+        query = self._get_query(context, query)
         return await get_response_open_ai.get_response(
             client=self.client,
             model_name=self.model.name,
@@ -115,8 +128,9 @@ class OpenAIModelAdapter:
         self,
         context: Context,
         model_kwargs: ModelKwargs | None = None,
+        query: list[dict] | None = None,
     ):
-        query = self.create_query_from_context(context=context)
+        query = self._get_query(context, query)
         return get_response_open_ai.get_response_streaming(
             client=self.client,
             model_name=self.model.name,
@@ -1,4 +1,5 @@
 import json
+from typing import Optional
 
 import jinja2
 from openai import AsyncOpenAI
@@ -13,7 +14,7 @@ from instorage.ai_models.completion_models.completion_model_adapters.openai_mode
 )
 from instorage.logging.logging import LoggingDetails
 from instorage.logging.logging_templates import LLAMA_TEMPLATE
-from instorage.main.config import get_settings
+from instorage.main.http_clients import http_clients
 
 JINJA_TEMPLATE = jinja2.Environment().from_string(LLAMA_TEMPLATE)
 
@@ -22,12 +23,10 @@ class VLMMModelAdapter(OpenAIModelAdapter):
     def __init__(
         self,
         model: CompletionModel,
-        client: AsyncOpenAI = AsyncOpenAI(
-            api_key="EMPTY", base_url=get_settings().vllm_model_url
-        ),
+        client: Optional[AsyncOpenAI] = None,
     ):
         self.model = model
-        self.client = client
+        self.client = client if client is not None else http_clients.vllm()
 
     def get_token_limit_of_model(self):
         return self.model.token_limit
@@ -36,8 +35,9 @@ class VLMMModelAdapter(OpenAIModelAdapter):
         self,
         context: Context,
         model_kwargs: ModelKwargs | None = None,
+        query: list[dict] | None = None,
     ):
-        query = self.create_query_from_context(context=context)
+        query = self._get_query(context, query)
         messages = {"messages": query}
         context = JINJA_TEMPLATE.render(messages)
 
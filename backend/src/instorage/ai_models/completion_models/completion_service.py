@@ -1,7 +1,6 @@
 from typing import Optional
 
-import tiktoken
-
+from instorage.ai_models.completion_models.batch_completion import BatchRequest
 from instorage.ai_models.completion_models.completion_model import (
     CompletionModel,
     CompletionModelResponse,
@@ -16,11 +15,14 @@ from instorage.ai_models.completion_models.completion_model_adapters.openai_mode
     OpenAIModelAdapter,
 )
 from instorage.ai_models.completion_models.context_builder import ContextBuilder
+from instorage.ai_models.tokenizers import (
+    Tokenizer,
+    get_tokenizer_for_completion_model,
+)
 from instorage.files.file_models import File, FileType
 from instorage.info_blobs.info_blob import InfoBlobChunkInDBWithScore
 from instorage.main.exceptions import BadRequestException, QueryException
 from instorage.main.logging import get_logger
-from instorage.questions.question import Question
 from instorage.sessions.session import SessionInDB
 from instorage.users.user import UserInDB
 from instorage.users.user_service import UserService
@@ -31,11 +33,6 @@ logger = get_logger(__name__)
 CONTEXT_SIZE_BUFFER = 300  # Counting tokens is not an exakt science, leave some buffer
 
 
-def count_tokens(text: str):
-    encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
-
-
 class CompletionService:
     def __init__(
         self,
@@ -49,21 +46,46 @@ class CompletionService:
         self.user = user
         self.context_builder = context_builder
 
-    def _get_max_tokens(self):
+    def get_max_tokens(self):
         return self.model_adapter.get_token_limit_of_model() - CONTEXT_SIZE_BUFFER
 
+    @property
+    def tokenizer(self) -> Tokenizer:
+        return get_tokenizer_for_completion_model(self.model_adapter.model)
+
+    def count_tokens(self, text: str) -> int:
+        return self.tokenizer.count_tokens(text)
+
     def _count_tokens_of_context(self, context: Context):
-        prompt_len = count_tokens(context.prompt)
-        input_question_len = count_tokens(context.input)
+        if context.prompt_token_count is not None:
+            return context.prompt_token_count + context.input_token_count
+
+        prompt_len, input_question_len = self.tokenizer.count_tokens_batch(
+            [context.prompt, context.input]
+        )
+        context.input_token_count = input_question_len
 
         return prompt_len + input_question_len
 
-    def _count_tokens_of_previous_messages(self, previous_messages: list[Question]):
-        return sum(
-            count_tokens(text)
-            for message in previous_messages
-            for text in [message.question, message.answer]
+    def _count_tokens_of_messages(self, messages: list[Message]) -> list[int]:
+        # Counts saved with the questions are reused, only the rest are tokenised
+        uncounted = [message for message in messages if message.num_tokens is None]
+        counts = iter(
+            self.tokenizer.count_tokens_batch(
+                [
+                    text
+                    for message in uncounted
+                    for text in [message.question, message.answer]
+                ]
+            )
         )
+        for message in uncounted:
+            message.num_tokens = next(counts) + next(counts)
+
+        return [message.num_tokens for message in messages]
+
+    def _count_tokens_of_previous_messages(self, previous_messages: list[Message]):
+        return sum(self._count_tokens_of_messages(previous_messages))
 
     def get_number_of_questions(
         self, max_tokens: int, question_counts: list[int], start_count: int = 0
@@ -113,6 +135,7 @@ class CompletionService:
             session=session,
             info_blob_chunks=info_blobs_chunks,
             hallucination_guard=hallucination_guard,
+            tokenizer=self.tokenizer,
         )
 
         token_count = self._count_tokens_of_context(context)
@@ -125,29 +148,24 @@ class CompletionService:
         return context
 
     def get_messages(self, messages: list[Message], token_count: int, max_tokens: int):
-        question_counts = [
-            count_tokens(message.question) + count_tokens(message.answer)
-            for message in messages
-        ]
+        question_counts = self._count_tokens_of_messages(messages)
         num_questions = self.get_number_of_questions(
             max_tokens, question_counts, start_count=token_count
         )
 
         return messages[-num_questions:]
 
-    async def get_response(
+    async def _prepare_query(
         self,
         question: str,
-        model_kwargs: ModelKwargs | None = None,
         files: list[File] = [],
         prompt: str = "",
         info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
         session: SessionInDB | None = None,
-        stream: bool = False,
-        extended_logging: bool = False,
+        record_usage: bool = True,
     ):
         # Make sure everything fits in the context of the model
-        max_tokens = self._get_max_tokens()
+        max_tokens = self.get_max_tokens()
         context = self.get_context(
             max_tokens,
             question,
@@ -163,16 +181,70 @@ class CompletionService:
         )
 
         # Update token count
-        # TODO: Remove this when we save tokens on a question level
         total_token_count = (
             context.token_count
             + self._count_tokens_of_previous_messages(context.messages)
         )
-        await self.user_service.update_used_tokens(self.user.id, total_token_count)
+        if record_usage:
+            await self.user_service.update_used_tokens_in_background(
+                self.user.id, total_token_count
+            )
+
+        # Built once, for the model and for the logging alike
+        query = self.model_adapter.create_query_from_context(context=context)
+
+        return context, query, total_token_count
+
+    async def get_batch_request(
+        self,
+        custom_id: str,
+        question: str,
+        model_kwargs: ModelKwargs | None = None,
+        files: list[File] = [],
+        prompt: str = "",
+        info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
+    ):
+        """Builds the request that `get_response` would send, to be sent with
+        others through the provider's batch interface instead.
+
+        No usage is recorded, as the provider may not complete the request.
+        That is left to the results of the batch."""
+        context, query, total_token_count = await self._prepare_query(
+            question,
+            files=files,
+            prompt=prompt,
+            info_blob_chunks=info_blob_chunks,
+            record_usage=False,
+        )
+
+        request = BatchRequest(
+            custom_id=custom_id, query=query, model_kwargs=model_kwargs
+        )
+
+        return request, context.input_token_count, total_token_count
+
+    async def get_response(
+        self,
+        question: str,
+        model_kwargs: ModelKwargs | None = None,
+        files: list[File] = [],
+        prompt: str = "",
+        info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
+        session: SessionInDB | None = None,
+        stream: bool = False,
+        extended_logging: bool = False,
+    ):
+        context, query, total_token_count = await self._prepare_query(
+            question,
+            files=files,
+            prompt=prompt,
+            info_blob_chunks=info_blob_chunks,
+            session=session,
+        )
 
         if extended_logging:
             logging_details = self.model_adapter.get_logging_details(
-                context=context, model_kwargs=model_kwargs
+                context=context, model_kwargs=model_kwargs, query=query
             )
         else:
             logging_details = None
@@ -181,12 +253,14 @@ class CompletionService:
             completion = await self.model_adapter.get_response(
                 context=context,
                 model_kwargs=model_kwargs,
+                query=query,
             )
         else:
             # Will be an async generator - not awaitable
             completion = self.model_adapter.get_response_streaming(
                 context=context,
                 model_kwargs=model_kwargs,
+                query=query,
             )
 
         return CompletionModelResponse(
@@ -194,4 +268,5 @@ class CompletionService:
             model=self.model_adapter.model,
             extended_logging=logging_details,
             total_token_count=total_token_count,
+            input_token_count=context.input_token_count,
         )
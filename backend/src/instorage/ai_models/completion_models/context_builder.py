@@ -5,33 +5,36 @@ from instorage.ai_models.completion_models.guardrails import (
     FAIRNESS_GUARD,
     HALLUCINATION_GUARD,
 )
+from instorage.ai_models.completion_models.token_count_cache import token_count_cache
+from instorage.ai_models.tokenizers import Tokenizer
 from instorage.files.file_models import File, FileType
 from instorage.info_blobs.info_blob import InfoBlobChunkInDBWithScore
+from instorage.questions.question import Question
 from instorage.sessions.session import SessionInDB
 
 
+FILES_HEADER = (
+    "Below are files uploaded by the user. "
+    "You should act like you can see the files themselves:"
+)
+
+
 class ContextBuilder:
 
     @staticmethod
-    def _build_input(input: str, files: list[File]):
+    def _build_file(file: File):
+        return f'{{"filename": "{file.name}", "text": "{file.text}"}}'
+
+    def _build_input(self, input: str, files: list[File]):
         if files:
-            files_string = "\n".join(
-                f'{{"filename": "{file.name}", "text": "{file.text}"}}'
-                for file in files
-            )
-            input = (
-                "Below are files uploaded by the user. "
-                "You should act like you can see the files themselves:"
-                f"\n\n{files_string}"
-                f"\n\n{input}"
-            )
+            files_string = "\n".join(self._build_file(file) for file in files)
+            input = f"{FILES_HEADER}\n\n{files_string}\n\n{input}"
 
         return input.strip()
 
     @staticmethod
-    def _build_prompt(
+    def _build_prompt_prefix(
         prompt: str = "",
-        info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
         fairness_guard: bool = False,
         hallucination_guard: bool = False,
     ):
@@ -44,16 +47,75 @@ class ContextBuilder:
         if hallucination_guard:
             prompt = f"{prompt}{HALLUCINATION_GUARD}\n\n"
 
+        return prompt
+
+    @staticmethod
+    def _build_chunk(chunk: InfoBlobChunkInDBWithScore):
+        return f'"""{chunk.text}"""'
+
+    def _build_prompt(
+        self,
+        prompt: str = "",
+        info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
+        fairness_guard: bool = False,
+        hallucination_guard: bool = False,
+    ):
+        prompt = self._build_prompt_prefix(
+            prompt=prompt,
+            fairness_guard=fairness_guard,
+            hallucination_guard=hallucination_guard,
+        )
+
         if info_blob_chunks:
-            chunks = "\n".join(f'"""{chunk.text}"""' for chunk in info_blob_chunks)
+            chunks = "\n".join(self._build_chunk(chunk) for chunk in info_blob_chunks)
             prompt = f"{prompt}{chunks}"
 
         return prompt.strip()
 
+    def _count_tokens_of_prompt(
+        self,
+        tokenizer: Tokenizer,
+        prompt: str = "",
+        info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
+        fairness_guard: bool = False,
+        hallucination_guard: bool = False,
+    ):
+        # The prompt with its guards is the same for every question to the
+        # assistant, and a follow-up often gets the same chunks again, so they
+        # are counted one by one and the counts cached
+        prefix = self._build_prompt_prefix(
+            prompt=prompt,
+            fairness_guard=fairness_guard,
+            hallucination_guard=hallucination_guard,
+        ).strip()
+        parts = [prefix] if prefix else []
+        parts.extend(self._build_chunk(chunk) for chunk in info_blob_chunks)
+
+        return sum(token_count_cache.count_tokens_batch(tokenizer, parts))
+
+    def _count_tokens_of_input(
+        self, tokenizer: Tokenizer, input: str, files: list[File] = []
+    ):
+        parts = [FILES_HEADER] if files else []
+        parts.extend(self._build_file(file) for file in files)
+
+        return sum(
+            token_count_cache.count_tokens_batch(tokenizer, parts)
+        ) + tokenizer.count_tokens(input.strip())
+
     @staticmethod
     def _get_files_by_type(files: list[File], file_type: FileType):
         return [file for file in files if file.file_type == file_type]
 
+    @staticmethod
+    def _get_num_tokens(question: Question) -> Optional[int]:
+        # Chain breaker answers are saved without a model and without counts,
+        # older questions without the count of the question alone
+        if question.completion_model_id is None or question.num_tokens_question is None:
+            return None
+
+        return question.num_tokens_question + question.num_tokens_answer
+
     def _build_messages(self, session: Optional[SessionInDB]):
         if session is None:
             return []
@@ -66,6 +128,7 @@ class ContextBuilder:
                 ),
                 answer=message.answer,
                 images=self._get_files_by_type(message.files, FileType.IMAGE),
+                num_tokens=self._get_num_tokens(message),
             )
             for message in session.questions
         ]
@@ -79,21 +142,34 @@ class ContextBuilder:
         fairness_guard: bool = False,
         hallucination_guard: bool = False,
         session: Optional[SessionInDB] = None,
+        tokenizer: Optional[Tokenizer] = None,
     ):
-        input = self._build_input(
-            input=input, files=self._get_files_by_type(files, FileType.TEXT)
-        )
-        prompt = self._build_prompt(
-            prompt=prompt,
-            info_blob_chunks=info_blob_chunks,
-            fairness_guard=fairness_guard,
-            hallucination_guard=hallucination_guard,
-        )
-        messages = self._build_messages(session=session)
-
-        return Context(
-            input=input,
-            prompt=prompt,
-            messages=messages,
+        """With a `tokenizer`, the prompt and the input are counted as well, part
+        by part. The parts may add up to a token or so more or less than the
+        whole."""
+        text_files = self._get_files_by_type(files, FileType.TEXT)
+        context = Context(
+            input=self._build_input(input=input, files=text_files),
+            prompt=self._build_prompt(
+                prompt=prompt,
+                info_blob_chunks=info_blob_chunks,
+                fairness_guard=fairness_guard,
+                hallucination_guard=hallucination_guard,
+            ),
+            messages=self._build_messages(session=session),
             images=self._get_files_by_type(files, FileType.IMAGE),
         )
+
+        if tokenizer is not None:
+            context.prompt_token_count = self._count_tokens_of_prompt(
+                tokenizer,
+                prompt=prompt,
+                info_blob_chunks=info_blob_chunks,
+                fairness_guard=fairness_guard,
+                hallucination_guard=hallucination_guard,
+            )
+            context.input_token_count = self._count_tokens_of_input(
+                tokenizer, input=input, files=text_files
+            )
+
+        return context
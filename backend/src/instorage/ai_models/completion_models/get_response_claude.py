@@ -4,26 +4,17 @@
 
 import anthropic
 from anthropic import AsyncAnthropic
-from tenacity import (
-    retry,
-    retry_if_not_exception_type,
-    stop_after_attempt,
-    wait_random_exponential,
-)
 
+from instorage.ai_models.completion_models.provider_resilience import (
+    provider_resilience,
+)
 from instorage.main.exceptions import BadRequestException, ClaudeException
 from instorage.main.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-@retry(
-    wait=wait_random_exponential(min=1, max=20),
-    stop=stop_after_attempt(3),
-    retry=retry_if_not_exception_type(BadRequestException),
-    reraise=True,
-)
-async def get_response(
+async def _get_response(
     client: AsyncAnthropic,
     model_name: str,
     prompt: str,
@@ -53,13 +44,7 @@ async def get_response(
         raise ClaudeException("Unknown Claude AI exception") from exc
 
 
-@retry(
-    wait=wait_random_exponential(min=1, max=20),
-    stop=stop_after_attempt(3),
-    retry=retry_if_not_exception_type(BadRequestException),
-    reraise=True,
-)
-async def get_response_streaming(
+async def _get_response_streaming(
     client: AsyncAnthropic,
     model_name: str,
     prompt: str,
@@ -92,3 +77,53 @@ async def get_response_streaming(
     except Exception as exc:
         logger.exception("Unknown error:")
         raise ClaudeException("Unknown Claude AI exception") from exc
+
+
+async def get_response(
+    client: AsyncAnthropic,
+    model_name: str,
+    prompt: str,
+    messages: list,
+    model_kwargs: dict,
+    max_tokens: int,
+):
+    # Retries are made by the resilience layer alone
+    client = client.with_options(max_retries=0)
+
+    return await provider_resilience.call(
+        str(client.base_url),
+        model_name,
+        lambda model_name: _get_response(
+            client,
+            model_name,
+            prompt=prompt,
+            messages=messages,
+            model_kwargs=model_kwargs,
+            max_tokens=max_tokens,
+        ),
+    )
+
+
+def get_response_streaming(
+    client: AsyncAnthropic,
+    model_name: str,
+    prompt: str,
+    messages: list,
+    model_kwargs: dict,
+    max_tokens: int,
+):
+    # Retries are made by the resilience layer alone
+    client = client.with_options(max_retries=0)
+
+    return provider_resilience.stream(
+        str(client.base_url),
+        model_name,
+        lambda model_name: _get_response_streaming(
+            client,
+            model_name,
+            prompt=prompt,
+            messages=messages,
+            model_kwargs=model_kwargs,
+            max_tokens=max_tokens,
+        ),
+    )
@@ -1,25 +1,16 @@
 import openai
 from openai import AsyncOpenAI
-from tenacity import (
-    retry,
-    retry_if_not_exception_type,
-    stop_after_attempt,
-    wait_random_exponential,
-)
 
+from instorage.ai_models.completion_models.provider_resilience import (
+    provider_resilience,
+)
 from instorage.main.exceptions import BadRequestException, OpenAIException
 from instorage.main.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-@retry(
-    wait=wait_random_exponential(min=1, max=20),
-    stop=stop_after_attempt(3),
-    retry=retry_if_not_exception_type(BadRequestException),
-    reraise=True,
-)
-async def get_response(
+async def _get_response(
     client: AsyncOpenAI, model_name: str, messages: list, model_kwargs: dict
 ):
     try:
@@ -39,13 +30,7 @@ async def get_response(
         raise OpenAIException("Unknown Open AI exception") from exc
 
 
-@retry(
-    wait=wait_random_exponential(min=1, max=20),
-    stop=stop_after_attempt(3),
-    retry=retry_if_not_exception_type(BadRequestException),
-    reraise=True,
-)
-async def get_response_streaming(
+async def _get_response_streaming(
     client: AsyncOpenAI, model_name: str, messages: list, model_kwargs: dict
 ):
     try:
@@ -70,3 +55,33 @@ async def get_response_streaming(
     except Exception as exc:
         logger.exception("Unknown error:")
         raise OpenAIException("Unknown Open AI exception") from exc
+
+
+async def get_response(
+    client: AsyncOpenAI, model_name: str, messages: list, model_kwargs: dict
+):
+    # Retries are made by the resilience layer alone
+    client = client.with_options(max_retries=0)
+
+    return await provider_resilience.call(
+        str(client.base_url),
+        model_name,
+        lambda model_name: _get_response(
+            client, model_name, messages=messages, model_kwargs=model_kwargs
+        ),
+    )
+
+
+def get_response_streaming(
+    client: AsyncOpenAI, model_name: str, messages: list, model_kwargs: dict
+):
+    # Retries are made by the resilience layer alone
+    client = client.with_options(max_retries=0)
+
+    return provider_resilience.stream(
+        str(client.base_url),
+        model_name,
+        lambda model_name: _get_response_streaming(
+            client, model_name, messages=messages, model_kwargs=model_kwargs
+        ),
+    )
@@ -0,0 +1,387 @@
+import asyncio
+import random
+import time
+from collections import deque
+from enum import Enum
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from instorage.main.config import get_settings
+from instorage.main.exceptions import (
+    BadRequestException,
+    ProviderUnavailableException,
+)
+from instorage.main.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+MIN_BACKOFF = 0.5
+MAX_BACKOFF = 8
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half open"
+
+
+class HealthStats(BaseModel):
+    state: CircuitState
+    requests: int
+    error_rate: float
+    p95_latency: Optional[float] = None
+    hedged: int
+
+
+class ProviderHealth:
+    """The rolling error rate and latency of one model of one provider, over
+    the last `window` seconds, and the circuit that they open.
+
+    Once `min_requests` were made in the window and at least `error_threshold`
+    of them failed, the circuit opens and requests fail fast. After `cooldown`
+    seconds a single trial request is let through, which closes the circuit
+    again if it succeeds."""
+
+    def __init__(
+        self,
+        window: float,
+        min_requests: int,
+        error_threshold: float,
+        cooldown: float,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.timer = timer
+
+        # (at, succeeded, latency)
+        self._outcomes: deque[tuple[float, bool, float]] = deque()
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._trial_started_at: Optional[float] = None
+        self.hedged = 0
+
+    @property
+    def state(self):
+        if (
+            self._state == CircuitState.OPEN
+            and self.timer() - self._opened_at >= self.cooldown
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._trial_started_at = None
+
+        return self._state
+
+    def _prune(self):
+        oldest = self.timer() - self.window
+        while self._outcomes and self._outcomes[0][0] < oldest:
+            self._outcomes.popleft()
+
+    def allows_request(self):
+        state = self.state
+
+        if state == CircuitState.OPEN:
+            return False
+
+        if state == CircuitState.HALF_OPEN:
+            # A trial that never came back, as when it was cancelled, does
+            # not keep the circuit from closing
+            if (
+                self._trial_started_at is not None
+                and self.timer() - self._trial_started_at < self.cooldown
+            ):
+                return False
+            self._trial_started_at = self.timer()
+
+        return True
+
+    def _open(self):
+        self._state = CircuitState.OPEN
+        self._opened_at = self.timer()
+
+    def record(self, succeeded: bool, latency: float = 0.0):
+        self._prune()
+        self._outcomes.append((self.timer(), succeeded, latency))
+
+        if self._state == CircuitState.HALF_OPEN:
+            if succeeded:
+                # What failed before the circuit opened is over and done with
+                self._outcomes.clear()
+                self._state = CircuitState.CLOSED
+            else:
+                self._open()
+
+        elif (
+            self._state == CircuitState.CLOSED
+            and len(self._outcomes) >= self.min_requests
+            and self.error_rate() >= self.error_threshold
+        ):
+            self._open()
+
+    def error_rate(self):
+        self._prune()
+        if not self._outcomes:
+            return 0.0
+
+        failed = sum(1 for _, succeeded, _ in self._outcomes if not succeeded)
+        return failed / len(self._outcomes)
+
+    def p95_latency(self, min_samples: int = 1) -> Optional[float]:
+        self._prune()
+        latencies = sorted(
+            latency for _, succeeded, latency in self._outcomes if succeeded
+        )
+        if not latencies or len(latencies) < min_samples:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def stats(self) -> HealthStats:
+        return HealthStats(
+            state=self.state,
+            requests=len(self._outcomes),
+            error_rate=self.error_rate(),
+            p95_latency=self.p95_latency(),
+            hedged=self.hedged,
+        )
+
+
+class ProviderResilience:
+    """Makes the requests to the completion providers, keeping track of the
+    health of every model, by provider and model name or deployment.
+
+    A failed request is retried with a growing delay, within `retry_budget`
+    seconds, and only once while the model is failing often. A model whose
+    circuit is open is not called at all, its fallback from
+    `fallback_models` is, if it has one. Requests that are bad in themselves
+    are neither retried nor held against the model.
+
+    Streams are retried only until their first token, after that a failure
+    is passed on. Other requests that take longer than the p95 latency of the
+    model can be hedged, with a second request of which the first answer is
+    used."""
+
+    def __init__(
+        self,
+        max_attempts: int,
+        retry_budget: float,
+        window: float,
+        min_requests: int,
+        error_threshold: float,
+        cooldown: float,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        fallback_models: dict[str, str] = {},
+        timer: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ):
+        self.max_attempts = max_attempts
+        self.retry_budget = retry_budget
+        self.window = window
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.fallback_models = fallback_models
+        self.timer = timer
+        self.sleep = sleep
+
+        self._health: dict[str, ProviderHealth] = {}
+
+    def get_health(self, provider: str, model_name: str) -> ProviderHealth:
+        key = f"{provider}:{model_name}"
+        if key not in self._health:
+            self._health[key] = ProviderHealth(
+                window=self.window,
+                min_requests=self.min_requests,
+                error_threshold=self.error_threshold,
+                cooldown=self.cooldown,
+                timer=self.timer,
+            )
+
+        return self._health[key]
+
+    def _get_candidates(self, model_name: str):
+        candidates = [model_name]
+        fallback = self.fallback_models.get(model_name)
+        if fallback is not None:
+            candidates.append(fallback)
+
+        return candidates
+
+    def _get_max_attempts(self, health: ProviderHealth):
+        # Retrying what is likely to fail only adds to the load and the wait
+        if health.error_rate() >= self.error_threshold / 2:
+            return 1
+
+        return self.max_attempts
+
+    async def _backoff(self, attempt: int, started_at: float):
+        delay = min(MIN_BACKOFF * 2 ** (attempt - 1), MAX_BACKOFF)
+        delay *= random.uniform(0.5, 1)
+
+        if self.timer() - started_at + delay > self.retry_budget:
+            return False
+
+        await self.sleep(delay)
+        return True
+
+    async def _hedged(
+        self, health: ProviderHealth, request: Callable[[], Awaitable[T]]
+    ):
+        hedge_after = (
+            health.p95_latency(min_samples=self.hedge_min_samples)
+            if self.hedge
+            else None
+        )
+        if hedge_after is None:
+            return await request()
+
+        first = asyncio.ensure_future(request())
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        health.hedged += 1
+        tasks = {first, asyncio.ensure_future(request())}
+        try:
+            error = None
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    return await next_done
+                except BadRequestException:
+                    raise
+                except Exception as exc:
+                    error = exc
+
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(
+        self,
+        provider: str,
+        model_name: str,
+        request: Callable[[str], Awaitable[T]],
+    ) -> T:
+        """Calls `request` with the name of the model to use."""
+        error = None
+
+        for candidate in self._get_candidates(model_name):
+            health = self.get_health(provider, candidate)
+            started_at = self.timer()
+
+            for attempt in range(1, self._get_max_attempts(health) + 1):
+                if not health.allows_request():
+                    break
+
+                start = self.timer()
+                try:
+                    response = await self._hedged(health, lambda: request(candidate))
+                except BadRequestException:
+                    health.record(True, self.timer() - start)
+                    raise
+                except Exception as exc:
+                    health.record(False)
+                    error = exc
+
+                    if not await self._backoff(attempt, started_at):
+                        break
+                    continue
+
+                health.record(True, self.timer() - start)
+                return response
+
+            logger.warning(f"{provider}:{candidate} failed, circuit {health.state}")
+
+        raise error or ProviderUnavailableException(
+            f"{model_name} is unavailable, try again later."
+        )
+
+    async def stream(
+        self,
+        provider: str,
+        model_name: str,
+        request: Callable[[str], AsyncIterator[T]],
+    ) -> AsyncIterator[T]:
+        """Streams what `request` yields, for the name of the model to use.
+        The latency of a stream is the time to its first token."""
+        error = None
+
+        for candidate in self._get_candidates(model_name):
+            health = self.get_health(provider, candidate)
+            started_at = self.timer()
+
+            for attempt in range(1, self._get_max_attempts(health) + 1):
+                if not health.allows_request():
+                    break
+
+                start = self.timer()
+                stream = request(candidate).__aiter__()
+                try:
+                    first = await stream.__anext__()
+                except StopAsyncIteration:
+                    health.record(True, self.timer() - start)
+                    return
+                except BadRequestException:
+                    health.record(True, self.timer() - start)
+                    raise
+                except Exception as exc:
+                    health.record(False)
+                    error = exc
+                    await stream.aclose()
+
+                    if not await self._backoff(attempt, started_at):
+                        break
+                    continue
+
+                health.record(True, self.timer() - start)
+
+                # Nothing is retried once something was yielded
+                try:
+                    yield first
+                    async for chunk in stream:
+                        yield chunk
+                except BadRequestException:
+                    raise
+                except Exception:
+                    health.record(False)
+                    raise
+                finally:
+                    await stream.aclose()
+
+                return
+
+            logger.warning(f"{provider}:{candidate} failed, circuit {health.state}")
+
+        raise error or ProviderUnavailableException(
+            f"{model_name} is unavailable, try again later."
+        )
+
+    def stats(self) -> dict[str, HealthStats]:
+        return {key: health.stats() for key, health in self._health.items()}
+
+
+def _create_provider_resilience():
+    settings = get_settings()
+    return ProviderResilience(
+        max_attempts=settings.completion_max_attempts,
+        retry_budget=settings.completion_retry_budget,
+        window=settings.completion_circuit_window,
+        min_requests=settings.completion_circuit_min_requests,
+        error_threshold=settings.completion_circuit_error_threshold,
+        cooldown=settings.completion_circuit_cooldown,
+        hedge=settings.completion_hedge_slow_requests,
+        hedge_min_samples=settings.completion_hedge_min_samples,
+        fallback_models=settings.completion_fallback_models,
+    )
+
+
+provider_resilience = _create_provider_resilience()
@@ -0,0 +1,45 @@
+import hashlib
+
+from instorage.ai_models.tokenizers import Tokenizer
+from instorage.main.cache import TTLCache
+from instorage.main.config import get_settings
+
+
+class TokenCountCache:
+    """Token counts of the texts that come back from one question to the next:
+    the prompts with their guards, the chunks and the files.
+
+    Counts are keyed on a hash of the text and on the tokenizer, so that a
+    changed prompt is counted again, and the texts themselves are not kept."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache[tuple[str, str], int] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _get_key(tokenizer: Tokenizer, text: str):
+        return tokenizer.name, hashlib.sha256(text.encode()).hexdigest()
+
+    def count_tokens_batch(self, tokenizer: Tokenizer, texts: list[str]) -> list[int]:
+        keys = [self._get_key(tokenizer, text) for text in texts]
+        counts = [self._cache.get(key) for key in keys]
+
+        uncounted = [i for i, count in enumerate(counts) if count is None]
+        if uncounted:
+            new_counts = tokenizer.count_tokens_batch([texts[i] for i in uncounted])
+            for i, count in zip(uncounted, new_counts):
+                counts[i] = count
+                self._cache.set(keys[i], count)
+
+        return counts
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+token_count_cache = TokenCountCache(
+    maxsize=get_settings().token_count_cache_size,
+    ttl=get_settings().token_count_cache_ttl,
+)
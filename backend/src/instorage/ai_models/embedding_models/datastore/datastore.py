@@ -1,10 +1,14 @@
+import asyncio
 import time
 from typing import Optional
+from uuid import UUID
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import numpy as np
 from pydantic_settings import BaseSettings
 
-from instorage.ai_models.completion_models.completion_service import count_tokens
+from instorage.ai_models.embedding_models.datastore.text_splitter import (
+    TokenTextSplitter,
+)
 from instorage.ai_models.embedding_models.embedding_model_adapters.base import (
     EmbeddingModelAdapter,
 )
@@ -12,10 +16,11 @@ from instorage.files.chunk_embedding_list import ChunkEmbeddingList
 from instorage.groups.group import GroupInDB
 from instorage.info_blobs.info_blob import (
     InfoBlobChunk,
-    InfoBlobChunkWithEmbedding,
+    InfoBlobChunkInDBWithScore,
     InfoBlobInDB,
 )
 from instorage.info_blobs.info_blob_chunk_repo import InfoBlobChunkRepo
+from instorage.info_blobs.vector_index_builder import vector_index_builder
 from instorage.main.logging import get_logger
 from instorage.users.user import UserInDB
 from instorage.websites.website_models import Website
@@ -26,10 +31,15 @@ logger = get_logger(__name__)
 class ChunkSettings(BaseSettings):
     chunk_size: int = 200
     chunk_overlap: int = 40
+    chunk_insert_batch_size: int = 1000
 
 
 settings = ChunkSettings()
 
+# Smoothing constant from the original reciprocal rank fusion paper,
+# dampens the influence of the very top ranks of each result list
+RRF_K = 60
+
 
 def autocut(y_values: list[float], cutoff: int = 2) -> int:
     # Written by GPT-4, fact-checked by GPT-4
@@ -64,6 +74,37 @@ def autocut(y_values: list[float], cutoff: int = 2) -> int:
     return len(y_values)
 
 
+def reciprocal_rank_fusion(
+    result_lists: list[list[InfoBlobChunkInDBWithScore]], k: int = RRF_K
+) -> list[InfoBlobChunkInDBWithScore]:
+    fused_scores = {}
+    chunks = {}
+
+    for results in result_lists:
+        for rank, chunk in enumerate(results, start=1):
+            fused_scores[chunk.id] = fused_scores.get(chunk.id, 0) + 1 / (k + rank)
+            chunks.setdefault(chunk.id, chunk)
+
+    ranked_ids = sorted(fused_scores, key=fused_scores.get, reverse=True)
+
+    return [
+        chunks[id].model_copy(update={"score": fused_scores[id]}) for id in ranked_ids
+    ]
+
+
+def combine_embeddings(embeddings: list[list[float]], decay: float) -> list[float]:
+    """Weighted mean of the embeddings, each weighing `decay` times the one
+    after it, scaled back to unit length."""
+    weights = decay ** np.arange(len(embeddings) - 1, -1, -1)
+    mean = np.average(np.asarray(embeddings, dtype=np.float64), axis=0, weights=weights)
+
+    norm = np.linalg.norm(mean)
+    if norm == 0:
+        return mean.tolist()
+
+    return (mean / norm).tolist()
+
+
 class Datastore:
     def __init__(
         self,
@@ -77,10 +118,9 @@ class Datastore:
         self.model_adapter = embedding_model_adapter
 
     def _chunk_text(self, info_blob: InfoBlobInDB):
-        splitter = RecursiveCharacterTextSplitter(
+        splitter = TokenTextSplitter(
             chunk_size=settings.chunk_size,
             chunk_overlap=settings.chunk_overlap,
-            length_function=count_tokens,
         )
 
         info_blob_chunks = [
@@ -97,26 +137,21 @@ class Datastore:
         return info_blob_chunks
 
     async def _add(
-        self, chunk_embedding_list: ChunkEmbeddingList, batch_size: int = 100
+        self,
+        chunk_embedding_list: ChunkEmbeddingList,
+        info_blob: InfoBlobInDB,
+        batch_size: Optional[int] = None,
     ):
-        chunks = []
-        for chunk, embedding in chunk_embedding_list:
-            chunks.append(
-                InfoBlobChunkWithEmbedding(
-                    **chunk.model_dump(exclude_none=True), embedding=embedding
-                )
-            )
-
-            if len(chunks) >= batch_size:
-                logger.debug(f"Adding {len(chunks)} chunks to datastore.")
-                await self.chunk_repo.add(chunks)
-
-                chunks.clear()
+        batch_size = batch_size or settings.chunk_insert_batch_size
+        denormalised_fields = dict(
+            group_id=info_blob.group_id,
+            website_id=info_blob.website_id,
+            embedding_model_id=info_blob.embedding_model_id,
+        )
 
-        # Last batch
-        if chunks:
-            logger.debug(f"Last batch. Adding {len(chunks)} chunks to datastore.")
-            await self.chunk_repo.add(chunks)
+        for chunks, embeddings in chunk_embedding_list.batches(batch_size):
+            logger.debug(f"Adding {len(chunks)} chunks to datastore.")
+            await self.chunk_repo.add(chunks, embeddings, **denormalised_fields)
 
     async def add(self, info_blob: InfoBlobInDB):
         logger.debug("Chunking text.")
@@ -132,7 +167,35 @@ class Datastore:
         chunk_embedding_list = await self.model_adapter.get_embeddings(info_blob_chunks)
 
         logger.debug(f"Adding {len(info_blob_chunks)} info-blob chunks to datastore.")
-        await self._add(chunk_embedding_list)
+        await self._add(chunk_embedding_list, info_blob)
+
+        # A model's first chunks get its vector index
+        vector_index_builder.build_on_commit(
+            self.chunk_repo.session, info_blob.embedding_model_id
+        )
+
+    async def embed_query(self, search_string: str):
+        # Embeddings of queries are cached, a search for the same string
+        # that follows or is already waiting gets this embedding
+        await self.model_adapter.get_embedding_for_query(search_string)
+
+    async def embed_conversation(self, turns: list[str], decay: float):
+        """Embeds each turn on its own and combines them, the latest weighing
+        the most. The turns are cached like any query, so only the turns that
+        are new since the last question are sent to the model."""
+        embeddings = await asyncio.gather(
+            *(self.model_adapter.get_embedding_for_query(turn) for turn in turns)
+        )
+
+        return combine_embeddings(embeddings, decay=decay)
+
+    async def _get_embedding(
+        self, search_string: str, embedding: Optional[list[float]] = None
+    ):
+        if embedding is not None:
+            return embedding
+
+        return await self.model_adapter.get_embedding_for_query(search_string)
 
     async def semantic_search(
         self,
@@ -141,17 +204,17 @@ class Datastore:
         websites: list[Website] = [],
         num_chunks: Optional[int] = 30,
         autocut_cutoff: Optional[int] = None,
+        embedding: Optional[list[float]] = None,
     ):
         group_ids = [group.id for group in groups]
         website_ids = [website.id for website in websites]
 
         start = time.time()
-        search_string_embedding = await self.model_adapter.get_embedding_for_query(
-            search_string
-        )
+        search_string_embedding = await self._get_embedding(search_string, embedding)
         step_1 = time.time()
         semantic_results = await self.chunk_repo.semantic_search(
             search_string_embedding,
+            embedding_model_id=self.model_adapter.model.id,
             group_ids=group_ids,
             website_ids=website_ids,
             limit=num_chunks,
@@ -170,3 +233,73 @@ class Datastore:
             return semantic_results[:cut_point]
 
         return semantic_results
+
+    async def get_referenced_chunks(
+        self,
+        question_id: UUID,
+        groups: list[GroupInDB] = [],
+        websites: list[Website] = [],
+        embedding: Optional[list[float]] = None,
+    ):
+        """The chunks of what an earlier question referenced, from the groups
+        and websites searched now, scored against `embedding`."""
+        if embedding is None:
+            return []
+
+        return await self.chunk_repo.get_referenced_chunks(
+            question_id,
+            embedding,
+            embedding_model_id=self.model_adapter.model.id,
+            group_ids=[group.id for group in groups],
+            website_ids=[website.id for website in websites],
+        )
+
+    async def hybrid_search(
+        self,
+        search_string: str,
+        groups: list[GroupInDB] = [],
+        websites: list[Website] = [],
+        num_chunks: Optional[int] = 30,
+        autocut_cutoff: Optional[int] = None,
+        embedding: Optional[list[float]] = None,
+    ):
+        group_ids = [group.id for group in groups]
+        website_ids = [website.id for website in websites]
+
+        # A session can only run one statement at a time, so the keyword
+        # query is run while we wait for the query embedding instead. With an
+        # embedding given, `search_string` is only used for the keywords
+        start = time.time()
+        search_string_embedding, keyword_results = await asyncio.gather(
+            self._get_embedding(search_string, embedding),
+            self.chunk_repo.keyword_search(
+                search_string,
+                group_ids=group_ids,
+                website_ids=website_ids,
+                limit=num_chunks,
+            ),
+        )
+        step_1 = time.time()
+        semantic_results = await self.chunk_repo.semantic_search(
+            search_string_embedding,
+            embedding_model_id=self.model_adapter.model.id,
+            group_ids=group_ids,
+            website_ids=website_ids,
+            limit=num_chunks,
+        )
+        end = time.time()
+
+        logger.debug(
+            f"Time to get results: Embed and keyword step: {step_1 - start},"
+            f" Search step: {end - step_1}, Total: {end - start}"
+        )
+
+        results = reciprocal_rank_fusion([semantic_results, keyword_results])[
+            :num_chunks
+        ]
+
+        if autocut_cutoff is not None:
+            cut_point = autocut([res.score for res in results], autocut_cutoff)
+            return results[:cut_point]
+
+        return results
@@ -0,0 +1,96 @@
+import re
+from bisect import bisect_left
+
+import tiktoken
+
+from instorage.ai_models.tokenizers import get_encoding
+
+# Places to cut the text, strongest first. A chunk ends at the strongest boundary
+# in the second half of its token window, and the overlap with the next chunk
+# starts at the strongest boundary inside the overlap
+BOUNDARY_PATTERNS = [
+    re.compile(r"\n[^\S\n]*\n"),  # paragraph
+    re.compile(r"\n"),  # line
+    re.compile(r"(?<=[.!?])\s"),  # sentence
+    re.compile(r"\s+"),  # word
+]
+NO_BOUNDARY = 0
+
+
+class TokenTextSplitter:
+    """Splits text into chunks of at most `chunk_size` tokens, with
+    `chunk_overlap` tokens shared by consecutive chunks.
+
+    The text is encoded once and cut on token offsets, preferring paragraph,
+    line, sentence and word boundaries in that order."""
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        encoding: tiktoken.Encoding | None = None,
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(
+                f"Chunk overlap ({chunk_overlap}) must be smaller"
+                f" than the chunk size ({chunk_size})"
+            )
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding = encoding or get_encoding()
+
+    @staticmethod
+    def _boundary_strengths(text: str, offsets: list[int]) -> list[int]:
+        # strengths[i] is how good a place it is to cut before token i
+        strengths = [NO_BOUNDARY] * (len(offsets) + 1)
+
+        for strength, pattern in enumerate(reversed(BOUNDARY_PATTERNS), start=1):
+            for match in pattern.finditer(text):
+                # Cut before the whitespace, or after the token it is merged into
+                token = bisect_left(offsets, match.start())
+                if 0 < token < len(offsets):
+                    strengths[token] = strength
+
+        return strengths
+
+    @staticmethod
+    def _strongest(strengths: list[int], start: int, end: int, latest: bool):
+        candidates = range(end - 1, start - 1, -1) if latest else range(start, end)
+
+        best = None
+        for token in candidates:
+            if best is None or strengths[token] > strengths[best]:
+                best = token
+
+        return best
+
+    def split_text(self, text: str) -> list[str]:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if not tokens:
+            return []
+
+        text, offsets = self.encoding.decode_with_offsets(tokens)
+        num_tokens = len(tokens)
+        strengths = self._boundary_strengths(text, offsets)
+        char_offsets = offsets + [len(text)]
+
+        chunks = []
+        start = 0
+        while True:
+            end = start + self.chunk_size
+            if end >= num_tokens:
+                chunks.append(text[char_offsets[start] :])
+                return chunks
+
+            end = self._strongest(
+                strengths, start + self.chunk_size // 2 + 1, end + 1, latest=True
+            )
+            chunks.append(text[char_offsets[start] : char_offsets[end]])
+
+            overlap_start = max(end - self.chunk_overlap, start + 1)
+            start = (
+                self._strongest(strengths, overlap_start, end, latest=False)
+                if overlap_start < end
+                else end
+            )
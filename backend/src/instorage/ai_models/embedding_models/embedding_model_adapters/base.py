@@ -1,15 +1,37 @@
 import abc
 from abc import abstractmethod
+from functools import partial
 
 from instorage.ai_models.embedding_models.embedding_model import EmbeddingModel
+from instorage.ai_models.embedding_models.embedding_model_adapters.chunk_batcher import (
+    ChunkBatch,
+    ChunkBatcher,
+)
+from instorage.ai_models.tokenizers import (
+    count_tokens_batch,
+    get_encoding_for_embedding_model,
+)
 from instorage.files.chunk_embedding_list import ChunkEmbeddingList
 from instorage.info_blobs.info_blob import InfoBlobChunk
+from instorage.main.config import get_settings
+
+DEFAULT_MAX_INPUT = 8191
 
 
 class EmbeddingModelAdapter(abc.ABC):
     def __init__(self, model: EmbeddingModel):
         self.model = model
 
+    def _chunk_chunks(self, chunks: list[InfoBlobChunk]) -> list[ChunkBatch]:
+        encoding = get_encoding_for_embedding_model(self.model)
+        batcher = ChunkBatcher(
+            max_tokens=self.model.max_input or DEFAULT_MAX_INPUT,
+            max_items=get_settings().embedding_max_items_per_request,
+            count_tokens=partial(count_tokens_batch, encoding),
+        )
+
+        return batcher.batch(chunks)
+
     @abstractmethod
     async def get_embedding_for_query(self, query: str):
         raise NotImplementedError
@@ -0,0 +1,75 @@
+from typing import Callable, NamedTuple
+
+from instorage.info_blobs.info_blob import InfoBlobChunk
+from instorage.main.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ChunkBatch(NamedTuple):
+    chunks: list[InfoBlobChunk]
+    num_tokens: int
+
+
+class ChunkBatcher:
+    """Packs chunks into as few embedding requests as possible, without a
+    request exceeding `max_tokens` tokens or `max_items` inputs."""
+
+    def __init__(
+        self,
+        max_tokens: int,
+        max_items: int,
+        count_tokens: Callable[[list[str]], list[int]],
+    ):
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.count_tokens = count_tokens
+
+    def batch(self, chunks: list[InfoBlobChunk]) -> list[ChunkBatch]:
+        token_counts = self.count_tokens([chunk.text for chunk in chunks])
+
+        batches = []
+        current = []
+        current_tokens = 0
+
+        for chunk, num_tokens in zip(chunks, token_counts):
+            if num_tokens > self.max_tokens:
+                logger.warning(
+                    f"Chunk {chunk.chunk_no} of info blob {chunk.info_blob_id} has"
+                    f" {num_tokens} tokens, more than the limit of {self.max_tokens}"
+                )
+
+            if current and (
+                current_tokens + num_tokens > self.max_tokens
+                or len(current) >= self.max_items
+            ):
+                batches.append(ChunkBatch(chunks=current, num_tokens=current_tokens))
+                current = []
+                current_tokens = 0
+
+            current.append(chunk)
+            current_tokens += num_tokens
+
+        if current:
+            batches.append(ChunkBatch(chunks=current, num_tokens=current_tokens))
+
+        self._log_fill(batches)
+
+        return batches
+
+    def _log_fill(self, batches: list[ChunkBatch]):
+        if not batches:
+            return
+
+        for i, batch in enumerate(batches):
+            logger.debug(
+                f"Batch {i}: {len(batch.chunks)} chunks, {batch.num_tokens} tokens,"
+                f" {batch.num_tokens / self.max_tokens:.0%} of the token limit"
+            )
+
+        total_tokens = sum(batch.num_tokens for batch in batches)
+        average_fill = total_tokens / (len(batches) * self.max_tokens)
+        logger.info(
+            f"Embedding {total_tokens} tokens in {len(batches)} requests,"
+            f" on average {average_fill:.0%} full"
+        )
@@ -0,0 +1,165 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, TypeVar
+from uuid import UUID
+
+from instorage.ai_models.embedding_models.embedding_model import EmbeddingModel
+from instorage.main.config import get_settings
+from instorage.main.exceptions import RateLimitException
+from instorage.main.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+MIN_BACKOFF = 1
+MAX_BACKOFF = 60
+
+
+class TokenBudget:
+    """Token bucket holding at most one minute worth of tokens,
+    refilled continuously at `tokens_per_minute`."""
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.tokens_per_minute = tokens_per_minute
+        self.timer = timer
+
+        self._tokens = float(tokens_per_minute)
+        self._updated_at = timer()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.timer()
+        self._tokens = min(
+            self.tokens_per_minute,
+            self._tokens + (now - self._updated_at) * self.tokens_per_minute / 60,
+        )
+        self._updated_at = now
+
+    async def acquire(self, tokens: int):
+        # A single request larger than the budget would otherwise wait forever
+        tokens = min(tokens, self.tokens_per_minute)
+
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                missing = tokens - self._tokens
+                await asyncio.sleep(missing * 60 / self.tokens_per_minute)
+                self._refill()
+
+            self._tokens -= tokens
+
+
+class EmbeddingScheduler:
+    """Runs embedding requests with a bounded number of requests in flight,
+    within an optional token-per-minute budget.
+
+    A rate limit error from the provider makes every request through this
+    scheduler back off, with an exponentially growing delay that is reset
+    by the first successful request."""
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        budget: Optional[TokenBudget] = None,
+        max_retries: int = 6,
+    ):
+        self.max_in_flight = max_in_flight
+        self.budget = budget
+        self.max_retries = max_retries
+
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._backoff = 0
+        self._resume_at = 0.0
+
+    async def _wait_for_backoff(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _register_rate_limit(self):
+        self._backoff = min(max(self._backoff * 2, MIN_BACKOFF), MAX_BACKOFF)
+        delay = self._backoff * random.uniform(0.5, 1)
+        self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+    async def _run(
+        self,
+        batch: T,
+        embed: Callable[[T], Awaitable[list[list[float]]]],
+        tokens: int,
+    ):
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_backoff()
+
+            if self.budget is not None:
+                await self.budget.acquire(tokens)
+
+            async with self._semaphore:
+                try:
+                    embeddings = await embed(batch)
+                except RateLimitException:
+                    if attempt == self.max_retries:
+                        raise
+
+                    self._register_rate_limit()
+                    logger.warning(
+                        f"Rate limited, backing off {self._backoff}s"
+                        f" (attempt {attempt + 1} of {self.max_retries})"
+                    )
+                    continue
+
+            self._backoff = 0
+            return embeddings
+
+    async def map(
+        self,
+        batches: Iterable[T],
+        embed: Callable[[T], Awaitable[list[list[float]]]],
+        count_tokens: Callable[[T], int],
+    ) -> AsyncIterator[tuple[T, list[list[float]]]]:
+        """Yields every batch together with its embeddings, in the order of
+        `batches`, while keeping up to `max_in_flight` requests running."""
+
+        pending: deque[tuple[T, asyncio.Task]] = deque()
+
+        try:
+            for batch in batches:
+                task = asyncio.create_task(self._run(batch, embed, count_tokens(batch)))
+                pending.append((batch, task))
+
+                if len(pending) >= self.max_in_flight:
+                    batch, task = pending.popleft()
+                    yield batch, await task
+
+            while pending:
+                batch, task = pending.popleft()
+                yield batch, await task
+
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+
+_schedulers: dict[UUID, EmbeddingScheduler] = {}
+
+
+def get_embedding_scheduler(model: EmbeddingModel) -> EmbeddingScheduler:
+    # Shared per model, so that all ingestion jobs in a process respect
+    # the same concurrency limit, budget and backoff
+    if model.id not in _schedulers:
+        tokens_per_minute = get_settings().embedding_tokens_per_minute
+        budget = TokenBudget(tokens_per_minute) if tokens_per_minute else None
+
+        _schedulers[model.id] = EmbeddingScheduler(
+            max_in_flight=get_settings().embedding_max_in_flight_requests,
+            budget=budget,
+            max_retries=get_settings().embedding_max_rate_limit_retries,
+        )
+
+    return _schedulers[model.id]
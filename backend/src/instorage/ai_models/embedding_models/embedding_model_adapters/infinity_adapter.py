@@ -1,18 +1,34 @@
-from tenacity import retry, stop_after_attempt, wait_random_exponential
+from tenacity import (
+    retry,
+    retry_if_not_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 from instorage.ai_models.embedding_models.embedding_model_adapters.base import (
     EmbeddingModelAdapter,
 )
+from instorage.ai_models.embedding_models.embedding_model_adapters.chunk_batcher import (
+    ChunkBatch,
+)
+from instorage.ai_models.embedding_models.embedding_model_adapters.embedding_scheduler import (
+    get_embedding_scheduler,
+)
+from instorage.ai_models.embedding_models.embedding_model_adapters.query_embedding_cache import (
+    cached_query_embedding,
+)
 from instorage.files.chunk_embedding_list import ChunkEmbeddingList
 from instorage.info_blobs.info_blob import InfoBlobChunk
-from instorage.main.aiohttp_client import aiohttp_client
 from instorage.main.config import get_settings
+from instorage.main.exceptions import RateLimitException
+from instorage.main.http_clients import http_clients
 from instorage.main.logging import get_logger
 
 logger = get_logger(__name__)
 
 
 class InfinityAdapter(EmbeddingModelAdapter):
+    @cached_query_embedding
     async def get_embedding_for_query(self, query: str):
         truncated_query = query[: self.model.max_input]
         query_prepended = [f"query: {truncated_query}"]
@@ -20,40 +36,51 @@ class InfinityAdapter(EmbeddingModelAdapter):
         embeddings = await self._get_embeddings(query_prepended)
         return embeddings[0]
 
-    # Copied from text_embedding
-    # TODO: Refactor this later
-    def _chunk_chunks(self, chunks: list[InfoBlobChunk]):
-        cum_len = 0
-        prev_i = 0
-        for i, chunk in enumerate(chunks):
-            cum_len += len(chunk.text)
+    async def _embed_batch(self, batch: ChunkBatch):
+        texts_prepended = [f"passage: {chunk.text}" for chunk in batch.chunks]
 
-            if cum_len > self.model.max_input:
-                yield chunks[prev_i:i]
-                prev_i = i
-                cum_len = 0
+        logger.debug(f"Embedding a chunk of {len(batch.chunks)} chunks")
 
-        yield chunks[prev_i:]
+        return await self._get_embeddings_scheduled(texts_prepended)
 
     async def get_embeddings(self, chunks: list[InfoBlobChunk]):
-        chunk_embedding_list = ChunkEmbeddingList()
-        for chunked_chunks in self._chunk_chunks(chunks):
-            texts_prepended = [f"passage: {chunk.text}" for chunk in chunked_chunks]
+        chunk_embedding_list = ChunkEmbeddingList(capacity=len(chunks))
+        scheduler = get_embedding_scheduler(self.model)
 
-            logger.debug(f"Embedding a chunk of {len(chunked_chunks)} chunks")
-
-            embeddings_for_chunks = await self._get_embeddings(texts_prepended)
-            chunk_embedding_list.add(chunked_chunks, embeddings_for_chunks)
+        async for batch, embeddings_for_chunks in scheduler.map(
+            self._chunk_chunks(chunks),
+            self._embed_batch,
+            count_tokens=lambda batch: batch.num_tokens,
+        ):
+            chunk_embedding_list.add(batch.chunks, embeddings_for_chunks)
 
         return chunk_embedding_list
 
     @retry(wait=wait_random_exponential(min=1, max=20), stop=stop_after_attempt(3))
     async def _get_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return await self._create_embeddings(texts)
+
+    # Rate limits are left to the scheduler, which backs off every batch
+    @retry(
+        wait=wait_random_exponential(min=1, max=20),
+        stop=stop_after_attempt(3),
+        retry=retry_if_not_exception_type(RateLimitException),
+    )
+    async def _get_embeddings_scheduled(self, texts: list[str]) -> list[list[float]]:
+        return await self._create_embeddings(texts)
+
+    async def _create_embeddings(self, texts: list[str]) -> list[list[float]]:
 
         payload = {"input": texts, "model": self.model.name}
 
         url = f"{get_settings().infinity_url}/embeddings"
-        async with aiohttp_client().post(url, json=payload) as resp:
+        async with (
+            http_clients.infinity_slot(),
+            http_clients.infinity().post(url, json=payload) as resp,
+        ):
+            if resp.status == 429:
+                raise RateLimitException("Infinity Ratelimit exception")
+
             data = await resp.json()
 
         return [embedding["embedding"] for embedding in data["data"]]
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+import wrapt
+from pydantic import BaseModel
+
+from instorage.ai_models.embedding_models.embedding_model import EmbeddingModel
+from instorage.main.cache import TTLCache
+from instorage.main.config import get_settings
+from instorage.main.logging import get_logger
+from instorage.main.redis_client import RedisClient, redis_client
+
+logger = get_logger(__name__)
+
+REDIS_KEY_PREFIX = "query_embedding"
+
+
+class QueryEmbeddingCacheStats(BaseModel):
+    size: int
+    hits: int
+    redis_hits: int
+    misses: int
+
+
+def _normalise(query: str):
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
+    """Caches query embeddings per (model, dimensions, normalised query).
+
+    The first tier lives in the process, the optional second tier in redis
+    is shared between all api workers. Concurrent requests for the same key
+    share one call to the embedding model."""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: int,
+        redis: Optional[RedisClient] = None,
+    ):
+        self.ttl = ttl
+        self.redis = redis
+
+        self._local: TTLCache[str, list[float]] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(model: EmbeddingModel, query: str):
+        digest = hashlib.sha256(_normalise(query).encode()).hexdigest()
+        return f"{model.id}:{model.dimensions}:{digest}"
+
+    async def _get_from_redis(self, key: str):
+        if self.redis is None or not self.redis.is_started:
+            return
+
+        try:
+            value = await self.redis().get(f"{REDIS_KEY_PREFIX}:{key}")
+        except Exception:
+            logger.exception("Could not read query embedding from redis:")
+            return
+
+        if value is not None:
+            return np.frombuffer(value, dtype=np.float32).tolist()
+
+    async def _set_in_redis(self, key: str, embedding: list[float]):
+        if self.redis is None or not self.redis.is_started:
+            return
+
+        try:
+            await self.redis().set(
+                f"{REDIS_KEY_PREFIX}:{key}",
+                np.asarray(embedding, dtype=np.float32).tobytes(),
+                ex=self.ttl,
+            )
+        except Exception:
+            logger.exception("Could not write query embedding to redis:")
+
+    async def _embed(self, key: str, embed: Callable[[], Awaitable[list[float]]]):
+        embedding = await self._get_from_redis(key)
+
+        if embedding is not None:
+            self.redis_hits += 1
+        else:
+            self.misses += 1
+            embedding = await embed()
+            await self._set_in_redis(key, embedding)
+
+        self._local.set(key, embedding)
+
+        return embedding
+
+    async def get_or_embed(
+        self,
+        model: EmbeddingModel,
+        query: str,
+        embed: Callable[[], Awaitable[list[float]]],
+    ) -> list[float]:
+        key = self.get_key(model, query)
+
+        embedding = self._local.get(key)
+        if embedding is not None:
+            self.hits += 1
+            return embedding
+
+        if key in self._in_flight:
+            self.hits += 1
+        else:
+            # Its own task, so that a caller that is cancelled does not cancel
+            # the embedding the others wait for
+            task = asyncio.ensure_future(self._embed(key, embed))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        return await asyncio.shield(self._in_flight[key])
+
+    def clear(self):
+        self._local.clear()
+
+    def stats(self):
+        return QueryEmbeddingCacheStats(
+            size=len(self._local),
+            hits=self.hits,
+            redis_hits=self.redis_hits,
+            misses=self.misses,
+        )
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    maxsize=get_settings().query_embedding_cache_size,
+    ttl=get_settings().query_embedding_cache_ttl,
+    redis=redis_client if get_settings().using_redis_query_embedding_cache else None,
+)
+
+
+@wrapt.decorator
+async def cached_query_embedding(wrapped, instance, args, kwargs):
+    query = kwargs["query"] if "query" in kwargs else args[0]
+
+    return await query_embedding_cache.get_or_embed(
+        instance.model, query, lambda: wrapped(*args, **kwargs)
+    )
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import openai
 from tenacity import (
     retry,
@@ -10,10 +12,23 @@ from instorage.ai_models.embedding_models.embedding_model import EmbeddingModel
 from instorage.ai_models.embedding_models.embedding_model_adapters.base import (
     EmbeddingModelAdapter,
 )
+from instorage.ai_models.embedding_models.embedding_model_adapters.chunk_batcher import (
+    ChunkBatch,
+)
+from instorage.ai_models.embedding_models.embedding_model_adapters.embedding_scheduler import (
+    get_embedding_scheduler,
+)
+from instorage.ai_models.embedding_models.embedding_model_adapters.query_embedding_cache import (
+    cached_query_embedding,
+)
 from instorage.files.chunk_embedding_list import ChunkEmbeddingList
 from instorage.info_blobs.info_blob import InfoBlobChunk
-from instorage.main.config import get_settings
-from instorage.main.exceptions import BadRequestException, OpenAIException
+from instorage.main.exceptions import (
+    BadRequestException,
+    OpenAIException,
+    RateLimitException,
+)
+from instorage.main.http_clients import http_clients
 from instorage.main.logging import get_logger
 
 logger = get_logger(__name__)
@@ -23,37 +38,33 @@ class OpenAIEmbeddingAdapter(EmbeddingModelAdapter):
     def __init__(
         self,
         model: EmbeddingModel,
-        client=openai.AsyncOpenAI(api_key=get_settings().openai_api_key),
+        client: Optional[openai.AsyncOpenAI] = None,
     ):
-        self.client = client
+        self.client = client if client is not None else http_clients.openai()
         self.model_name = model.name  # Store the model name
         super().__init__(model)
 
-    def _chunk_chunks(self, chunks: list[InfoBlobChunk]):
-        cum_len = 0
-        prev_i = 0
-        for i, text in enumerate(chunks):
-            cum_len += len(text.text)
+    async def _embed_batch(self, batch: ChunkBatch):
+        texts_for_chunks = [chunk.text for chunk in batch.chunks]
 
-            if cum_len > self.model.max_input:
-                yield chunks[prev_i:i]
-                prev_i = i
-                cum_len = 0
+        logger.debug(f"Embedding a chunk of {len(batch.chunks)} chunks")
 
-        yield chunks[prev_i:]
+        return await self._get_embeddings_scheduled(texts=texts_for_chunks)
 
     async def get_embeddings(self, chunks: list[InfoBlobChunk]):
-        chunk_embedding_list = ChunkEmbeddingList()
-        for chunked_chunks in self._chunk_chunks(chunks):
-            texts_for_chunks = [chunk.text for chunk in chunked_chunks]
-
-            logger.debug(f"Embedding a chunk of {len(chunked_chunks)} chunks")
+        chunk_embedding_list = ChunkEmbeddingList(capacity=len(chunks))
+        scheduler = get_embedding_scheduler(self.model)
 
-            embeddings_for_chunks = await self._get_embeddings(texts=texts_for_chunks)
-            chunk_embedding_list.add(chunked_chunks, embeddings_for_chunks)
+        async for batch, embeddings_for_chunks in scheduler.map(
+            self._chunk_chunks(chunks),
+            self._embed_batch,
+            count_tokens=lambda batch: batch.num_tokens,
+        ):
+            chunk_embedding_list.add(batch.chunks, embeddings_for_chunks)
 
         return chunk_embedding_list
 
+    @cached_query_embedding
     async def get_embedding_for_query(self, query: str):
         truncated_query = query[: self.model.max_input]
         embeddings = await self._get_embeddings([truncated_query])
@@ -66,6 +77,19 @@ class OpenAIEmbeddingAdapter(EmbeddingModelAdapter):
         reraise=True,
     )
     async def _get_embeddings(self, texts: list[str]):
+        return await self._create_embeddings(texts)
+
+    # Rate limits are left to the scheduler, which backs off every batch
+    @retry(
+        wait=wait_random_exponential(min=1, max=20),
+        stop=stop_after_attempt(3),
+        retry=retry_if_not_exception_type((BadRequestException, RateLimitException)),
+        reraise=True,
+    )
+    async def _get_embeddings_scheduled(self, texts: list[str]):
+        return await self._create_embeddings(texts)
+
+    async def _create_embeddings(self, texts: list[str]):
         try:
             # Prepare the parameters for the embeddings.create method
             params = {"input": texts, "model": self.model_name}
@@ -82,7 +106,7 @@ class OpenAIEmbeddingAdapter(EmbeddingModelAdapter):
             raise BadRequestException("Invalid input") from e
         except openai.RateLimitError as e:
             logger.exception("Rate limit error:")
-            raise OpenAIException("OpenAI Ratelimit exception") from e
+            raise RateLimitException("OpenAI Ratelimit exception") from e
         except Exception as e:
             logger.exception("Unknown OpenAI exception:")
             raise OpenAIException("Unknown OpenAI exception") from e
@@ -0,0 +1,89 @@
+from functools import cache
+from typing import Protocol
+
+import tiktoken
+from anthropic import Anthropic
+from tiktoken.model import encoding_name_for_model
+
+from instorage.ai_models.completion_models.completion_model import (
+    CompletionModel,
+    CompletionModelFamily,
+)
+from instorage.ai_models.embedding_models.embedding_model import EmbeddingModel
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+class Tokenizer(Protocol):
+    # Tells apart the counts of different tokenizers
+    name: str
+
+    def count_tokens(self, text: str) -> int: ...
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]: ...
+
+
+class TiktokenTokenizer:
+    def __init__(self, encoding: tiktoken.Encoding):
+        self.encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        return count_tokens_batch(self.encoding, texts)
+
+
+class ClaudeTokenizer:
+    def __init__(self):
+        # The tokenizer is shipped with the anthropic package, no request is made
+        self.tokenizer = Anthropic(api_key="").get_tokenizer()
+        self.name = "claude"
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text).ids)
+
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        return [len(encoding.ids) for encoding in self.tokenizer.encode_batch(texts)]
+
+
+@cache
+def get_encoding(name: str = DEFAULT_ENCODING) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(name)
+
+
+def get_encoding_for_embedding_model(model: EmbeddingModel) -> tiktoken.Encoding:
+    # All OpenAI embedding models use cl100k_base. The open models served by
+    # infinity have tokenizers of their own that we do not ship, for them
+    # cl100k_base is a close enough estimate to size requests by
+    return get_encoding(DEFAULT_ENCODING)
+
+
+def count_tokens_batch(encoding: tiktoken.Encoding, texts: list[str]) -> list[int]:
+    return [
+        len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())
+    ]
+
+
+@cache
+def _get_claude_tokenizer() -> ClaudeTokenizer:
+    return ClaudeTokenizer()
+
+
+@cache
+def _get_tiktoken_tokenizer(model_name: str) -> TiktokenTokenizer:
+    try:
+        encoding_name = encoding_name_for_model(model_name)
+    except KeyError:
+        # Open models and deployments under names of their own are estimated
+        encoding_name = DEFAULT_ENCODING
+
+    return TiktokenTokenizer(get_encoding(encoding_name))
+
+
+def get_tokenizer_for_completion_model(model: CompletionModel) -> Tokenizer:
+    if model.family == CompletionModelFamily.CLAUDE:
+        return _get_claude_tokenizer()
+
+    return _get_tiktoken_tokenizer(model.name)
@@ -3,6 +3,7 @@
 # Licensed under the MIT License.
 
 from pathlib import Path
+from typing import Optional
 
 import openai
 from openai import AsyncOpenAI
@@ -14,18 +15,16 @@ from tenacity import (
 )
 
 from instorage.files.audio import AudioFile
-from instorage.main.config import get_settings
 from instorage.main.exceptions import BadRequestException, OpenAIException
+from instorage.main.http_clients import http_clients
 from instorage.main.logging import get_logger
 
 logger = get_logger(__name__)
 
 
 class OpenAISTTModelAdapter:
-    def __init__(
-        self, client: AsyncOpenAI = AsyncOpenAI(api_key=get_settings().openai_api_key)
-    ):
-        self.client = client
+    def __init__(self, client: Optional[AsyncOpenAI] = None):
+        self.client = client if client is not None else http_clients.openai()
 
     async def get_text_from_file(self, audio_file: AudioFile):
         text = ""
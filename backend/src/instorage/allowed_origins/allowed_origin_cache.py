@@ -0,0 +1,106 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import event
+
+from instorage.database.database import AsyncSession
+from instorage.main.cache import TTLCache
+from instorage.main.config import get_settings
+from instorage.main.invalidation import InvalidationChannel
+from instorage.main.redis_client import RedisClient, redis_client
+
+INVALIDATION_CHANNEL = "allowed_origin_cache:invalidate"
+
+
+class AllowedOriginCache:
+    """Caches whether an origin is allowed. Allowed origins are kept for `ttl`
+    seconds, origins that are not for the shorter `negative_ttl`, so that a
+    newly added origin is picked up soon even if the invalidation is missed.
+
+    Concurrent lookups of the same origin share one call to the database."""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        negative_ttl: float,
+        redis: Optional[RedisClient] = None,
+    ):
+        self.negative_ttl = negative_ttl
+
+        self._cache: TTLCache[str, bool] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._generation = 0
+        self._channel = InvalidationChannel(
+            INVALIDATION_CHANNEL,
+            redis=redis,
+            on_message=lambda message: self._invalidate_locally(message["origin"]),
+            on_gap=self.clear,
+        )
+
+    async def _lookup(self, origin: str, lookup: Callable[[str], Awaitable[bool]]):
+        generation = self._generation
+        is_allowed = await lookup(origin)
+
+        # An origin added or removed during the lookup is looked up again
+        if generation == self._generation:
+            ttl = None if is_allowed else self.negative_ttl
+            self._cache.set(origin, is_allowed, ttl=ttl)
+
+        return is_allowed
+
+    async def is_allowed(
+        self, origin: str, lookup: Callable[[str], Awaitable[bool]]
+    ) -> bool:
+        is_allowed = self._cache.get(origin)
+        if is_allowed is not None:
+            return is_allowed
+
+        if origin not in self._in_flight:
+            task = asyncio.ensure_future(self._lookup(origin, lookup))
+            self._in_flight[origin] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(origin, None))
+
+        return await asyncio.shield(self._in_flight[origin])
+
+    def _invalidate_locally(self, origin: Optional[str]):
+        self._generation += 1
+
+        if origin is None:
+            self._cache.clear()
+        else:
+            self._cache.delete(origin)
+
+    def invalidate(self, origin: Optional[str] = None):
+        self._invalidate_locally(origin)
+        self._channel.publish({"origin": origin})
+
+    def invalidate_on_commit(self, session: AsyncSession, origin: Optional[str] = None):
+        """Invalidates `origin`, or all origins, once `session` commits."""
+        event.listen(
+            session.sync_session,
+            "after_commit",
+            lambda _: self.invalidate(origin),
+            once=True,
+        )
+
+    def start(self):
+        self._channel.start()
+
+    async def stop(self):
+        await self._channel.stop()
+        self.clear()
+
+    def clear(self):
+        self._invalidate_locally(None)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+allowed_origin_cache = AllowedOriginCache(
+    maxsize=get_settings().allowed_origin_cache_size,
+    ttl=get_settings().allowed_origin_cache_ttl,
+    negative_ttl=get_settings().allowed_origin_negative_cache_ttl,
+    redis=redis_client,
+)
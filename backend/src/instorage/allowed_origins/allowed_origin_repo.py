@@ -2,6 +2,7 @@ from uuid import UUID
 
 import sqlalchemy as sa
 
+from instorage.allowed_origins.allowed_origin_cache import allowed_origin_cache
 from instorage.allowed_origins.allowed_origin_models import AllowedOriginInDB
 from instorage.database.database import AsyncSession
 from instorage.database.repositories.base import BaseRepositoryDelegate
@@ -13,6 +14,7 @@ class AllowedOriginRepository:
         self.delegate = BaseRepositoryDelegate(
             session=session, table=AllowedOrigins, in_db_model=AllowedOriginInDB
         )
+        self.session = session
 
     async def add_origins(self, origins: list[str], tenant_id: UUID):
         stmt = (
@@ -21,6 +23,9 @@ class AllowedOriginRepository:
             .returning(AllowedOrigins)
         )
 
+        for origin in origins:
+            allowed_origin_cache.invalidate_on_commit(self.session, origin)
+
         return await self.delegate.get_models_from_query(stmt)
 
     async def add_origin(self, origin: str, tenant_id: UUID):
@@ -29,6 +34,7 @@ class AllowedOriginRepository:
             .values(url=origin, tenant_id=tenant_id)
             .returning(AllowedOrigins)
         )
+        allowed_origin_cache.invalidate_on_commit(self.session, origin)
 
         return await self.delegate.get_model_from_query(stmt)
 
@@ -46,4 +52,9 @@ class AllowedOriginRepository:
         )
 
     async def delete(self, id: UUID):
-        return await self.delegate.delete(id)
+        allowed_origin = await self.delegate.delete(id)
+
+        if allowed_origin is not None:
+            allowed_origin_cache.invalidate_on_commit(self.session, allowed_origin.url)
+
+        return allowed_origin
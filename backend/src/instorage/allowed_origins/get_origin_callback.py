@@ -1,3 +1,4 @@
+from instorage.allowed_origins.allowed_origin_cache import allowed_origin_cache
 from instorage.allowed_origins.allowed_origin_repo import AllowedOriginRepository
 from instorage.database.database import sessionmanager
 from instorage.main.logging import get_logger
@@ -5,7 +6,7 @@ from instorage.main.logging import get_logger
 logger = get_logger(__name__)
 
 
-async def get_origin(origin: str):
+async def _get_origin_from_db(origin: str):
     async with sessionmanager.session() as session, session.begin():
         repo = AllowedOriginRepository(session)
         origin = await repo.get_origin(origin)
@@ -15,3 +16,7 @@ async def get_origin(origin: str):
         )
 
         return origin is not None
+
+
+async def get_origin(origin: str):
+    return await allowed_origin_cache.is_allowed(origin, _get_origin_from_db)
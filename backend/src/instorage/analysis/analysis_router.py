@@ -16,11 +16,13 @@ from instorage.analysis.analysis import (
     MetadataStatistics,
 )
 from instorage.analysis.analysis_service import AnalysisService
+from instorage.main.exceptions import BadRequestException
 from instorage.main.logging import get_logger
 from instorage.main.models import PaginatedResponse
 from instorage.questions import question_protocol
 from instorage.questions.question import Message
 from instorage.server import protocol
+from instorage.usage.usage import UsageDimension, UsageStatistics
 
 logger = get_logger(__name__)
 
@@ -51,6 +53,35 @@ async def get_metadata(
     )
 
 
+@router.get("/token-usage/", response_model=PaginatedResponse[UsageStatistics])
+async def get_token_usage(
+    dimension: UsageDimension = UsageDimension.USER,
+    days_since: int = Query(ge=0, le=365, default=30),
+    from_date: date | None = None,
+    to_date: date | None = None,
+    service: AnalysisService = Depends(analysis_factory.get_analysis_service),
+):
+    """Questions and tokens per user, assistant or completion model, or for the
+    whole tenant, from `from_date` to `to_date`. Read from daily rollups, most
+    used first.
+
+    `to_date` defaults to today, and `from_date` to `days_since` days before
+    `to_date`."""
+    if to_date is None:
+        to_date = date.today()
+    if from_date is None:
+        from_date = to_date - timedelta(days=days_since)
+
+    if from_date > to_date:
+        raise BadRequestException("'from_date' can not be after 'to_date'")
+
+    usage = await service.get_token_usage(
+        dimension=dimension, start_date=from_date, end_date=to_date
+    )
+
+    return protocol.to_paginated_response(usage)
+
+
 @router.get("/assistants/{assistant_id}/", response_model=PaginatedResponse[Message])
 async def get_most_recent_questions(
     assistant_id: UUID,
@@ -16,6 +16,8 @@ from instorage.questions.questions_repo import QuestionRepository
 from instorage.roles.permissions import Permission, validate_permissions
 from instorage.sessions.sessions_repo import SessionRepository
 from instorage.spaces.space_service import SpaceService
+from instorage.usage.usage import UsageDimension
+from instorage.usage.usage_repo import UsageRepository
 from instorage.users.user import UserInDB
 
 logger = get_logger(__name__)
@@ -30,6 +32,7 @@ class AnalysisService:
         question_repo: QuestionRepository,
         session_repo: SessionRepository,
         space_service: SpaceService,
+        usage_repo: UsageRepository,
         completion_service: CompletionService = None,
     ):
         self.user = user
@@ -39,6 +42,7 @@ class AnalysisService:
         self.question_repo = question_repo
         self.completion_service = completion_service
         self.space_service = space_service
+        self.usage_repo = usage_repo
 
     @validate_permissions(Permission.INSIGHTS)
     async def get_tenant_counts(self):
@@ -72,6 +76,17 @@ class AnalysisService:
 
         return assistants, sessions, questions
 
+    @validate_permissions(Permission.INSIGHTS)
+    async def get_token_usage(
+        self, dimension: UsageDimension, start_date: date, end_date: date
+    ):
+        return await self.usage_repo.get_by_tenant(
+            self.user.tenant_id,
+            dimension=dimension,
+            start_date=start_date,
+            end_date=end_date,
+        )
+
     async def _check_space_permissions(self, space_id: UUID):
         space = await self.space_service.get_space(space_id)
         if space.is_personal() and Permission.INSIGHTS not in self.user.permissions:
@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import AsyncIterable, Optional
 from uuid import UUID
 
@@ -11,7 +12,7 @@ from instorage.ai_models.completion_models.completion_model import (
 from instorage.ai_models.embedding_models.embedding_model import EmbeddingModel
 from instorage.files.file_models import File
 from instorage.groups.group import GroupInDBBase, GroupSparse
-from instorage.info_blobs.info_blob import InfoBlobInDBNoText
+from instorage.info_blobs.info_blob import InfoBlobPublicNoText
 from instorage.main.config import get_settings
 from instorage.main.models import (
     BaseModel,
@@ -92,10 +93,19 @@ class AssistantPublicBase(InDB):
     space_id: Optional[UUID] = None
 
 
+class StreamFormat(str, Enum):
+    # Every event is a whole AskResponse, with the next token as the answer
+    FULL = "full"
+    # A `header` event with everything but the answer, then a `delta` event
+    # with each token
+    DELTA = "delta"
+
+
 class AskAssistant(BaseModel):
     question: str
     files: list[ModelId] = Field(max_length=get_settings().max_in_question, default=[])
     stream: bool = False
+    stream_format: StreamFormat = StreamFormat.FULL
 
 
 class AssistantResponse(BaseModel):
@@ -103,7 +113,7 @@ class AssistantResponse(BaseModel):
     question: str
     files: list[File]
     answer: str | AsyncIterable[str]
-    info_blobs: list[InfoBlobInDBNoText]
+    info_blobs: list[InfoBlobPublicNoText]
     completion_model: Optional[CompletionModel] = None
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -3,17 +3,23 @@ from typing import Optional
 from sse_starlette import EventSourceResponse
 
 from instorage.ai_models.completion_models.completion_model import CompletionModel
-from instorage.assistants.api.assistant_models import AskAssistant
+from instorage.assistants.api.assistant_models import (
+    AskAssistant,
+    AssistantResponse,
+    StreamFormat,
+)
 from instorage.database.database import AsyncSession
 from instorage.database.transaction import gen_transaction
 from instorage.files.file_models import File, FilePublic
-from instorage.info_blobs.info_blob import (
-    InfoBlobInDB,
-    InfoBlobMetadata,
-    InfoBlobPublicNoText,
-)
+from instorage.info_blobs.info_blob import InfoBlobPublicNoText
 from instorage.main.logging import get_logger
-from instorage.sessions.session import AskResponse, SessionInDB
+from instorage.server.protocol.sse import FieldEventEncoder, encode_event
+from instorage.sessions.session import (
+    AskResponse,
+    AskResponseDelta,
+    AskResponseHeader,
+    SessionInDB,
+)
 from instorage.workflows.assistant_guard_runner import AssistantGuardRunner
 
 logger = get_logger(__name__)
@@ -24,7 +30,7 @@ def to_ask_reponse(
     files: list[File],
     session: SessionInDB,
     answer: str,
-    info_blobs: list[InfoBlobInDB],
+    info_blobs: list[InfoBlobPublicNoText],
     completion_model: Optional[CompletionModel] = None,
 ):
     return AskResponse(
@@ -32,17 +38,50 @@ def to_ask_reponse(
         files=[FilePublic(**file.model_dump()) for file in files],
         session_id=session.id,
         answer=answer,
-        references=[
-            InfoBlobPublicNoText(
-                **blob.model_dump(),
-                metadata=InfoBlobMetadata(**blob.model_dump()),
-            )
-            for blob in info_blobs
-        ],
+        references=info_blobs,
         model=completion_model,
     )
 
 
+def to_ask_response_header(response: AssistantResponse):
+    return AskResponseHeader(
+        question=response.question,
+        files=[FilePublic(**file.model_dump()) for file in response.files],
+        session_id=response.session.id,
+        references=response.info_blobs,
+        model=response.completion_model,
+    )
+
+
+async def stream_full_responses(response: AssistantResponse):
+    # Every event is the same response with another answer, so it is only
+    # serialised once
+    encoder = FieldEventEncoder(
+        to_ask_reponse(
+            question=response.question,
+            files=response.files,
+            session=response.session,
+            answer="",
+            info_blobs=response.info_blobs,
+            completion_model=response.completion_model,
+        ),
+        field="answer",
+    )
+
+    async for chunk in response.answer:
+        yield encoder.encode(chunk)
+
+
+async def stream_deltas(response: AssistantResponse):
+    yield encode_event(
+        to_ask_response_header(response).model_dump_json().encode(), event="header"
+    )
+
+    encoder = FieldEventEncoder(AskResponseDelta(answer=""), "answer", event="delta")
+    async for chunk in response.answer:
+        yield encoder.encode(chunk)
+
+
 async def ask_assistant(
     ask: AskAssistant,
     runner: AssistantGuardRunner,
@@ -54,17 +93,15 @@ async def ask_assistant(
             ask.question, file_ids=ask.files, session=session, stream=True
         )
 
+        if ask.stream_format == StreamFormat.DELTA:
+            stream_events = stream_deltas
+        else:
+            stream_events = stream_full_responses
+
         @gen_transaction(db_session)
         async def event_stream():
-            async for chunk in response.answer:
-                yield to_ask_reponse(
-                    question=response.question,
-                    files=response.files,
-                    session=response.session,
-                    answer=chunk,
-                    info_blobs=response.info_blobs,
-                    completion_model=response.completion_model,
-                ).model_dump_json()
+            async for event in stream_events(response):
+                yield event
 
         return EventSourceResponse(event_stream())
 
@@ -162,7 +162,12 @@ async def ask_assistant(
     runner: AssistantGuardRunner = Depends(get_assistant_guard_runner),
     db_session: AsyncSession = Depends(get_session),
 ):
-    """Streams the response as Server-Sent Events if stream == true"""
+    """Streams the response as Server-Sent Events if stream == true.
+
+    By default every event is a whole response, with the next part of the
+    answer. With stream_format == "delta" the first event is a `header`, with
+    everything but the answer, and the rest are `delta` events with the next
+    part of the answer only."""
 
     return await assistant_protocol.ask_assistant(
         ask=ask, runner=runner, db_session=db_session
@@ -233,8 +238,16 @@ async def ask_followup(
     ),
     db_session: AsyncSession = Depends(get_session),
 ):
-    """Streams the response as Server-Sent Events if stream == true"""
-    session = await session_service.get_session_by_uuid(session_id, assistant_id=id)
+    """Streams the response as Server-Sent Events if stream == true.
+
+    By default every event is a whole response, with the next part of the
+    answer. With stream_format == "delta" the first event is a `header`, with
+    everything but the answer, and the rest are `delta` events with the next
+    part of the answer only."""
+    # The runner loads as much of the history as the model can take
+    session = await session_service.get_session_by_uuid(
+        session_id, assistant_id=id, with_questions=False
+    )
 
     return await assistant_protocol.ask_assistant(
         ask=ask, runner=runner, db_session=db_session, session=session
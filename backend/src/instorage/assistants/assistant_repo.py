@@ -18,6 +18,7 @@ from instorage.database.tables.users_table import Users
 from instorage.database.tables.websites_table import CrawlRuns, Websites
 from instorage.database.tables.workflow_tables import assistants_steps_guardrails_table
 from instorage.groups.group import GroupSparse
+from instorage.users.principal_cache import principal_cache
 from instorage.websites.website_models import WebsiteSparse
 
 
@@ -212,6 +213,9 @@ class AssistantRepository:
         query = sa.delete(Assistants).where(Assistants.id == id)
         await self.session.execute(query)
 
+        # The api key of the assistant is deleted with it
+        principal_cache.invalidate_on_commit(self.session)
+
     async def add_guard(self, guard_step_id: UUID, assistant_id: UUID):
         stmt = sa.insert(assistants_steps_guardrails_table).values(
             assistant_id=assistant_id, step_id=guard_step_id
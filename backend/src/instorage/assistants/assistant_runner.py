@@ -1,21 +1,34 @@
 from typing import Optional
 
 from instorage.ai_models.ai_models_service import AIModelsService
-from instorage.ai_models.completion_models.completion_service import (
-    CompletionService,
-    count_tokens,
-)
+from instorage.ai_models.completion_models.completion_service import CompletionService
 from instorage.ai_models.embedding_models.datastore.datastore import Datastore
+from instorage.ai_models.embedding_models.embedding_model_adapters.base import (
+    DEFAULT_MAX_INPUT,
+)
+from instorage.ai_models.tokenizers import (
+    TiktokenTokenizer,
+    get_encoding_for_embedding_model,
+)
 from instorage.assistants.api.assistant_models import AssistantResponse
 from instorage.assistants.assistant import Assistant
+from instorage.assistants.retrieval_query import RetrievalQuery, RetrievalQueryBuilder
 from instorage.files.file_models import FileType
 from instorage.files.file_service import FileService
 from instorage.groups.group import GroupInDB
-from instorage.info_blobs.info_blob import InfoBlobChunkInDBWithScore, InfoBlobInDB
+from instorage.info_blobs.info_blob import (
+    InfoBlobChunkInDBWithScore,
+    InfoBlobPublicNoText,
+)
+from instorage.info_blobs.info_blob_protocol import to_info_blob_public_no_text
 from instorage.info_blobs.info_blob_repo import InfoBlobRepository
+from instorage.main.concurrency import gather_or_cancel
+from instorage.main.config import get_settings
 from instorage.main.exceptions import BadRequestException
 from instorage.main.logging import get_logger
 from instorage.main.models import ModelId
+from instorage.main.timing import StageTimer
+from instorage.questions.question import Question
 from instorage.services.service import DatastoreResult
 from instorage.sessions.session import SessionInDB
 from instorage.sessions.session_service import SessionService
@@ -34,31 +47,86 @@ class RunnerDelegate:
         self.info_blobs_repo = info_blobs_repo
         self.datastore = datastore
 
+    def build_retrieval_query(
+        self, question: str, session: Optional[SessionInDB] = None
+    ) -> RetrievalQuery:
+        model = self.datastore.model_adapter.model
+        tokenizer = TiktokenTokenizer(get_encoding_for_embedding_model(model))
+        builder = RetrievalQueryBuilder(
+            max_tokens=min(
+                get_settings().retrieval_query_max_tokens,
+                model.max_input or DEFAULT_MAX_INPUT,
+            ),
+            count_tokens=tokenizer.count_tokens,
+        )
+
+        history = session.questions if session is not None else []
+        return builder.build(question, history)
+
+    async def embed_query(
+        self,
+        query: RetrievalQuery,
+        groups: list[GroupInDB],
+        websites: list[Website] = [],
+    ) -> Optional[list[float]]:
+        if (groups or websites) and query.text:
+            return await self.datastore.embed_conversation(
+                query.turns, decay=get_settings().retrieval_query_history_decay
+            )
+
     async def _query_datastore_if_groups_or_websites(
         self,
         input_string: str,
         groups: list[GroupInDB],
         websites: list[Website],
+        embedding: Optional[list[float]] = None,
     ):
-        if (groups or websites) and input_string:
-            info_blob_chunks = await self.datastore.semantic_search(
-                input_string, groups, websites, autocut_cutoff=3
+        if (groups or websites) and (input_string or embedding is not None):
+            if get_settings().using_hybrid_search:
+                search = self.datastore.hybrid_search
+            else:
+                search = self.datastore.semantic_search
+
+            info_blob_chunks = await search(
+                input_string,
+                groups,
+                websites,
+                autocut_cutoff=3,
+                embedding=embedding,
             )
 
             return info_blob_chunks
 
         return []
 
+    @staticmethod
+    def _get_carried_over_chunks(
+        previous_chunks: list[InfoBlobChunkInDBWithScore],
+        chunks: list[InfoBlobChunkInDBWithScore],
+    ):
+        found = {chunk.id for chunk in chunks}
+        return [chunk for chunk in previous_chunks if chunk.id not in found][
+            : get_settings().retrieval_carried_over_chunks
+        ]
+
     async def _get_info_blobs_from_chunks(
         self, info_blob_chunks: list[InfoBlobChunkInDBWithScore]
-    ):
-        info_blobs = []
-        for chunk in info_blob_chunks:
-            info_blob = await self.info_blobs_repo.get(chunk.info_blob_id)
+    ) -> list[InfoBlobPublicNoText]:
+        if not info_blob_chunks:
+            return []
 
-            info_blobs.append(info_blob)
+        info_blob_ids = [chunk.info_blob_id for chunk in info_blob_chunks]
+        info_blobs = {
+            info_blob.id: info_blob
+            for info_blob in await self.info_blobs_repo.get_by_ids(info_blob_ids)
+        }
 
-        return info_blobs
+        # Keep the order of the chunks, which is by score
+        return [
+            to_info_blob_public_no_text(info_blobs[id])
+            for id in info_blob_ids
+            if id in info_blobs
+        ]
 
     def _get_info_blob_chunks_without_duplicates(
         self, info_blob_chunks: list[InfoBlobChunkInDBWithScore]
@@ -77,7 +145,7 @@ class RunnerDelegate:
     def _remove_chunks_without_info_blob(
         self,
         info_blob_chunks: list[InfoBlobChunkInDBWithScore],
-        info_blobs: list[InfoBlobInDB],
+        info_blobs: list[InfoBlobPublicNoText],
     ):
         info_blob_ids = {blob.id for blob in info_blobs}
         return [
@@ -89,10 +157,22 @@ class RunnerDelegate:
         input_string: str,
         groups: list[GroupInDB],
         websites: list[Website] = [],
+        embedding: Optional[list[float]] = None,
+        previous_question: Optional[Question] = None,
     ):
         chunks = await self._query_datastore_if_groups_or_websites(
-            input_string, groups, websites
+            input_string, groups, websites, embedding=embedding
         )
+
+        previous_chunks = []
+        if previous_question is not None and (groups or websites):
+            previous_chunks = await self.datastore.get_referenced_chunks(
+                previous_question.id, groups, websites, embedding=embedding
+            )
+
+        # The best of what was found for the question before, that was not
+        # found again, keeps a follow-up on the same subject grounded
+        chunks = chunks + self._get_carried_over_chunks(previous_chunks, chunks)
         no_duplicate_chunks = self._get_info_blob_chunks_without_duplicates(chunks)
         info_blobs = await self._get_info_blobs_from_chunks(no_duplicate_chunks)
 
@@ -102,20 +182,6 @@ class RunnerDelegate:
             info_blobs=info_blobs,
         )
 
-    def concatenate_conversation(self, session: Optional[SessionInDB], question: str):
-        if session is None:
-            return question
-
-        conversation_string = (
-            "\n".join(
-                "\n".join((question.question, question.answer))
-                for question in session.questions
-            )
-            + f"\n{question}"
-        )
-
-        return conversation_string.strip()
-
 
 class AssistantRunner:
     def __init__(
@@ -143,7 +209,9 @@ class AssistantRunner:
             )
 
         if self.assistant.space_id is not None:
-            space = await self.space_service.get_space(self.assistant.space_id)
+            space = await self.space_service.get_space_models_snapshot(
+                self.assistant.space_id
+            )
 
             if (
                 self.assistant.completion_model.id
@@ -169,12 +237,21 @@ class AssistantRunner:
         stream: bool = True,
         datastore_result: DatastoreResult | None = None,
     ) -> AssistantResponse:
-        await self._check_assistant_models()
+        timer = StageTimer(
+            f"Assistant {self.assistant.id}",
+            budget=get_settings().time_to_first_token_budget,
+        )
+
+        with timer.stage("files"):
+            files = await self.file_service.get_files_by_ids(file_ids)
 
-        files = await self.file_service.get_files_by_ids(file_ids)
+        if session is not None:
+            with timer.stage("history"):
+                session.questions = await self.session_service.get_history(
+                    session, max_tokens=self.completion_service.get_max_tokens()
+                )
 
         if datastore_result is None:
-            # Embed the whole conversation
             if files:
                 files_text = "\n".join(
                     file.text for file in files if file.file_type == FileType.TEXT
@@ -183,26 +260,54 @@ class AssistantRunner:
             else:
                 search_query = question
 
-            concatenated_convo = self.delegate.concatenate_conversation(
-                session=session,
-                question=search_query,
+            # The question and the latest turns before it are embedded one by
+            # one, turns embedded for earlier questions are found cached
+            retrieval_query = self.delegate.build_retrieval_query(
+                search_query, session=session
             )
-            datastore_result = await self.delegate.get_references(
-                input_string=concatenated_convo,
-                groups=self.assistant.groups,
-                websites=self.assistant.websites,
+
+            # The checks only use the database and the embedding only the embedding
+            # model, so they can overlap
+            with timer.stage("checks and query embedding"):
+                _, embedding = await gather_or_cancel(
+                    self._check_assistant_models(),
+                    self.delegate.embed_query(
+                        retrieval_query,
+                        groups=self.assistant.groups,
+                        websites=self.assistant.websites,
+                    ),
+                )
+
+            # What the question before was answered from, as saved with it
+            previous_question = (
+                session.questions[-1]
+                if session is not None and session.questions
+                else None
             )
 
-        ai_response = await self.completion_service.get_response(
-            question=question,
-            files=files,
-            prompt=self.assistant.prompt,
-            info_blob_chunks=datastore_result.chunks,
-            session=session,
-            stream=stream,
-            extended_logging=self.assistant.logging_enabled,
-            model_kwargs=self.assistant.completion_model_kwargs,
-        )
+            with timer.stage("retrieval"):
+                datastore_result = await self.delegate.get_references(
+                    input_string=retrieval_query.question,
+                    groups=self.assistant.groups,
+                    websites=self.assistant.websites,
+                    embedding=embedding,
+                    previous_question=previous_question,
+                )
+        else:
+            with timer.stage("checks"):
+                await self._check_assistant_models()
+
+        with timer.stage("completion request"):
+            ai_response = await self.completion_service.get_response(
+                question=question,
+                files=files,
+                prompt=self.assistant.prompt,
+                info_blob_chunks=datastore_result.chunks,
+                session=session,
+                stream=stream,
+                extended_logging=self.assistant.logging_enabled,
+                model_kwargs=self.assistant.completion_model_kwargs,
+            )
 
         if session is None:
             # Set name of session to question or files names
@@ -210,9 +315,10 @@ class AssistantRunner:
             if not name and files:
                 name = " ".join(file.name for file in files)
 
-            session = await self.session_service.create_session(
-                name=name, assistant=self.assistant
-            )
+            with timer.stage("session"):
+                session = await self.session_service.create_session(
+                    name=name, assistant=self.assistant
+                )
 
         if stream:
 
@@ -220,15 +326,21 @@ class AssistantRunner:
                 response = []
 
                 async for chunk in ai_response.completion:
+                    if not response:
+                        timer.log("first token")
+
                     yield chunk
                     response.append(chunk)
 
                 response_string = "".join(response)
-                total_response_tokens = count_tokens(response_string)
+                total_response_tokens = self.completion_service.count_tokens(
+                    response_string
+                )
                 await self.session_service.add_question_to_session(
                     question=question,
                     answer=response_string,
-                    num_tokens_question=ai_response.total_token_count,
+                    num_tokens_question=ai_response.input_token_count,
+                    input_tokens=ai_response.total_token_count,
                     num_tokens_answer=total_response_tokens,
                     files=files,
                     completion_model=self.assistant.completion_model,
@@ -240,12 +352,14 @@ class AssistantRunner:
             answer = response_stream()
 
         else:
+            timer.log("answer")
             answer = ai_response.completion
-            total_response_tokens = count_tokens(answer)
+            total_response_tokens = self.completion_service.count_tokens(answer)
             await self.session_service.add_question_to_session(
                 question=question,
                 answer=answer,
-                num_tokens_question=ai_response.total_token_count,
+                num_tokens_question=ai_response.input_token_count,
+                input_tokens=ai_response.total_token_count,
                 num_tokens_answer=total_response_tokens,
                 files=files,
                 completion_model=self.assistant.completion_model,
@@ -0,0 +1,45 @@
+from typing import Callable
+
+from pydantic import BaseModel
+
+from instorage.questions.question import Question
+
+
+class RetrievalQuery(BaseModel):
+    # Oldest first, the last turn is the new question
+    turns: list[str]
+
+    @property
+    def question(self):
+        return self.turns[-1]
+
+    @property
+    def text(self):
+        return "\n".join(self.turns).strip()
+
+
+class RetrievalQueryBuilder:
+    """Builds what is searched for a question: the question itself and as much
+    of the conversation before it as fits in `max_tokens`, newest first.
+
+    Each previous question and its answer make up one turn. The question is
+    always kept, however long it is."""
+
+    def __init__(self, max_tokens: int, count_tokens: Callable[[str], int]):
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+
+    def build(self, question: str, history: list[Question] = []) -> RetrievalQuery:
+        turns = [question]
+        budget = self.max_tokens - self.count_tokens(question)
+
+        # Only the turns that are kept, and the one that does not fit, are counted
+        for previous in reversed(history):
+            turn = f"{previous.question}\n{previous.answer}".strip()
+            budget -= self.count_tokens(turn)
+            if budget < 0:
+                break
+
+            turns.append(turn)
+
+        return RetrievalQuery(turns=turns[::-1])
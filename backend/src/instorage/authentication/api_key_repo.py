@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from instorage.authentication.auth_models import ApiKey, ApiKeyInDB
 from instorage.database.repositories.base import BaseRepositoryDelegate
 from instorage.database.tables.api_keys_table import ApiKeys
+from instorage.users.principal_cache import principal_cache
 
 
 class ApiKeysRepository:
@@ -28,14 +29,20 @@ class ApiKeysRepository:
         user_id: UUID = None,
         assistant_id: int = None,
     ):
+        if user_id is not None:
+            principal_cache.invalidate_on_commit(self.session, user_id=user_id)
+
         return await self.delegate.add(
             api_key, user_id=user_id, assistant_id=assistant_id
         )
 
     async def delete_by_user(self, user_id: UUID):
+        principal_cache.invalidate_on_commit(self.session, user_id=user_id)
         stmt = sa.delete(ApiKeys).where(ApiKeys.user_id == user_id)
         await self.session.execute(stmt)
 
     async def delete_by_assistant(self, assistant_id: int):
+        # Entries are not kept per assistant, and keys are rarely replaced
+        principal_cache.invalidate_on_commit(self.session)
         stmt = sa.delete(ApiKeys).where(ApiKeys.assistant_id == assistant_id)
         await self.session.execute(stmt)
@@ -1,6 +1,8 @@
 import contextlib
 from typing import AsyncIterator
 
+from pgvector.utils import from_db, from_db_binary, to_db_binary
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncEngine,
@@ -14,6 +16,31 @@ from instorage.main.logging import get_logger
 logger = get_logger(__name__)
 
 
+def _encode_vector(value):
+    # Values bound through the Vector column type arrive already rendered as text
+    if isinstance(value, str):
+        value = from_db(value)
+
+    return to_db_binary(value)
+
+
+async def _register_vector_codec(connection):
+    # Binary COPY of chunks needs a binary codec for the pgvector type
+    try:
+        await connection.set_type_codec(
+            "vector",
+            encoder=_encode_vector,
+            decoder=from_db_binary,
+            format="binary",
+        )
+    except ValueError:
+        logger.warning("The vector type does not exist, is pgvector installed?")
+
+
+def _on_connect(dbapi_connection, connection_record):
+    dbapi_connection.run_async(_register_vector_codec)
+
+
 class DatabaseSessionManager:
     def __init__(self):
         self._engine: AsyncEngine | None = None
@@ -21,6 +48,7 @@ class DatabaseSessionManager:
 
     def init(self, host: str):
         self._engine = create_async_engine(host, pool_size=20, max_overflow=10)
+        event.listen(self._engine.sync_engine, "connect", _on_connect)
         self._sessionmaker = async_sessionmaker(autocommit=False, bind=self._engine)
         logger.debug(f"Database connected to {host}")
 
@@ -43,6 +71,14 @@ class DatabaseSessionManager:
                 await connection.rollback()
                 raise
 
+    @contextlib.asynccontextmanager
+    async def autocommit_connect(self) -> AsyncIterator[AsyncConnection]:
+        if self._engine is None:
+            raise Exception("DatabaseSessionManager is not initialized")
+
+        async with self._engine.connect() as connection:
+            yield await connection.execution_options(isolation_level="AUTOCOMMIT")
+
     @contextlib.asynccontextmanager
     async def session(self) -> AsyncIterator[AsyncSession]:
         if self._sessionmaker is None:
@@ -18,6 +18,7 @@ import instorage.database.tables.sessions_table
 import instorage.database.tables.settings_table
 import instorage.database.tables.spaces_table
 import instorage.database.tables.tenant_table
+import instorage.database.tables.usage_table
 import instorage.database.tables.user_groups_table
 import instorage.database.tables.users_table
 import instorage.database.tables.websites_table
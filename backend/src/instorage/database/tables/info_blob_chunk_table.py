@@ -1,12 +1,21 @@
+from typing import Optional
 from uuid import UUID
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import ForeignKey
+from sqlalchemy import Computed, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 
+from instorage.database.tables.ai_models_table import EmbeddingModels
 from instorage.database.tables.base_class import BasePublic
+from instorage.database.tables.groups_table import Groups
 from instorage.database.tables.info_blobs_table import InfoBlobs
 from instorage.database.tables.tenant_table import Tenants
+from instorage.database.tables.websites_table import Websites
+
+# 'simple' does no stemming or stop-word removal, which keeps exact terms such as
+# case numbers and paragraph ids intact regardless of the language of the document
+TEXT_SEARCH_CONFIG = "simple"
 
 
 class InfoBlobChunks(BasePublic):
@@ -14,6 +23,11 @@ class InfoBlobChunks(BasePublic):
     chunk_no: Mapped[int] = mapped_column()
     size: Mapped[int] = mapped_column()
     embedding: Mapped[list[float]] = mapped_column(Vector)
+    text_search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', text)", persisted=True),
+        deferred=True,
+    )
 
     # Foreign keys
     info_blob_id: Mapped[UUID] = mapped_column(
@@ -22,3 +36,25 @@ class InfoBlobChunks(BasePublic):
     tenant_id: Mapped[UUID] = mapped_column(
         ForeignKey(Tenants.id, ondelete="CASCADE"), index=True
     )
+
+    # Denormalised from info_blobs so that vector search can filter without a join.
+    # An info blob never moves to another group or website, nor changes embedding
+    # model, so these are only written with the chunks. A blob that could move
+    # would need its chunks updated in the same transaction
+    group_id: Mapped[Optional[UUID]] = mapped_column(
+        ForeignKey(Groups.id, ondelete="CASCADE"), index=True
+    )
+    website_id: Mapped[Optional[UUID]] = mapped_column(
+        ForeignKey(Websites.id, ondelete="CASCADE"), index=True
+    )
+    embedding_model_id: Mapped[Optional[UUID]] = mapped_column(
+        ForeignKey(EmbeddingModels.id, ondelete="SET NULL"), index=True
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_info_blob_chunks_text_search_vector",
+            "text_search_vector",
+            postgresql_using="gin",
+        ),
+    )
@@ -3,6 +3,7 @@ from typing import Optional
 from uuid import UUID
 
 from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from instorage.database.tables.base_class import BasePublic
@@ -16,3 +17,6 @@ class Jobs(BasePublic):
     result_location: Mapped[Optional[str]] = mapped_column()
     name: Mapped[Optional[str]] = mapped_column()
     finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    # Of a service batch that waits on the provider's batch interface
+    provider_batch_id: Mapped[Optional[str]] = mapped_column()
+    provider_batch: Mapped[Optional[dict]] = mapped_column(JSONB)
@@ -19,7 +19,9 @@ from instorage.database.tables.tenant_table import Tenants
 class Questions(BasePublic):
     question: Mapped[str] = mapped_column()
     answer: Mapped[str] = mapped_column()
-    num_tokens_question: Mapped[int] = mapped_column()
+    # Only the question's own tokens, NULL on older rows that held those of the
+    # whole prompt
+    num_tokens_question: Mapped[Optional[int]] = mapped_column()
     num_tokens_answer: Mapped[int] = mapped_column()
 
     # Foreign keys
@@ -0,0 +1,24 @@
+from datetime import date
+from uuid import UUID
+
+from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from instorage.database.tables.base_class import BaseCrossReference
+from instorage.database.tables.tenant_table import Tenants
+
+
+class UsageRollups(BaseCrossReference):
+    """Questions and tokens per day, summed up per tenant, user, assistant and
+    completion model. `dimension_id` is the id of the one that `dimension` names."""
+
+    day: Mapped[date] = mapped_column(primary_key=True)
+    tenant_id: Mapped[UUID] = mapped_column(
+        ForeignKey(Tenants.id, ondelete="CASCADE"), primary_key=True
+    )
+    dimension: Mapped[str] = mapped_column(primary_key=True)
+    dimension_id: Mapped[UUID] = mapped_column(primary_key=True)
+
+    questions: Mapped[int] = mapped_column(BigInteger, default=0)
+    input_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    output_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
@@ -0,0 +1,59 @@
+from typing import Optional
+from uuid import UUID
+
+import sqlalchemy as sa
+
+# Embeddings from different models have different dimensions, so the embedding
+# column is untyped. HNSW requires a fixed dimension, which is why each embedding
+# model gets its own partial index over the embedding cast to that dimension.
+# Queries must use the same cast and the same predicate for the index to be used.
+
+INDEX_PREFIX = "ix_info_blob_chunks_embedding_hnsw"
+
+# Iterative index scans came with pgvector 0.8
+ITERATIVE_SCAN_VERSION = (0, 8)
+
+
+class Pgvector:
+    """The version of pgvector installed, read at startup. Until then the one
+    required in docs/deployment.md is assumed."""
+
+    def __init__(self):
+        self.version: Optional[tuple[int, ...]] = None
+
+    def set_version(self, version: str):
+        self.version = tuple(int(part) for part in version.split("."))
+
+    @property
+    def supports_iterative_scan(self):
+        return self.version is None or self.version >= ITERATIVE_SCAN_VERSION
+
+
+pgvector = Pgvector()
+
+
+def vector_index_name(embedding_model_id: UUID) -> str:
+    return f"{INDEX_PREFIX}_{embedding_model_id.hex}"
+
+
+def create_vector_index_statement(embedding_model_id: UUID, dimensions: int):
+    return sa.text(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+        f"{vector_index_name(embedding_model_id)} ON info_blob_chunks "
+        f"USING hnsw ((embedding::vector({int(dimensions)})) vector_cosine_ops) "
+        f"WHERE embedding_model_id = '{embedding_model_id}'"
+    )
+
+
+def drop_vector_index_statement(index_name: str):
+    return sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def is_vector_index_valid_statement(index_name: str):
+    """Whether the index exists and is valid, which it is not if its build was
+    cut short."""
+    return sa.text(
+        "SELECT i.indisvalid FROM pg_index AS i "
+        "JOIN pg_class AS c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name"
+    ).bindparams(name=index_name)
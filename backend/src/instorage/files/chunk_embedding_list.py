@@ -1,34 +1,84 @@
-import tempfile
 from collections.abc import Iterator
-from typing import Tuple
+from typing import Optional, Tuple
 
 import numpy as np
 
 from instorage.info_blobs.info_blob import InfoBlobChunk
 from instorage.main.exceptions import ChunkEmbeddingMisMatchException
 
+EMBEDDING_DTYPE = np.float32
+
 
 class ChunkEmbeddingList:
-    def __init__(self):
-        self._file = tempfile.TemporaryFile()
-        self._chunks = []
+    """Chunks and their embeddings, with the embeddings stored row by row in one
+    float32 matrix of shape (number of chunks, dimensions).
+
+    Pass `capacity` when the number of chunks is known up front, so that the
+    matrix is allocated once. Rows and batches handed out are views into it."""
+
+    def __init__(self, capacity: int = 0):
+        self._capacity = capacity
+        self._chunks: list[InfoBlobChunk] = []
+        self._embeddings: Optional[np.ndarray] = None
+
+    def _reserve(self, num_rows: int, dimensions: int):
+        if self._embeddings is None:
+            capacity = max(self._capacity, num_rows)
+            self._embeddings = np.empty((capacity, dimensions), dtype=EMBEDDING_DTYPE)
+            return
+
+        if self._embeddings.shape[1] != dimensions:
+            raise ChunkEmbeddingMisMatchException(
+                f"Embedding dimensions: {dimensions},"
+                f" expected: {self._embeddings.shape[1]}"
+            )
+
+        if num_rows > len(self._embeddings):
+            capacity = max(num_rows, 2 * len(self._embeddings))
+            embeddings = np.empty((capacity, dimensions), dtype=EMBEDDING_DTYPE)
+            embeddings[: len(self)] = self._embeddings[: len(self)]
+            self._embeddings = embeddings
 
-    def add(self, chunks: list[InfoBlobChunk], embeddings: list[list[float]]):
+    def add(
+        self,
+        chunks: list[InfoBlobChunk],
+        embeddings: list[list[float]] | np.ndarray,
+    ):
         if len(chunks) != len(embeddings):
             raise ChunkEmbeddingMisMatchException(
                 f"Number of chunks: {len(chunks)}, Number of embeddings: {len(embeddings)}"
             )
 
+        if not chunks:
+            return
+
+        embeddings = np.asarray(embeddings, dtype=EMBEDDING_DTYPE)
+
+        start = len(self)
+        self._reserve(start + len(chunks), embeddings.shape[1])
+        self._embeddings[start : start + len(chunks)] = embeddings
         self._chunks.extend(chunks)
 
-        for embedding in embeddings:
-            np.save(self._file, embedding)
+    @property
+    def chunks(self) -> list[InfoBlobChunk]:
+        return self._chunks
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        if self._embeddings is None:
+            return np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+
+        return self._embeddings[: len(self)]
 
-    def __iter__(self) -> Iterator[Tuple[InfoBlobChunk, list[float]]]:
-        self._file.seek(0)
-        for chunk in self._chunks:
-            embedding = np.load(self._file)
+    def batches(
+        self, batch_size: int
+    ) -> Iterator[Tuple[list[InfoBlobChunk], np.ndarray]]:
+        embeddings = self.embeddings
+        for i in range(0, len(self), batch_size):
+            yield self._chunks[i : i + batch_size], embeddings[i : i + batch_size]
 
-            yield chunk, embedding
+    def __len__(self):
+        return len(self._chunks)
 
-        self._file.close()
+    def __iter__(self) -> Iterator[Tuple[InfoBlobChunk, np.ndarray]]:
+        return zip(self._chunks, self.embeddings)
@@ -4,7 +4,7 @@
 
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, UploadFile
+from fastapi import APIRouter, Depends, Response, UploadFile
 
 from instorage.files.file_models import FilePublic
 from instorage.main.container.container import Container
@@ -43,6 +43,22 @@ async def get_files(
     )
 
 
+@router.get(
+    "/{id}/content/",
+    response_class=Response,
+    responses=responses.get_responses([404]),
+)
+async def get_file_content(
+    id: UUID,
+    container: Container = Depends(get_container(with_user=True)),
+):
+    """The text of a file, such as the results of a job"""
+    service = container.file_service()
+    file = await service.get_file_by_id(id)
+
+    return Response(content=file.text, media_type=file.mimetype)
+
+
 @router.delete("/{id}/", status_code=204)
 async def delete_file(
     id: UUID,
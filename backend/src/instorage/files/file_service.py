@@ -2,14 +2,15 @@
 #
 # Licensed under the MIT License.
 
+import hashlib
 from uuid import UUID
 
 from fastapi import UploadFile
 
-from instorage.files.file_models import FileCreate
+from instorage.files.file_models import FileCreate, FileType
 from instorage.files.file_protocol import FileProtocol
 from instorage.files.file_repo import FileRepository
-from instorage.main.exceptions import UnauthorizedException
+from instorage.main.exceptions import NotFoundException, UnauthorizedException
 from instorage.main.models import ModelId
 from instorage.users.user import UserInDB
 
@@ -31,6 +32,30 @@ class FileService:
             )
         )
 
+    async def save_text(self, name: str, text: str, mimetype: str):
+        content = text.encode("utf-8")
+
+        return await self.repo.add(
+            FileCreate(
+                name=name,
+                text=text,
+                checksum=hashlib.sha256(content).hexdigest(),
+                size=len(content),
+                mimetype=mimetype,
+                file_type=FileType.TEXT,
+                user_id=self.user.id,
+                tenant_id=self.user.tenant_id,
+            )
+        )
+
+    async def get_file_by_id(self, id: UUID):
+        files = await self.repo.get_list_by_id_and_user(ids=[id], user_id=self.user.id)
+
+        if not files:
+            raise NotFoundException()
+
+        return files[0]
+
     async def get_files_by_ids(self, file_ids: list[ModelId]):
         return await self.repo.get_list_by_id_and_user(
             ids=[file_id.id for file_id in file_ids], user_id=self.user.id
@@ -93,6 +93,14 @@ class InfoBlobMetadataFilter(InfoBlobMetadataFilterPublic):
     group_ids: Optional[list[int]] = None
 
 
+def chunk_size(text: str, dimensions: int) -> int:
+    # Size of chunk is number of bytes of text
+    # + embedding dimension * 4
+    # This is an empirically derived value which is not
+    # obvious as to why it provides a good estimation
+    return len(text.encode()) + dimensions * 4
+
+
 class InfoBlobChunk(BaseModel):
     text: str
     chunk_no: int
@@ -106,18 +114,16 @@ class InfoBlobChunkWithEmbedding(InfoBlobChunk):
     @computed_field
     @property
     def size(self) -> int:
-        # Size of chunk is number of bytes of text
-        # + embedding dimension * 4
-        # This is an empirically derived value which is not
-        # obvious as to why it provides a good estimation
-        return len(self.text.encode()) + len(self.embedding) * 4
+        return chunk_size(self.text, len(self.embedding))
 
 
 class InfoBlobChunkInDB(InDB, InfoBlobChunkWithEmbedding):
     pass
 
 
-class InfoBlobChunkInDBWithScore(InfoBlobChunkInDB):
+class InfoBlobChunkInDBWithScore(InDB, InfoBlobChunk):
+    # Search results carry everything the prompt and the references need,
+    # but not the embedding
     score: float
 
 
@@ -1,17 +1,48 @@
 from typing import Optional
 from uuid import UUID
 
+import numpy as np
 import sqlalchemy as sa
-from scipy.spatial.distance import cosine
+from pgvector.sqlalchemy import Vector
 
 from instorage.database.database import AsyncSession
 from instorage.database.repositories.base import BaseRepositoryDelegate
-from instorage.database.tables.info_blob_chunk_table import InfoBlobChunks
-from instorage.database.tables.info_blobs_table import InfoBlobs
+from instorage.database.tables.ai_models_table import EmbeddingModels
+from instorage.database.tables.info_blob_chunk_table import (
+    TEXT_SEARCH_CONFIG,
+    InfoBlobChunks,
+)
+from instorage.database.tables.questions_table import InfoBlobReferences
+from instorage.database.vector_index import pgvector, vector_index_name
 from instorage.info_blobs.info_blob import (
+    InfoBlobChunk,
     InfoBlobChunkInDB,
     InfoBlobChunkInDBWithScore,
-    InfoBlobChunkWithEmbedding,
+    chunk_size,
+)
+
+
+# Columns written by the bulk insert, the rest have server defaults
+COPY_COLUMNS = (
+    "text",
+    "chunk_no",
+    "size",
+    "embedding",
+    "info_blob_id",
+    "tenant_id",
+    "group_id",
+    "website_id",
+    "embedding_model_id",
+)
+
+SCORED_CHUNK_COLUMNS = (
+    InfoBlobChunks.id,
+    InfoBlobChunks.created_at,
+    InfoBlobChunks.updated_at,
+    InfoBlobChunks.text,
+    InfoBlobChunks.chunk_no,
+    InfoBlobChunks.info_blob_id,
+    InfoBlobChunks.tenant_id,
 )
 
 
@@ -26,22 +57,46 @@ class InfoBlobChunkRepo:
     def _filter_on_groups_and_websites(
         stmt: sa.Select, group_ids: list[UUID], website_ids: list[UUID]
     ):
-        return stmt.join(InfoBlobs).where(
+        return stmt.where(
             sa.or_(
-                InfoBlobs.group_id.in_(group_ids), InfoBlobs.website_id.in_(website_ids)
+                InfoBlobChunks.group_id.in_(group_ids),
+                InfoBlobChunks.website_id.in_(website_ids),
             )
         )
 
     async def add(
-        self, chunks: list[InfoBlobChunkWithEmbedding]
-    ) -> list[InfoBlobChunkInDB]:
-        stmt = (
-            sa.insert(InfoBlobChunks)
-            .values([chunk.model_dump() for chunk in chunks])
-            .returning(InfoBlobChunks)
-        )
+        self,
+        chunks: list[InfoBlobChunk],
+        embeddings: np.ndarray,
+        *,
+        group_id: Optional[UUID] = None,
+        website_id: Optional[UUID] = None,
+        embedding_model_id: Optional[UUID] = None,
+    ):
+        """Bulk loads `chunks` with the matching rows of the (chunks, dimensions)
+        matrix `embeddings` through a binary COPY, in the transaction of the
+        session. Nothing is returned."""
+        dimensions = embeddings.shape[1]
+        records = [
+            (
+                chunk.text,
+                chunk.chunk_no,
+                chunk_size(chunk.text, dimensions),
+                embedding,
+                chunk.info_blob_id,
+                chunk.tenant_id,
+                group_id,
+                website_id,
+                embedding_model_id,
+            )
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
 
-        return await self.delegate.get_models_from_query(stmt)
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            InfoBlobChunks.__tablename__, records=records, columns=COPY_COLUMNS
+        )
 
     async def delete_by_info_blob(self, info_blob_id: UUID):
         stmt = (
@@ -52,63 +107,145 @@ class InfoBlobChunkRepo:
 
         return await self.delegate.get_models_from_query(stmt)
 
+    async def get_embedding_model_ids_without_vector_index(
+        self, embedding_model_ids: Optional[list[UUID]] = None
+    ) -> list[UUID]:
+        """Of the given embedding models, or of all, those that have chunks but
+        no valid vector index."""
+        stmt = sa.text(
+            "SELECT c.relname FROM pg_index AS i "
+            "JOIN pg_class AS c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = CAST(:table AS regclass) AND i.indisvalid"
+        )
+        index_names = set(
+            await self.session.scalars(stmt, {"table": InfoBlobChunks.__tablename__})
+        )
+
+        has_chunks = sa.exists().where(
+            InfoBlobChunks.embedding_model_id == EmbeddingModels.id
+        )
+        stmt = sa.select(EmbeddingModels.id).where(has_chunks)
+        if embedding_model_ids is not None:
+            stmt = stmt.where(EmbeddingModels.id.in_(embedding_model_ids))
+
+        embedding_model_ids = await self.session.scalars(stmt)
+
+        return [
+            id for id in embedding_model_ids if vector_index_name(id) not in index_names
+        ]
+
+    async def get_embedding_dimensions(self, embedding_model_id: UUID):
+        stmt = (
+            sa.select(sa.func.vector_dims(InfoBlobChunks.embedding))
+            .where(InfoBlobChunks.embedding_model_id == embedding_model_id)
+            .limit(1)
+        )
+
+        return await self.session.scalar(stmt)
+
     async def semantic_search(
         self,
         embedding: list[float],
         *,
+        embedding_model_id: UUID,
         group_ids: Optional[list[UUID]] = [],
         website_ids: Optional[list[UUID]] = [],
         limit: int = 30,
     ) -> list[InfoBlobChunkInDBWithScore]:
-        # Postgres will sometimes think that a sequential scan of the whole table is
-        # preferable to an index scan, when it is not. This is because this particular
-        # table has a lot of data in TOAST tables, which postgres apparently fails
-        # to account for when planning the query.
-        #
-        # The solution below is a crude one, and we should revisit this at some point
-        # in the future. This should also be the first place we look at if something
-        # is slow. Note the "LOCAL", ensuring that we only punish sequential scans for
-        # this particular session. This might make all future queries in this transaction
-        # not be able to run sequential, but we will see if that is an issue.
+        # Every embedding model has a partial HNSW index over the embedding cast to
+        # its dimension (see instorage.database.vector_index). The cast and the
+        # predicate on embedding_model_id below must match the index definition.
+        # The model id is rendered as a literal, since a generic plan for a
+        # prepared statement can not prove that a parameter matches the partial
+        # index predicate.
         #
-        # Reference: https://github.com/pgvector/pgvector/issues/662
-        # TODO: Solve this issue in a more elegant way.
+        # The group and website filter is applied while walking the index, and
+        # iterative index scans (pgvector >= 0.8) keep the scan going until `limit`
+        # rows have passed the filter, instead of returning too few rows. Older
+        # versions may return fewer rows than `limit`.
+        if pgvector.supports_iterative_scan:
+            await self.session.execute(
+                sa.text("SET LOCAL hnsw.iterative_scan = strict_order;")
+            )
 
-        await self.session.execute(sa.text("SET LOCAL enable_seqscan = off;"))
+        distance = sa.cast(InfoBlobChunks.embedding, Vector(len(embedding)))
+        distance = distance.cosine_distance(embedding)
 
         stmt = (
-            sa.select(InfoBlobChunks)
-            .order_by(InfoBlobChunks.embedding.cosine_distance(embedding))
+            sa.select(*SCORED_CHUNK_COLUMNS, (1 - distance).label("score"))
+            .where(
+                InfoBlobChunks.embedding_model_id
+                == sa.bindparam(
+                    "embedding_model_id", embedding_model_id, literal_execute=True
+                )
+            )
+            .order_by(distance)
             .limit(limit)
         )
 
         stmt = self._filter_on_groups_and_websites(stmt, group_ids, website_ids)
 
-        chunks_in_db = await self.delegate.get_models_from_query(stmt)
+        records = await self.session.execute(stmt)
+
+        return [InfoBlobChunkInDBWithScore.model_validate(record) for record in records]
 
-        chunks_with_score = [
-            InfoBlobChunkInDBWithScore(
-                **chunk.model_dump(), score=1 - cosine(chunk.embedding, embedding)
+    async def get_referenced_chunks(
+        self,
+        question_id: UUID,
+        embedding: list[float],
+        *,
+        embedding_model_id: UUID,
+        group_ids: Optional[list[UUID]] = [],
+        website_ids: Optional[list[UUID]] = [],
+    ) -> list[InfoBlobChunkInDBWithScore]:
+        """The chunk of each info blob referenced by the question that is closest
+        to `embedding`, best first. Only the references are saved with a
+        question, not the chunks they were found by."""
+        distance = sa.cast(InfoBlobChunks.embedding, Vector(len(embedding)))
+        distance = distance.cosine_distance(embedding)
+
+        closest = (
+            sa.select(*SCORED_CHUNK_COLUMNS, (1 - distance).label("score"))
+            .join(
+                InfoBlobReferences,
+                InfoBlobReferences.info_blob_id == InfoBlobChunks.info_blob_id,
             )
-            for chunk in chunks_in_db
-        ]
+            .where(InfoBlobReferences.question_id == question_id)
+            .where(InfoBlobChunks.embedding_model_id == embedding_model_id)
+            .distinct(InfoBlobChunks.info_blob_id)
+            .order_by(InfoBlobChunks.info_blob_id, distance)
+        )
+        closest = self._filter_on_groups_and_websites(
+            closest, group_ids, website_ids
+        ).subquery()
+
+        stmt = sa.select(closest).order_by(closest.c.score.desc())
+        records = await self.session.execute(stmt)
 
-        return chunks_with_score
+        return [InfoBlobChunkInDBWithScore.model_validate(record) for record in records]
 
     async def keyword_search(
         self,
         search_string: str,
         *,
-        group_ids: Optional[list[UUID]] = None,
+        group_ids: Optional[list[UUID]] = [],
+        website_ids: Optional[list[UUID]] = [],
         limit: int = 30,
-    ):
+    ) -> list[InfoBlobChunkInDBWithScore]:
+        query = sa.func.websearch_to_tsquery(
+            sa.literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"), search_string
+        )
+        rank = sa.func.ts_rank_cd(InfoBlobChunks.text_search_vector, query)
+
         stmt = (
-            sa.select(InfoBlobChunks)
-            .filter(InfoBlobChunks.text.match(search_string))
+            sa.select(*SCORED_CHUNK_COLUMNS, rank.label("score"))
+            .where(InfoBlobChunks.text_search_vector.op("@@")(query))
+            .order_by(rank.desc())
             .limit(limit)
         )
 
-        if group_ids is not None:
-            stmt = self._filter_on_groups_and_websites(stmt, group_ids)
+        stmt = self._filter_on_groups_and_websites(stmt, group_ids, website_ids)
 
-        return await self.delegate.get_models_from_query(stmt)
+        records = await self.session.execute(stmt)
+
+        return [InfoBlobChunkInDBWithScore.model_validate(record) for record in records]
@@ -2,6 +2,7 @@ from typing import Type
 
 from instorage.info_blobs.info_blob import (
     InfoBlobInDB,
+    InfoBlobInDBNoText,
     InfoBlobMetadata,
     InfoBlobPublic,
     InfoBlobPublicNoText,
@@ -12,11 +13,11 @@ def to_info_blob_public(blob: InfoBlobInDB):
     return to_model(blob, InfoBlobPublic)
 
 
-def to_info_blob_public_no_text(blob: InfoBlobInDB):
+def to_info_blob_public_no_text(blob: InfoBlobInDBNoText):
     return to_model(blob, InfoBlobPublicNoText)
 
 
-def to_model(blob: InfoBlobInDB, public_model: Type[InfoBlobPublicNoText]):
+def to_model(blob: InfoBlobInDBNoText, public_model: Type[InfoBlobPublicNoText]):
     return public_model(
         **blob.model_dump(),
         metadata=InfoBlobMetadata(**blob.model_dump()),
@@ -1,7 +1,7 @@
 from uuid import UUID
 
 import sqlalchemy as sa
-from sqlalchemy.orm import defer, selectinload
+from sqlalchemy.orm import defer, noload, selectinload
 
 from instorage.database.database import AsyncSession
 from instorage.database.repositories.base import BaseRepositoryDelegate
@@ -78,6 +78,18 @@ class InfoBlobRepository:
     async def get(self, id: UUID) -> InfoBlobInDB:
         return await self.delegate.get(id)
 
+    async def get_by_ids(self, ids: list[UUID]) -> list[InfoBlobInDBNoText]:
+        """Fetches the metadata of many info blobs in one query, without their
+        text or relationships. The order of the result is not defined."""
+        query = (
+            sa.select(InfoBlobs)
+            .where(InfoBlobs.id.in_(ids))
+            .options(defer(InfoBlobs.text), noload("*"))
+        )
+        records = await self.session.scalars(query)
+
+        return [InfoBlobInDBNoText.model_validate(record) for record in records]
+
     async def get_by_title_and_group(self, title: str, group_id: UUID):
         return await self.delegate.get_by(
             conditions={InfoBlobs.title: title, InfoBlobs.group_id: group_id}
@@ -0,0 +1,153 @@
+"""Builds the vector indexes of the embedding models.
+
+Indexes missing from before, as when upgrading a large database, are built
+with `python -m instorage.info_blobs.vector_index_builder`."""
+
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from instorage.database.database import AsyncSession, sessionmanager
+from instorage.database.vector_index import (
+    create_vector_index_statement,
+    drop_vector_index_statement,
+    is_vector_index_valid_statement,
+    vector_index_name,
+)
+from instorage.info_blobs.info_blob_chunk_repo import InfoBlobChunkRepo
+from instorage.main.config import get_settings
+from instorage.main.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class VectorIndexBuilder:
+    """Builds the vector index of an embedding model once it has chunks.
+
+    That is when its first chunks are committed, while the index is still
+    small and quick to build, in the background of the process that added
+    them. An advisory lock keeps processes from building the same index, the
+    ones that do not get the lock leave the index to the one that does."""
+
+    def __init__(self):
+        # The models whose index is known to be there, in this process
+        self._indexed: set[UUID] = set()
+        self._building: dict[UUID, asyncio.Task] = {}
+
+    def build_on_commit(self, session: AsyncSession, embedding_model_id: UUID):
+        """Builds the index of the model, if it has none, once `session`
+        commits. Before that its chunks are not there for the index."""
+        if embedding_model_id is None or embedding_model_id in self._indexed:
+            return
+
+        event.listen(
+            session.sync_session,
+            "after_commit",
+            lambda _: self._start_building(embedding_model_id),
+            once=True,
+        )
+
+    def _start_building(self, embedding_model_id: UUID):
+        if embedding_model_id in self._building:
+            return
+
+        try:
+            task = asyncio.get_running_loop().create_task(
+                self.build([embedding_model_id])
+            )
+        except RuntimeError:
+            # No loop, as in scripts, the index is built by the next to add chunks
+            return
+
+        self._building[embedding_model_id] = task
+        task.add_done_callback(lambda _: self._building.pop(embedding_model_id, None))
+
+    async def _build_index(
+        self, connection: AsyncConnection, embedding_model_id: UUID, dimensions: int
+    ):
+        index_name = vector_index_name(embedding_model_id)
+        lock_key = sa.func.hashtext(index_name)
+
+        if not await connection.scalar(
+            sa.select(sa.func.pg_try_advisory_lock(lock_key))
+        ):
+            return False
+
+        try:
+            # Built by another process since it was found missing
+            if await connection.scalar(is_vector_index_valid_statement(index_name)):
+                return True
+
+            logger.info(f"Creating vector index for {embedding_model_id}...")
+
+            # An index left invalid by a build that was cut short is built anew
+            await connection.execute(drop_vector_index_statement(index_name))
+            await connection.execute(
+                create_vector_index_statement(embedding_model_id, dimensions)
+            )
+            return True
+
+        finally:
+            await connection.execute(sa.select(sa.func.pg_advisory_unlock(lock_key)))
+
+    async def build(self, embedding_model_ids: Optional[list[UUID]] = None):
+        """Builds the missing indexes of the given models, or of every model
+        that has chunks."""
+        try:
+            async with sessionmanager.session() as session, session.begin():
+                repository = InfoBlobChunkRepo(session=session)
+
+                missing = {}
+                for (
+                    embedding_model_id
+                ) in await repository.get_embedding_model_ids_without_vector_index(
+                    embedding_model_ids
+                ):
+                    missing[embedding_model_id] = (
+                        await repository.get_embedding_dimensions(embedding_model_id)
+                    )
+
+            # The models given have chunks, those that are not missing an
+            # index have one
+            if embedding_model_ids is not None:
+                self._indexed.update(set(embedding_model_ids) - set(missing))
+
+            # CREATE INDEX CONCURRENTLY can not run inside a transaction
+            async with sessionmanager.autocommit_connect() as connection:
+                for embedding_model_id, dimensions in missing.items():
+                    if await self._build_index(
+                        connection, embedding_model_id, dimensions
+                    ):
+                        self._indexed.add(embedding_model_id)
+
+        except Exception:
+            logger.exception("Creating vector indexes failed:")
+
+    async def stop(self):
+        # A build that is cut short leaves an invalid index, which is built
+        # anew the next time
+        for task in self._building.values():
+            task.cancel()
+        await asyncio.gather(*self._building.values(), return_exceptions=True)
+
+        self._building.clear()
+        self._indexed.clear()
+
+
+vector_index_builder = VectorIndexBuilder()
+
+
+async def main():
+    sessionmanager.init(get_settings().database_url)
+    try:
+        await vector_index_builder.build()
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -37,6 +37,14 @@ class JobManager:
 
         await self._redis.enqueue_job(task, params, _job_id=str(job_id))
 
+    async def enqueue_later(self, task: Task, params: TaskParams, defer_by: float):
+        """Enqueues `task` to run in `defer_by` seconds, as an arq job of its
+        own, for a job that is already in progress."""
+        if self._redis is None:
+            raise NotReadyException("Job manager is not initialized!")
+
+        await self._redis.enqueue_job(task, params, _defer_by=defer_by)
+
     async def enqueue_jobless(self, task: Task):
         await self._redis.enqueue_job(task)
 
@@ -22,6 +22,8 @@ class Task(str, Enum):
     CRAWL = "crawl"
     EMBED_GROUP = "embed_group"
     CRAWL_ALL_WEBSITES = "crawl_all_websites"
+    RUN_SERVICE_BATCH = "run_service_batch"
+    POLL_SERVICE_BATCH = "poll_service_batch"
 
 
 class JobBase(BaseModel):
@@ -34,12 +36,16 @@ class JobBase(BaseModel):
 
 class Job(JobBase):
     user_id: UUID
+    provider_batch_id: Optional[str] = None
+    provider_batch: Optional[dict] = None
 
 
 class JobUpdate(BaseModel):
     status: Optional[JobStatus] = None
     result_location: Optional[str] = None
     finished_at: Optional[datetime] = None
+    provider_batch_id: Optional[str] = None
+    provider_batch: Optional[dict] = None
 
 
 class JobInDb(Job, InDB):
@@ -31,6 +31,11 @@ class JobService:
 
         return await self.job_repo.update_job(job_id, job_update)
 
+    async def set_provider_batch(self, job_id: UUID, batch_id: str, batch: dict):
+        job_update = JobUpdate(provider_batch_id=batch_id, provider_batch=batch)
+
+        return await self.job_repo.update_job(job_id, job_update)
+
     async def complete_job(self, job_id: UUID, result_location: str):
         job_update = JobUpdate(
             status=JobStatus.COMPLETE,
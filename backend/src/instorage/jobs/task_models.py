@@ -30,3 +30,16 @@ class Transcription(UploadTask):
 
 class EmbedGroup(InfoBlobTask):
     pass
+
+
+class ServiceBatchTask(TaskParams):
+    service_id: UUID
+    filepath: str
+    max_concurrency: Optional[int] = None
+    provider_batch: bool = False
+
+
+class ServiceBatchPoll(TaskParams):
+    service_id: UUID
+    # Of the job that submitted the batch, not of the arq job that polls it
+    job_id: UUID
@@ -2,6 +2,7 @@ import asyncio
 from tempfile import SpooledTemporaryFile
 from uuid import UUID
 
+from instorage.ai_models.completion_models.batch_completion import supports_batch
 from instorage.files.audio import AudioMimeTypes
 from instorage.files.file_size_service import FileSizeService
 from instorage.files.text import TextMimeTypes
@@ -9,9 +10,20 @@ from instorage.groups.group import GroupInDB
 from instorage.groups.group_service import GroupService
 from instorage.jobs.job_models import JobInDb, Task
 from instorage.jobs.job_service import JobService
-from instorage.jobs.task_models import EmbedGroup, Transcription, UploadInfoBlob
+from instorage.jobs.task_models import (
+    EmbedGroup,
+    ServiceBatchTask,
+    Transcription,
+    UploadInfoBlob,
+)
 from instorage.main.config import get_settings
-from instorage.main.exceptions import FileNotSupportedException, FileTooLargeException
+from instorage.main.exceptions import (
+    BadRequestException,
+    FileNotSupportedException,
+    FileTooLargeException,
+)
+from instorage.services.service import Service
+from instorage.services.service_protocol import to_batch_inputs
 from instorage.users.user import UserInDB
 from instorage.websites.crawl_dependencies.crawl_models import CrawlTask, CrawlType
 
@@ -45,6 +57,8 @@ class TaskService:
                 return get_settings().upload_max_file_size
             case Task.TRANSCRIPTION:
                 return get_settings().transcription_max_file_size
+            case Task.RUN_SERVICE_BATCH:
+                return get_settings().upload_max_file_size
             case _:
                 return 0
 
@@ -126,3 +140,38 @@ class TaskService:
         return await self.job_service.queue_job(
             Task.EMBED_GROUP, name=name, task_params=params
         )
+
+    async def queue_service_batch(
+        self,
+        service: Service,
+        file: SpooledTemporaryFile,
+        max_concurrency: int | None = None,
+        provider_batch: bool = False,
+    ):
+        if provider_batch and not supports_batch(service.completion_model):
+            raise BadRequestException(
+                f"Completion model {service.completion_model.name}"
+                " does not support provider batches."
+            )
+
+        await self.validate_file_size(file, Task.RUN_SERVICE_BATCH)
+
+        # A malformed file is turned down now, rather than failing the job
+        to_batch_inputs(await asyncio.to_thread(file.read))
+        file.seek(0)
+
+        filepath = await self.file_size_service.save_file_to_disk(file)
+
+        params = ServiceBatchTask(
+            user_id=self.user.id,
+            service_id=service.id,
+            filepath=filepath,
+            max_concurrency=max_concurrency,
+            provider_batch=provider_batch,
+        )
+
+        return await self.job_service.queue_job(
+            Task.RUN_SERVICE_BATCH,
+            name=f"Batch run of {service.name}",
+            task_params=params,
+        )
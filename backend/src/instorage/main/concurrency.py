@@ -0,0 +1,18 @@
+import asyncio
+from typing import Awaitable
+
+
+async def gather_or_cancel(*aws: Awaitable):
+    """Like asyncio.gather, but the other awaitables are cancelled as soon as
+    one of them fails, instead of being left running."""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+
+        # Let the cancelled tasks finish before the error is raised
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -68,6 +68,73 @@ class Settings(BaseSettings):
     # Feature flags
     using_access_management: bool = True
     using_intric_proprietary: bool = False
+    using_hybrid_search: bool = False
+
+    # Embedding
+    embedding_max_in_flight_requests: int = 4
+    embedding_max_items_per_request: int = 2048
+    embedding_tokens_per_minute: Optional[int] = None
+    embedding_max_rate_limit_retries: int = 6
+
+    # Connections to the model providers
+    llm_http_max_connections: int = 100
+    # By provider: openai, azure, anthropic, vllm or infinity
+    llm_http_max_connections_per_provider: dict[str, int] = {}
+    llm_http_keepalive_expiry: float = 60
+    llm_http_connect_timeout: float = 5
+    llm_http_read_timeout: float = 600
+    # Needs the h2 package
+    llm_http2: bool = False
+    # Seconds between logs of the pools' stats, 0 turns them off
+    llm_http_stats_log_interval: float = 300
+
+    # Completion
+    completion_max_in_flight_requests: int = 16
+    completion_batch_window: str = "24h"
+    completion_batch_poll_interval: float = 60
+    completion_max_attempts: int = 3
+    completion_retry_budget: float = 30
+    completion_circuit_window: float = 60
+    completion_circuit_min_requests: int = 10
+    completion_circuit_error_threshold: float = 0.5
+    completion_circuit_cooldown: float = 30
+    completion_hedge_slow_requests: bool = False
+    completion_hedge_min_samples: int = 20
+    # Maps a model name or deployment to the one used while it is unavailable
+    completion_fallback_models: dict[str, str] = {}
+
+    # Service batches
+    service_batch_max_inputs: int = 1000
+    service_batch_concurrency: int = 8
+
+    # Caches
+    query_embedding_cache_size: int = 1024
+    query_embedding_cache_ttl: int = 3600
+    using_redis_query_embedding_cache: bool = False
+    space_snapshot_cache_size: int = 1024
+    space_snapshot_cache_ttl: int = 30
+    using_principal_cache: bool = True
+    principal_cache_size: int = 10000
+    principal_cache_ttl: int = 60
+    allowed_origin_cache_size: int = 1024
+    allowed_origin_cache_ttl: int = 300
+    allowed_origin_negative_cache_ttl: int = 30
+    token_count_cache_size: int = 100000
+    token_count_cache_ttl: int = 3600
+    compiled_schema_cache_size: int = 256
+
+    # Retrieval
+    retrieval_query_max_tokens: int = 1000
+    retrieval_query_history_decay: float = 0.5
+    retrieval_carried_over_chunks: int = 3
+
+    # Latency
+    time_to_first_token_budget: Optional[float] = 3.0
+
+    # Write-behind of questions and token usage
+    question_writer_flush_interval: float = 1.0
+    question_writer_batch_size: int = 100
+    question_writer_max_attempts: int = 3
 
     # Security
     api_prefix: str
@@ -7,12 +7,18 @@ from instorage.ai_models.completion_models.completion_model import (
     CompletionModel,
     CompletionModelFamily,
 )
+from instorage.ai_models.completion_models.completion_model_adapters.azure_batch_adapter import (
+    AzureOpenAIBatchModelAdapter,
+)
 from instorage.ai_models.completion_models.completion_model_adapters.azure_model_adapter import (
     AzureOpenAIModelAdapter,
 )
 from instorage.ai_models.completion_models.completion_model_adapters.claude_model_adapter import (
     ClaudeModelAdapter,
 )
+from instorage.ai_models.completion_models.completion_model_adapters.openai_batch_adapter import (
+    OpenAIBatchModelAdapter,
+)
 from instorage.ai_models.completion_models.completion_model_adapters.openai_model_adapter import (
     OpenAIModelAdapter,
 )
@@ -90,6 +96,7 @@ from instorage.spaces.space_repo import SpaceRepository
 from instorage.spaces.space_service import SpaceService
 from instorage.tenants.tenant import TenantInDB
 from instorage.tenants.tenant_repo import TenantRepository
+from instorage.usage.usage_repo import UsageRepository
 from instorage.user_groups.user_groups_repo import UserGroupsRepository
 from instorage.user_groups.user_groups_service import UserGroupsService
 from instorage.users.user import UserInDB
@@ -155,6 +162,7 @@ class Container(containers.DeclarativeContainer):
     step_repo = providers.Factory(StepRepository, session=session)
     user_groups_repo = providers.Factory(UserGroupsRepository, session=session)
     analysis_repo = providers.Factory(AnalysisRepository, session=session)
+    usage_repo = providers.Factory(UsageRepository, session=session)
     session_repo = providers.Factory(SessionRepository, session=session)
     question_repo = providers.Factory(QuestionRepository, session=session)
     file_repo = providers.Factory(FileRepository, session=session)
@@ -182,6 +190,21 @@ class Container(containers.DeclarativeContainer):
         }
     )
 
+    # Batch model adapters, for the families in BATCH_MODEL_FAMILIES
+    openai_batch_adapter = providers.Factory(
+        OpenAIBatchModelAdapter, model=completion_model
+    )
+    azure_batch_adapter = providers.Factory(
+        AzureOpenAIBatchModelAdapter, model=completion_model
+    )
+    completion_batch_selector = providers.Selector(
+        config.completion_model,
+        **{
+            CompletionModelFamily.OPEN_AI.value: openai_batch_adapter,
+            CompletionModelFamily.AZURE.value: azure_batch_adapter,
+        }
+    )
+
     # Embedding model adapters
     multilingual_adapter = providers.Factory(InfinityAdapter, model=embedding_model)
     openai_embedding_adapter = providers.Factory(
@@ -393,6 +416,7 @@ class Container(containers.DeclarativeContainer):
         AnalysisService,
         user=user,
         repo=analysis_repo,
+        usage_repo=usage_repo,
         assistant_service=assistant_service,
         session_repo=session_repo,
         question_repo=question_repo,
@@ -20,6 +20,8 @@ class ErrorCodes(int, Enum):
     FILE_TOO_LARGE = 9015
     CHUNK_EMBEDDING_MISMATCH = 9016
     NAME_COLLISION = 9017
+    RATE_LIMIT_EXCEEDED = 9018
+    PROVIDER_UNAVAILABLE = 9019
 
 
 class NotFoundException(Exception):
@@ -102,6 +104,14 @@ class UserNotCreatedError(Exception):
     pass
 
 
+class RateLimitException(Exception):
+    pass
+
+
+class ProviderUnavailableException(Exception):
+    pass
+
+
 # Map exceptions to response codes
 # Set message to None to use the internal message
 # Set error codes in the range 9000 - 9999
@@ -128,4 +138,6 @@ EXCEPTION_MAP = {
         ErrorCodes.CHUNK_EMBEDDING_MISMATCH,
     ),
     NameCollisionException: (400, None, ErrorCodes.NAME_COLLISION),
+    RateLimitException: (503, None, ErrorCodes.RATE_LIMIT_EXCEEDED),
+    ProviderUnavailableException: (503, None, ErrorCodes.PROVIDER_UNAVAILABLE),
 }
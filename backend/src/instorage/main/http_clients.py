@@ -0,0 +1,324 @@
+import asyncio
+import contextlib
+import time
+from enum import Enum
+from typing import Optional
+
+import aiohttp
+import httpx
+from anthropic import AsyncAnthropic
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+from pydantic import BaseModel
+
+from instorage.main.config import get_settings
+from instorage.main.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Waiting longer than this for a slot is logged
+SLOW_WAIT = 1.0
+
+
+class Provider(str, Enum):
+    OPENAI = "openai"
+    AZURE = "azure"
+    ANTHROPIC = "anthropic"
+    VLLM = "vllm"
+    INFINITY = "infinity"
+
+
+class PoolStats(BaseModel):
+    max_in_flight: int
+    in_flight: int
+    waiting: int
+    # Requests that had to wait for a slot, and for how long in all
+    waited: int
+    wait_seconds: float
+    requests: int
+
+
+class ProviderPool:
+    """Caps the requests in flight to one provider, and counts how often a
+    request had to wait for a slot, which is how a saturated pool shows."""
+
+    def __init__(self, provider: Provider, max_in_flight: int):
+        self.provider = provider
+        self.max_in_flight = max_in_flight
+
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.requests = 0
+
+    async def acquire(self):
+        if self._semaphore.locked():
+            start = time.monotonic()
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+
+            waited_for = time.monotonic() - start
+            self.waited += 1
+            self.wait_seconds += waited_for
+            if waited_for > SLOW_WAIT:
+                logger.warning(
+                    f"Waited {waited_for * 1000:.0f} ms for a connection to"
+                    f" {self.provider.value}, {self.max_in_flight} in flight"
+                )
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        self.requests += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> PoolStats:
+        return PoolStats(
+            max_in_flight=self.max_in_flight,
+            in_flight=self.in_flight,
+            waiting=self.waiting,
+            waited=self.waited,
+            wait_seconds=self.wait_seconds,
+            requests=self.requests,
+        )
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Holds on to the slot until a streamed response is read or closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, pool: ProviderPool):
+        self._stream = stream
+        self._pool = pool
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._pool.release()
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, pool: ProviderPool):
+        self._transport = transport
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._pool.acquire()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._pool.release()
+            raise
+
+        if response.is_closed:
+            self._pool.release()
+        else:
+            response.stream = _ReleasingStream(response.stream, self._pool)
+
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class HttpClients:
+    """The clients of the model providers, one per provider, made on first
+    use and closed when the app shuts down.
+
+    Every provider has a pool of its own, so that connections are kept alive
+    and reused between requests rather than made anew, and a cap on the
+    requests in flight to it, whose saturation shows in `stats`, logged
+    every `llm_http_stats_log_interval` seconds."""
+
+    def __init__(self):
+        self._pools: dict[Provider, ProviderPool] = {}
+        self._http_clients: dict[Provider, httpx.AsyncClient] = {}
+        self._clients: dict[Provider, object] = {}
+        self._aiohttp_session: Optional[aiohttp.ClientSession] = None
+        self._stats_logger: Optional[asyncio.Task] = None
+
+    def _max_connections(self, provider: Provider):
+        settings = get_settings()
+        return settings.llm_http_max_connections_per_provider.get(
+            provider.value, settings.llm_http_max_connections
+        )
+
+    def _get_pool(self, provider: Provider):
+        if provider not in self._pools:
+            self._pools[provider] = ProviderPool(
+                provider, max_in_flight=self._max_connections(provider)
+            )
+
+        return self._pools[provider]
+
+    def _timeout(self):
+        settings = get_settings()
+        return httpx.Timeout(
+            settings.llm_http_read_timeout,
+            connect=settings.llm_http_connect_timeout,
+            # Waiting for a connection is bounded by the pool's cap instead
+            pool=None,
+        )
+
+    def _get_http_client(self, provider: Provider):
+        if provider not in self._http_clients:
+            settings = get_settings()
+            max_connections = self._max_connections(provider)
+            transport = httpx.AsyncHTTPTransport(
+                http2=settings.llm_http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=settings.llm_http_keepalive_expiry,
+                ),
+            )
+
+            self._http_clients[provider] = httpx.AsyncClient(
+                transport=PooledTransport(transport, self._get_pool(provider)),
+                timeout=self._timeout(),
+                follow_redirects=True,
+            )
+
+        return self._http_clients[provider]
+
+    def _get_client(self, provider: Provider, create):
+        if provider not in self._clients:
+            self._clients[provider] = create(self._get_http_client(provider))
+
+        return self._clients[provider]
+
+    def openai(self) -> AsyncOpenAI:
+        return self._get_client(
+            Provider.OPENAI,
+            lambda http_client: AsyncOpenAI(
+                api_key=get_settings().openai_api_key,
+                http_client=http_client,
+                timeout=self._timeout(),
+            ),
+        )
+
+    def azure(self) -> AsyncAzureOpenAI:
+        return self._get_client(
+            Provider.AZURE,
+            lambda http_client: AsyncAzureOpenAI(
+                api_key=get_settings().azure_api_key,
+                azure_endpoint=get_settings().azure_endpoint,
+                api_version=get_settings().azure_api_version,
+                http_client=http_client,
+                timeout=self._timeout(),
+            ),
+        )
+
+    def anthropic(self) -> AsyncAnthropic:
+        return self._get_client(
+            Provider.ANTHROPIC,
+            lambda http_client: AsyncAnthropic(
+                api_key=get_settings().anthropic_api_key,
+                http_client=http_client,
+                timeout=self._timeout(),
+            ),
+        )
+
+    def vllm(self) -> AsyncOpenAI:
+        return self._get_client(
+            Provider.VLLM,
+            lambda http_client: AsyncOpenAI(
+                api_key="EMPTY",
+                base_url=get_settings().vllm_model_url,
+                http_client=http_client,
+                timeout=self._timeout(),
+            ),
+        )
+
+    def infinity(self) -> aiohttp.ClientSession:
+        if self._aiohttp_session is None:
+            settings = get_settings()
+            self._aiohttp_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._max_connections(Provider.INFINITY),
+                    keepalive_timeout=settings.llm_http_keepalive_expiry,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=settings.llm_http_connect_timeout,
+                    sock_read=settings.llm_http_read_timeout,
+                ),
+            )
+
+        return self._aiohttp_session
+
+    def infinity_slot(self):
+        return self._get_pool(Provider.INFINITY).slot()
+
+    def start(self):
+        """Makes the clients of the providers that are configured, the others
+        are made if they are ever used."""
+        settings = get_settings()
+
+        if settings.openai_api_key:
+            self.openai()
+        if settings.anthropic_api_key:
+            self.anthropic()
+        if settings.using_azure_models:
+            self.azure()
+        if settings.vllm_model_url:
+            self.vllm()
+        if settings.infinity_url:
+            self.infinity()
+
+        if settings.llm_http_stats_log_interval > 0:
+            self._stats_logger = asyncio.create_task(
+                self._log_stats(settings.llm_http_stats_log_interval)
+            )
+
+    async def _log_stats(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+
+            for provider, stats in self.stats().items():
+                logger.info(f"Connections to {provider.value}: {stats.model_dump()}")
+
+    async def stop(self):
+        if self._stats_logger is not None:
+            self._stats_logger.cancel()
+            await asyncio.gather(self._stats_logger, return_exceptions=True)
+            self._stats_logger = None
+
+        for http_client in self._http_clients.values():
+            await http_client.aclose()
+
+        if self._aiohttp_session is not None:
+            await self._aiohttp_session.close()
+
+        self._http_clients.clear()
+        self._clients.clear()
+        self._pools.clear()
+        self._aiohttp_session = None
+
+    def stats(self) -> dict[Provider, PoolStats]:
+        return {provider: pool.stats() for provider, pool in self._pools.items()}
+
+
+http_clients = HttpClients()
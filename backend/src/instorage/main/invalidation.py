@@ -0,0 +1,91 @@
+import asyncio
+import json
+import uuid
+from typing import Callable, Optional
+
+from instorage.main.logging import get_logger
+from instorage.main.redis_client import RedisClient
+
+logger = get_logger(__name__)
+
+
+class InvalidationChannel:
+    """Tells the other processes that something they cache has changed.
+
+    Messages are published on a redis channel. `on_message` is called with the
+    messages published by other processes, `on_gap` when the subscription was
+    lost and messages may have been missed. Without redis nothing is sent, and
+    the caches fall back on their ttls."""
+
+    def __init__(
+        self,
+        name: str,
+        redis: Optional[RedisClient],
+        on_message: Callable[[dict], None],
+        on_gap: Callable[[], None],
+    ):
+        self.name = name
+        self.redis = redis
+        self.on_message = on_message
+        self.on_gap = on_gap
+
+        self._origin = str(uuid.uuid4())
+        self._listener: Optional[asyncio.Task] = None
+        self._publishing: set[asyncio.Task] = set()
+
+    @property
+    def _is_connected(self):
+        return self.redis is not None and self.redis.is_started
+
+    async def _publish(self, message: dict):
+        try:
+            await self.redis().publish(
+                self.name, json.dumps({"origin": self._origin, "message": message})
+            )
+        except Exception:
+            logger.exception(f"Could not publish to {self.name}:")
+
+    def publish(self, message: dict):
+        if not self._is_connected:
+            return
+
+        try:
+            task = asyncio.get_running_loop().create_task(self._publish(message))
+        except RuntimeError:
+            # No loop, as in scripts, there is nobody to tell
+            return
+
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.name)
+
+                async for data in pubsub.listen():
+                    data = json.loads(data["data"])
+                    if data["origin"] != self._origin:
+                        self.on_message(data["message"])
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception:
+                logger.exception(f"Listening to {self.name} failed:")
+                self.on_gap()
+                await asyncio.sleep(1)
+
+            finally:
+                await pubsub.aclose()
+
+    def start(self):
+        if self._is_connected:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
@@ -0,0 +1,27 @@
+import redis.asyncio as redis
+
+from instorage.main.config import get_settings
+
+
+class RedisClient:
+    connection: redis.Redis = None
+
+    def start(self):
+        self.connection = redis.Redis(
+            host=get_settings().redis_host, port=get_settings().redis_port
+        )
+
+    async def stop(self):
+        await self.connection.aclose()
+        self.connection = None
+
+    @property
+    def is_started(self):
+        return self.connection is not None
+
+    def __call__(self) -> redis.Redis:
+        assert self.connection is not None
+        return self.connection
+
+
+redis_client = RedisClient()
@@ -0,0 +1,48 @@
+import contextlib
+import time
+from typing import Callable, Optional
+
+from instorage.main.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class StageTimer:
+    """Times the stages of a request, to show what each of them adds to the
+    total. Stages may overlap when they run concurrently."""
+
+    def __init__(
+        self,
+        name: str,
+        budget: Optional[float] = None,
+        timer: Callable[[], float] = time.perf_counter,
+    ):
+        self.name = name
+        self.budget = budget
+        self.timer = timer
+        self.stages: dict[str, float] = {}
+        self._start = timer()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = self.timer()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0) + self.timer() - start
+
+    def elapsed(self) -> float:
+        return self.timer() - self._start
+
+    def log(self, event: str):
+        total = self.elapsed()
+        stages = ", ".join(
+            f"{name}: {seconds * 1000:.0f} ms" for name, seconds in self.stages.items()
+        )
+        logger.info(f"{self.name}: {event} after {total * 1000:.0f} ms ({stages})")
+
+        if self.budget is not None and total > self.budget:
+            logger.warning(
+                f"{self.name}: {event} took longer than the budget"
+                f" of {self.budget * 1000:.0f} ms"
+            )
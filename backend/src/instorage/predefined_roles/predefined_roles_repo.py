@@ -16,6 +16,7 @@ from instorage.predefined_roles.predefined_role import (
     PredefinedRoleInDB,
     PredefinedRoleUpdate,
 )
+from instorage.users.principal_cache import principal_cache
 
 
 class PredefinedRolesRepository:
@@ -23,6 +24,7 @@ class PredefinedRolesRepository:
         self.delegate = BaseRepositoryDelegate(
             session, PredefinedRoles, PredefinedRoleInDB
         )
+        self.session = session
 
     async def get_predefined_role_by_uuid(self, id: UUID) -> PredefinedRoleInDB:
         return await self.delegate.get(id)
@@ -38,9 +40,12 @@ class PredefinedRolesRepository:
     async def update_predefined_role(
         self, role: PredefinedRoleUpdate
     ) -> PredefinedRoleInDB:
+        # Predefined roles are shared by every tenant
+        principal_cache.invalidate_on_commit(self.session)
         return await self.delegate.update(role)
 
     async def delete_predefined_role_by_id(self, id: UUID) -> PredefinedRoleInDB:
+        principal_cache.invalidate_on_commit(self.session)
         stmt = (
             sa.delete(PredefinedRoles)
             .where(PredefinedRoles.id == id)
@@ -20,6 +20,8 @@ class QuestionBase(BaseModel):
 
 
 class QuestionAdd(QuestionBase):
+    # The tokens of the question itself, without the prompt, the context and
+    # the history it was sent with
     num_tokens_question: int
     num_tokens_answer: int
     tenant_id: UUID
@@ -37,6 +39,8 @@ class QuestionAdd(QuestionBase):
 
 
 class Question(QuestionAdd, InDB):
+    # Unknown for questions saved before only the question's tokens were counted
+    num_tokens_question: Optional[int] = None
     logging_details: Optional[LoggingDetailsInDB] = None
     info_blobs: list[InfoBlobInDB] = []
     assistant_id: Optional[UUID] = Field(
@@ -0,0 +1,273 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import event
+
+from instorage.database.database import AsyncSession, sessionmanager
+from instorage.files.file_models import File
+from instorage.info_blobs.info_blob import InfoBlobChunkInDBWithScore
+from instorage.main.config import SETTINGS
+from instorage.main.logging import get_logger
+from instorage.questions.question import QuestionAdd
+from instorage.questions.questions_repo import QuestionRepository
+from instorage.usage.usage import UsageCounts, UsageKey
+from instorage.usage.usage_ledger import UsageLedger
+from instorage.usage.usage_repo import UsageRepository
+from instorage.users.user_repo import UsersRepository
+
+logger = get_logger(__name__)
+
+
+class PendingQuestion(BaseModel):
+    question: QuestionAdd
+    info_blob_chunks: list[InfoBlobChunkInDBWithScore] = []
+    files: list[File] = []
+
+    # The tokens the model was billed for, the question with its prompt,
+    # context and history. Without it, the question's own tokens are counted.
+    input_tokens: Optional[int] = None
+
+    # Who asked, for the usage rollups
+    user_id: Optional[UUID] = None
+    assistant_id: Optional[UUID] = None
+
+
+@dataclass
+class PendingWrites:
+    questions: list[PendingQuestion] = field(default_factory=list)
+    used_tokens: dict[UUID, int] = field(default_factory=dict)
+    usage: dict[UsageKey, UsageCounts] = field(default_factory=dict)
+
+    @classmethod
+    def of_questions(cls, questions: list[PendingQuestion], **kwargs):
+        ledger = UsageLedger()
+        for pending in questions:
+            ledger.record(
+                tenant_id=pending.question.tenant_id,
+                user_id=pending.user_id,
+                assistant_id=pending.assistant_id,
+                completion_model_id=pending.question.completion_model_id,
+                input_tokens=(
+                    pending.input_tokens
+                    if pending.input_tokens is not None
+                    else pending.question.num_tokens_question
+                ),
+                output_tokens=pending.question.num_tokens_answer,
+            )
+
+        return cls(questions=questions, usage=ledger.drain(), **kwargs)
+
+    def split(self) -> list["PendingWrites"]:
+        return [PendingWrites.of_questions([pending]) for pending in self.questions] + [
+            PendingWrites(used_tokens={user_id: tokens})
+            for user_id, tokens in self.used_tokens.items()
+        ]
+
+    def to_log(self):
+        return {
+            "questions": [
+                pending.model_dump(mode="json") for pending in self.questions
+            ],
+            "used_tokens": {str(id): tokens for id, tokens in self.used_tokens.items()},
+        }
+
+
+class QuestionWriter:
+    """Writes finished questions and token usage in the background, in batches.
+
+    Writes are queued when the request's transaction commits, so that what they
+    refer to (the session, the files) is already in the database, and nothing
+    is queued for a request that is rolled back. A batch that fails is retried
+    one write at a time, and pending writes are flushed when the writer stops.
+    A write that is cancelled midway is put back in the queue, not dropped.
+
+    The usage of the questions in a batch is summed up and added to the usage
+    rollups in the same transaction as the questions themselves.
+
+    The queue lives in this process, so only writes that nothing reads back
+    right away go through it, not the questions of a session. Until the writer
+    is started, writes are made inline in the request's own transaction."""
+
+    def __init__(
+        self,
+        flush_interval: float,
+        max_batch_size: int,
+        max_attempts: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self._questions: list[PendingQuestion] = []
+        self._used_tokens: dict[UUID, int] = defaultdict(int)
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_started(self):
+        return self._task is not None
+
+    @property
+    def num_pending(self):
+        return len(self._questions) + len(self._used_tokens)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Not cancelled, so that a flush in progress is finished
+            self._stopping.set()
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._stopping.clear()
+
+        await self.flush()
+
+    def _on_commit(self, session: AsyncSession, enqueue):
+        event.listen(
+            session.sync_session, "after_commit", lambda _: enqueue(), once=True
+        )
+
+    def _enqueue_question(self, pending: PendingQuestion):
+        self._questions.append(pending)
+
+        if len(self._questions) >= self.max_batch_size:
+            self._wakeup.set()
+
+    def _enqueue_used_tokens(self, user_id: UUID, tokens: int):
+        self._used_tokens[user_id] += tokens
+
+    async def write_question(self, pending: PendingQuestion, session: AsyncSession):
+        """Writes the question and its usage right away, in `session`."""
+        await self._write_in(session, PendingWrites.of_questions([pending]))
+
+    async def add_question(self, pending: PendingQuestion, session: AsyncSession):
+        if not self.is_started:
+            await self.write_question(pending, session=session)
+            return
+
+        self._on_commit(session, lambda: self._enqueue_question(pending))
+
+    async def add_questions(
+        self, pendings: list[PendingQuestion], session: AsyncSession
+    ):
+        if not self.is_started:
+            await self._write_in(session, PendingWrites.of_questions(pendings))
+            return
+
+        pendings = list(pendings)
+        self._on_commit(
+            session,
+            lambda: [self._enqueue_question(pending) for pending in pendings],
+        )
+
+    async def add_used_tokens(self, user_id: UUID, tokens: int, session: AsyncSession):
+        if not self.is_started:
+            await UsersRepository(session).add_used_tokens(user_id, tokens)
+            return
+
+        self._on_commit(session, lambda: self._enqueue_used_tokens(user_id, tokens))
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            await self.flush()
+
+    @staticmethod
+    async def _write_in(session: AsyncSession, writes: PendingWrites):
+        await QuestionRepository(session).insert_many(
+            [pending.question for pending in writes.questions],
+            info_blob_chunks=[pending.info_blob_chunks for pending in writes.questions],
+            files=[pending.files for pending in writes.questions],
+        )
+
+        # Always in the same order, so that concurrent writers can not deadlock
+        user_repo = UsersRepository(session)
+        for user_id in sorted(writes.used_tokens):
+            await user_repo.add_used_tokens(user_id, writes.used_tokens[user_id])
+
+        await UsageRepository(session).add(writes.usage)
+
+    async def _write(self, writes: PendingWrites):
+        async with sessionmanager.session() as session, session.begin():
+            await self._write_in(session, writes)
+
+    async def _write_with_retries(self, writes: PendingWrites):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self._write(writes)
+                return
+            except Exception:
+                if attempt == self.max_attempts:
+                    raise
+
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    async def _write_one_by_one(self, writes: PendingWrites):
+        split = writes.split()
+        for i, write in enumerate(split):
+            try:
+                await self._write_with_retries(write)
+            except asyncio.CancelledError:
+                for unwritten in split[i:]:
+                    self._put_back(unwritten)
+                raise
+            except Exception:
+                logger.exception(
+                    f"Dropped write after {self.max_attempts} attempts:"
+                    f" {write.to_log()}"
+                )
+
+    def _take_batch(self):
+        questions = self._questions[: self.max_batch_size]
+        del self._questions[: len(questions)]
+
+        # Token usage goes with the first batch, whole
+        used_tokens = dict(self._used_tokens)
+        self._used_tokens.clear()
+
+        return PendingWrites.of_questions(questions, used_tokens=used_tokens)
+
+    def _put_back(self, writes: PendingWrites):
+        self._questions[:0] = writes.questions
+        for user_id, tokens in writes.used_tokens.items():
+            self._used_tokens[user_id] += tokens
+
+    async def flush(self):
+        async with self._lock:
+            while self.num_pending:
+                writes = self._take_batch()
+
+                try:
+                    await self._write(writes)
+                except asyncio.CancelledError:
+                    self._put_back(writes)
+                    raise
+                except Exception:
+                    logger.exception(
+                        f"Batch of {len(writes.questions)} questions failed,"
+                        " writing one by one"
+                    )
+                    await self._write_one_by_one(writes)
+
+
+question_writer = QuestionWriter(
+    flush_interval=SETTINGS.question_writer_flush_interval,
+    max_batch_size=SETTINGS.question_writer_batch_size,
+    max_attempts=SETTINGS.question_writer_max_attempts,
+)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import sqlalchemy as sa
 from sqlalchemy.orm import selectinload
@@ -64,24 +64,20 @@ class QuestionRepository:
         self, question_id: int, chunks: list[InfoBlobChunkInDBWithScore]
     ):
         if not chunks:
-            return []
-
-        stmt = (
-            sa.insert(InfoBlobReferences)
-            .values(
-                [
-                    dict(
-                        question_id=question_id,
-                        info_blob_id=chunk.info_blob_id,
-                        similarity_score=chunk.score,
-                    )
-                    for chunk in chunks
-                ]
-            )
-            .returning(InfoBlobReferences)
+            return
+
+        stmt = sa.insert(InfoBlobReferences).values(
+            [
+                dict(
+                    question_id=question_id,
+                    info_blob_id=chunk.info_blob_id,
+                    similarity_score=chunk.score,
+                )
+                for chunk in chunks
+            ]
         )
 
-        return (await self.session.scalars(stmt)).all()
+        await self.session.execute(stmt)
 
     async def _add_files(self, question_id: int, files: list[File]):
         stmt = sa.insert(QuestionsFiles).values(
@@ -93,40 +89,102 @@ class QuestionRepository:
     async def get(self, id: UUID):
         return await self.delegate.get(id)
 
-    async def add(
+    async def insert(
         self,
         question: QuestionAdd,
         info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
         files: list[File] = [],
-    ):
-        stmt = (
-            sa.insert(Questions)
-            .values(**question.model_dump(exclude={"info_blobs", "logging_details"}))
-            .returning(Questions)
-        )
+    ) -> UUID:
+        """Inserts the question and what belongs to it, without reading anything
+        back but its id."""
+        values = question.model_dump(exclude={"info_blobs", "logging_details"})
 
-        stmt = self._add_options(stmt)
+        if question.logging_details is not None:
+            stmt = (
+                sa.insert(logging_table)
+                .values(**question.logging_details.model_dump())
+                .returning(logging_table.c.id)
+            )
+            values["logging_details_id"] = await self.session.scalar(stmt)
 
-        question_record = await self.session.scalar(stmt)
+        stmt = sa.insert(Questions).values(**values).returning(Questions.id)
+        question_id = await self.session.scalar(stmt)
 
-        question_record.info_blob_references = await self._add_references(
-            question_id=question_record.id, chunks=info_blob_chunks
-        )
+        await self._add_references(question_id=question_id, chunks=info_blob_chunks)
 
         if files:
-            await self._add_files(question_id=question_record.id, files=files)
+            await self._add_files(question_id=question_id, files=files)
 
-        if question.logging_details is not None:
-            stmt = (
-                sa.insert(logging_table)
-                .values(**question.logging_details.model_dump())
-                .returning(logging_table)
+        return question_id
+
+    async def insert_many(
+        self,
+        questions: list[QuestionAdd],
+        info_blob_chunks: list[list[InfoBlobChunkInDBWithScore]],
+        files: list[list[File]],
+    ) -> list[UUID]:
+        """Inserts the questions, with the chunks and files of each at the same
+        position, in one statement per table. The ids are made here, so that
+        nothing has to be read back."""
+        if not questions:
+            return []
+
+        logging_values, question_values, reference_values, file_values = [], [], [], []
+        for question, chunks, question_files in zip(
+            questions, info_blob_chunks, files, strict=True
+        ):
+            values = question.model_dump(exclude={"info_blobs", "logging_details"})
+            values["id"] = uuid4()
+            # Every row of a multi-row insert has the same columns
+            values["logging_details_id"] = None
+
+            if question.logging_details is not None:
+                values["logging_details_id"] = uuid4()
+                logging_values.append(
+                    dict(
+                        id=values["logging_details_id"],
+                        **question.logging_details.model_dump(),
+                    )
+                )
+
+            question_values.append(values)
+            reference_values.extend(
+                dict(
+                    question_id=values["id"],
+                    info_blob_id=chunk.info_blob_id,
+                    similarity_score=chunk.score,
+                )
+                for chunk in chunks
+            )
+            file_values.extend(
+                dict(question_id=values["id"], file_id=file.id)
+                for file in question_files
+            )
+
+        if logging_values:
+            await self.session.execute(sa.insert(logging_table).values(logging_values))
+
+        await self.session.execute(sa.insert(Questions).values(question_values))
+
+        if reference_values:
+            await self.session.execute(
+                sa.insert(InfoBlobReferences).values(reference_values)
             )
-            result = await self.session.execute(stmt)
-            logging_details = result.scalar_one()
-            question_record.logging_details = logging_details
 
-        return await self.get(question_record.id)
+        if file_values:
+            await self.session.execute(sa.insert(QuestionsFiles).values(file_values))
+
+        return [values["id"] for values in question_values]
+
+    async def add(
+        self,
+        question: QuestionAdd,
+        info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
+        files: list[File] = [],
+    ):
+        id = await self.insert(question, info_blob_chunks=info_blob_chunks, files=files)
+
+        return await self.get(id)
 
     async def get_by_service(self, service_id: int):
         stmt = (
@@ -9,6 +9,7 @@ from instorage.database.database import AsyncSession
 from instorage.database.repositories.base import BaseRepositoryDelegate
 from instorage.database.tables.roles_table import Roles
 from instorage.roles.role import RoleCreate, RoleInDB, RoleUpdate
+from instorage.users.principal_cache import principal_cache
 
 
 class RolesRepository:
@@ -23,10 +24,20 @@ class RolesRepository:
         return await self.delegate.add(role)
 
     async def update_role(self, role: RoleUpdate) -> RoleInDB:
-        return await self.delegate.update(role)
+        role_in_db = await self.delegate.update(role)
+        if role_in_db is not None:
+            principal_cache.invalidate_on_commit(
+                self.session, tenant_id=role_in_db.tenant_id
+            )
+        return role_in_db
 
     async def delete_role_by_id(self, id: UUID) -> RoleInDB:
-        return await self.delegate.delete(id)
+        role_in_db = await self.delegate.delete(id)
+        if role_in_db is not None:
+            principal_cache.invalidate_on_commit(
+                self.session, tenant_id=role_in_db.tenant_id
+            )
+        return role_in_db
 
     async def get_by_tenant(self, tenant_id: UUID) -> List[RoleInDB]:
         return await self.delegate.filter_by(conditions={Roles.tenant_id: tenant_id})
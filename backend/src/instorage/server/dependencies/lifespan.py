@@ -2,13 +2,21 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from instorage.allowed_origins.allowed_origin_cache import allowed_origin_cache
 from instorage.database.database import sessionmanager
+from instorage.info_blobs.vector_index_builder import vector_index_builder
 from instorage.jobs.job_manager import job_manager
 from instorage.main.aiohttp_client import aiohttp_client
 from instorage.main.config import SETTINGS
+from instorage.main.http_clients import http_clients
+from instorage.main.redis_client import redis_client
+from instorage.questions.question_writer import question_writer
 from instorage.server.dependencies.ai_models import init_models
 from instorage.server.dependencies.modules import init_modules
 from instorage.server.dependencies.predefined_roles import init_predefined_roles
+from instorage.server.dependencies.vector_indexes import init_pgvector
+from instorage.spaces.space_snapshot_cache import space_snapshot_cache
+from instorage.users.principal_cache import principal_cache
 
 
 @asynccontextmanager
@@ -20,7 +28,13 @@ async def lifespan(app: FastAPI):
 
 async def startup():
     aiohttp_client.start()
+    http_clients.start()
+    redis_client.start()
+    principal_cache.start()
+    allowed_origin_cache.start()
+    space_snapshot_cache.start()
     sessionmanager.init(SETTINGS.database_url)
+    question_writer.start()
     await job_manager.init()
 
     # init predefined roles
@@ -32,8 +46,19 @@ async def startup():
     # init modules
     await init_modules()
 
+    # check pgvector
+    await init_pgvector()
+
 
 async def shutdown():
+    # Flush pending writes while the database is still there
+    await question_writer.stop()
+    await vector_index_builder.stop()
     await sessionmanager.close()
     await aiohttp_client.stop()
+    await http_clients.stop()
+    await principal_cache.stop()
+    await allowed_origin_cache.stop()
+    await space_snapshot_cache.stop()
+    await redis_client.stop()
     await job_manager.close()
@@ -0,0 +1,34 @@
+import sqlalchemy as sa
+
+from instorage.database.database import sessionmanager
+from instorage.database.vector_index import pgvector
+from instorage.main.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+async def init_pgvector():
+    """Reads the version of pgvector. Missing vector indexes are not built here,
+    see instorage.info_blobs.vector_index_builder."""
+    try:
+        async with sessionmanager.session() as session:
+            version = await session.scalar(
+                sa.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            )
+
+        if version is None:
+            logger.warning("pgvector is not installed")
+            return
+
+        pgvector.set_version(version)
+        if not pgvector.supports_iterative_scan:
+            logger.warning(
+                f"pgvector {version} has no iterative index scans, searches that"
+                " filter on groups may return fewer chunks than asked for."
+                " Upgrade to pgvector 0.8 or later."
+            )
+
+    except Exception as e:
+        logger.exception(
+            f"Reading the pgvector version crashed with next error: {str(e)}"
+        )
@@ -88,7 +88,9 @@ async def custom_http_500_exception_handler(request, exc):
 
         # If we only allow specific origins, then we have to mirror back
         # the Origin header in the response.
-        elif not cors.allow_all_origins and await cors.is_allowed_origin(origin=origin):
+        elif not cors.allow_all_origins and await cors.is_allowed_origin_for_scope(
+            request.scope, origin
+        ):
             response.headers["Access-Control-Allow-Origin"] = origin
             response.headers.add_vary_header("Origin")
 
@@ -13,6 +13,7 @@ from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 ALL_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
 SAFELISTED_HEADERS = {"Accept", "Accept-Language", "Content-Language", "Content-Type"}
+ALLOWED_ORIGIN_STATE_KEY = "cors_allowed_origin"
 
 
 class CORSMiddleware:
@@ -115,6 +116,18 @@ class CORSMiddleware:
 
         return False
 
+    async def is_allowed_origin_for_scope(self, scope: Scope, origin: str) -> bool:
+        """Like `is_allowed_origin`, but resolved once per request, however many
+        times the request asks."""
+        state = scope.setdefault("state", {})
+        resolved = state.get(ALLOWED_ORIGIN_STATE_KEY)
+
+        if resolved is None or resolved[0] != origin:
+            resolved = (origin, await self.is_allowed_origin(origin=origin))
+            state[ALLOWED_ORIGIN_STATE_KEY] = resolved
+
+        return resolved[1]
+
     async def preflight_response(self, request_headers: Headers) -> Response:
         requested_origin = request_headers["origin"]
         requested_method = request_headers["access-control-request-method"]
@@ -156,11 +169,13 @@ class CORSMiddleware:
     async def simple_response(
         self, scope: Scope, receive: Receive, send: Send, request_headers: Headers
     ) -> None:
-        send = functools.partial(self.send, send=send, request_headers=request_headers)
+        send = functools.partial(
+            self.send, send=send, scope=scope, request_headers=request_headers
+        )
         await self.app(scope, receive, send)
 
     async def send(
-        self, message: Message, send: Send, request_headers: Headers
+        self, message: Message, send: Send, scope: Scope, request_headers: Headers
     ) -> None:
         if message["type"] != "http.response.start":
             await send(message)
@@ -179,7 +194,9 @@ class CORSMiddleware:
 
         # If we only allow specific origins, then we have to mirror back
         # the Origin header in the response.
-        elif not self.allow_all_origins and await self.is_allowed_origin(origin=origin):
+        elif not self.allow_all_origins and await self.is_allowed_origin_for_scope(
+            scope, origin
+        ):
             self.allow_explicit_origin(headers, origin)
 
         await send(message)
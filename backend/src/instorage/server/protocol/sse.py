@@ -0,0 +1,42 @@
+import uuid
+from typing import Optional
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+# What sse_starlette ends lines and events with
+SEPARATOR = b"\r\n"
+
+
+def _start_event(event: Optional[str] = None):
+    if event is None:
+        return b"data: "
+
+    return b"event: " + event.encode() + SEPARATOR + b"data: "
+
+
+def _end_event():
+    return SEPARATOR + SEPARATOR
+
+
+def encode_event(data: bytes, event: Optional[str] = None) -> bytes:
+    """Frames `data` as a server-sent event, the way sse_starlette would.
+    `data` has to be a single line, which serialised JSON always is."""
+    return _start_event(event) + data + _end_event()
+
+
+class FieldEventEncoder:
+    """Encodes a stream of events that only differ in one string field of
+    `model`. The model is serialised and framed once, and each value is
+    serialised on its own and put in its place."""
+
+    def __init__(self, model: BaseModel, field: str, event: Optional[str] = None):
+        placeholder = uuid.uuid4().hex
+        serialised = model.model_copy(update={field: placeholder}).model_dump_json()
+        head, tail = serialised.split(f'"{placeholder}"')
+
+        self._head = _start_event(event) + head.encode()
+        self._tail = tail.encode() + _end_event()
+
+    def encode(self, value: str) -> bytes:
+        return self._head + to_json(value) + self._tail
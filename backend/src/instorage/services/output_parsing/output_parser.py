@@ -1,9 +1,13 @@
 import abc
 import json
 from abc import abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
 
 from langchain import output_parsers
+from pydantic import BaseModel, ValidationError
 
+from instorage.main.config import get_settings
 from instorage.services.output_parsing.pydantic_model_factory import (
     PydanticModelFactory,
 )
@@ -62,19 +66,47 @@ class ListOutputParser(OutputParserBase):
         return self.output_parser.get_format_instructions()
 
 
+@dataclass(frozen=True)
+class CompiledSchema:
+    model: type[BaseModel]
+    output_parser: output_parsers.PydanticOutputParser
+    format_instructions: str
+
+
+@lru_cache(maxsize=get_settings().compiled_schema_cache_size)
+def _compile_schema(schema_json: str) -> CompiledSchema:
+    factory = PydanticModelFactory(json.loads(schema_json))
+    model = factory.create_pydantic_model()
+
+    return CompiledSchema(
+        model=model,
+        output_parser=output_parsers.PydanticOutputParser(pydantic_object=model),
+        format_instructions=factory.get_format_instructions(),
+    )
+
+
+def compile_schema(schema: dict) -> CompiledSchema:
+    """Compiled once per schema. The schema itself is the key, so a service
+    whose schema is changed gets it compiled anew."""
+    return _compile_schema(json.dumps(schema))
+
+
 class PydanticOutputParser(OutputParserBase):
     def __init__(self, schema):
-        self.factory = PydanticModelFactory(schema)
-        Model = self.factory.create_pydantic_model()
-        self.output_parser = output_parsers.PydanticOutputParser(pydantic_object=Model)
+        self.compiled = compile_schema(schema)
 
     def parse(self, text):
-        parsed = self.output_parser.parse(text)
+        try:
+            parsed = self.compiled.model.model_validate_json(text)
+        except ValidationError:
+            # Most likely in a markdown code block or with text around it,
+            # which the langchain parser finds the JSON in
+            parsed = self.compiled.output_parser.parse(text)
 
         return PydanticOutput(parsed)
 
     def get_format_instructions(self):
-        return self.factory.get_format_instructions()
+        return self.compiled.format_instructions
 
 
 class TextOutputParser(OutputParserBase):
@@ -3,6 +3,7 @@ from uuid import UUID
 
 from pydantic import AliasChoices, AliasPath, BaseModel, Field, model_validator
 
+from instorage.ai_models.completion_models.batch_completion import BatchRequest
 from instorage.ai_models.completion_models.completion_model import (
     CompletionModel,
     CompletionModelPublic,
@@ -11,9 +12,11 @@ from instorage.ai_models.completion_models.completion_model import (
 from instorage.groups.group import GroupInDBBase, GroupPublicBase
 from instorage.info_blobs.info_blob import (
     InfoBlobChunkInDBWithScore,
-    InfoBlobInDB,
     InfoBlobPublic,
+    InfoBlobPublicNoText,
 )
+from instorage.main.config import get_settings
+from instorage.main.exceptions import ErrorCodes
 from instorage.main.models import InDB, ModelId, ResourcePermissionsMixin, partial_model
 from instorage.users.user import UserInDBBase, UserPublicBase
 
@@ -100,6 +103,25 @@ class ServiceOutput(BaseModel):
     output: dict | list | str
 
 
+class RunServiceBatch(BaseModel):
+    inputs: list[str] = Field(
+        min_length=1, max_length=get_settings().service_batch_max_inputs
+    )
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+
+
+class ServiceBatchError(BaseModel):
+    message: str
+    intric_error_code: Optional[ErrorCodes] = None
+
+
+class ServiceBatchResult(BaseModel):
+    # The position of the input in the batch
+    index: int
+    output: Optional[bool | list | dict | str] = None
+    error: Optional[ServiceBatchError] = None
+
+
 class ServiceRun(BaseModel):
     id: UUID
     input: str
@@ -111,7 +133,27 @@ class ServiceRun(BaseModel):
 class DatastoreResult(BaseModel):
     chunks: list[InfoBlobChunkInDBWithScore]
     no_duplicate_chunks: list[InfoBlobChunkInDBWithScore]
-    info_blobs: list[InfoBlobInDB]
+    info_blobs: list[InfoBlobPublicNoText]
+
+
+class ProviderBatchItem(BaseModel):
+    index: int
+    input: str
+    info_blob_chunks: list[InfoBlobChunkInDBWithScore]
+    input_token_count: int
+    total_token_count: int
+
+
+class ProviderBatch(BaseModel):
+    """A batch run, ready to be sent through the provider's batch interface.
+    All but the requests is saved with the job, to finish the run with once the
+    provider has."""
+
+    requests: list[BatchRequest] = []
+    # By the custom id of their request
+    items: dict[str, ProviderBatchItem] = {}
+    # Of the inputs that failed before being sent
+    errors: list[ServiceBatchResult] = []
 
 
 class RunnerResult(BaseModel):
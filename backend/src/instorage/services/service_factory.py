@@ -19,6 +19,12 @@ def get_services_service(container: Container = Depends(get_container(with_user=
 async def get_runner_from_service(
     id: str = Path(), container: Container = Depends(get_container(with_user=True))
 ):
+    return await create_service_runner(container=container, id=id)
+
+
+async def create_service_runner(container: Container, id: str):
+    """Resolves the service and its models into a runner, in the api as well
+    as in the worker."""
     service = await container.service_service().get_service(id)
 
     override_completion_model(
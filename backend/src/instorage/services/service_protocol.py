@@ -1,9 +1,19 @@
 import json
 
+import pydantic
+
 from instorage.info_blobs.info_blob import InfoBlobMetadata, InfoBlobPublic
+from instorage.main.config import get_settings
+from instorage.main.exceptions import BadRequestException
 from instorage.main.logging import get_logger
 from instorage.questions.question import Question
-from instorage.services.service import Service, ServicePublicWithUser, ServiceRun
+from instorage.services.service import (
+    RunService,
+    Service,
+    ServiceBatchResult,
+    ServicePublicWithUser,
+    ServiceRun,
+)
 
 logger = get_logger(__name__)
 
@@ -31,3 +41,34 @@ def to_question(question: Question, service: Service):
             for blob in question.info_blobs
         ],
     )
+
+
+def to_batch_inputs(content: bytes | str) -> list[str]:
+    """Reads the inputs of a batch from JSONL, one `{"input": ...}` per line."""
+    if isinstance(content, bytes):
+        content = content.decode("utf-8")
+
+    inputs = []
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        if not line.strip():
+            continue
+
+        try:
+            inputs.append(RunService.model_validate_json(line).input)
+        except pydantic.ValidationError as e:
+            raise BadRequestException(
+                f"Line {line_number} is not a valid input."
+            ) from e
+
+    if not inputs:
+        raise BadRequestException("The batch has no inputs.")
+
+    max_inputs = get_settings().service_batch_max_inputs
+    if len(inputs) > max_inputs:
+        raise BadRequestException(f"A batch can hold at most {max_inputs} inputs.")
+
+    return inputs
+
+
+def to_ndjson_line(result: ServiceBatchResult):
+    return result.model_dump_json() + "\n"
@@ -1,11 +1,19 @@
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, UploadFile
+from fastapi.responses import StreamingResponse
 
+from instorage.database.database import AsyncSession, get_session
+from instorage.database.transaction import gen_transaction
+from instorage.jobs import job_factory
+from instorage.jobs.job_models import JobPublic
+from instorage.jobs.task_service import TaskService
 from instorage.main.models import PaginatedResponse
 from instorage.server.protocol import responses
 from instorage.services.service import (
     RunService,
+    RunServiceBatch,
     ServiceCreatePublic,
     ServiceOutput,
     ServicePublicWithUser,
@@ -16,7 +24,11 @@ from instorage.services.service_factory import (
     get_runner_from_service,
     get_services_service,
 )
-from instorage.services.service_protocol import from_domain_service, to_question
+from instorage.services.service_protocol import (
+    from_domain_service,
+    to_ndjson_line,
+    to_question,
+)
 from instorage.services.service_runner import ServiceRunner
 from instorage.services.service_service import ServiceService
 from instorage.spaces.api.space_models import TransferApplicationRequest
@@ -108,6 +120,67 @@ async def run_service(
     return ServiceOutput(output=output.result)
 
 
+@router.post(
+    "/{id}/run/batch/",
+    response_class=StreamingResponse,
+    responses=responses.get_responses([404, 400]),
+)
+async def run_service_batch(
+    batch: RunServiceBatch,
+    service_runner: ServiceRunner = Depends(get_runner_from_service),
+    db_session: AsyncSession = Depends(get_session),
+):
+    """Runs the service on every input. The results are streamed back as
+    newline delimited JSON, one line per input, in the order they finish.
+
+    Each line holds the `index` of its input and either the `output` or the
+    `error` of that input. An input that fails does not fail the batch."""
+
+    @gen_transaction(db_session)
+    async def result_stream():
+        async for result in service_runner.run_batch(
+            batch.inputs, max_concurrency=batch.max_concurrency
+        ):
+            yield to_ndjson_line(result)
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/{id}/run/batch/job/",
+    response_model=JobPublic,
+    status_code=202,
+    responses=responses.get_responses([404, 400, 413]),
+)
+async def queue_service_batch(
+    id: UUID,
+    file: UploadFile,
+    max_concurrency: Optional[int] = Query(default=None, ge=1),
+    provider_batch: bool = False,
+    service: ServiceService = Depends(get_services_service),
+    task_service: TaskService = Depends(job_factory.get_task_service),
+):
+    """Starts a job that runs the service on every line of a JSONL file,
+    each line being `{"input": "..."}`. Use the job operations to keep track of
+    this job.
+
+    Once complete, the `result_location` of the job holds the results, as
+    newline delimited JSON in the order of the inputs.
+
+    With `provider_batch`, the completions are sent through the batch interface
+    of the model's provider. Such a job can take hours, but does not compete
+    with interactive use for rate limits. Only OpenAI and Azure models support
+    it."""
+    service_in_db = await service.get_service(id)
+
+    return await task_service.queue_service_batch(
+        service_in_db,
+        file.file,
+        max_concurrency=max_concurrency,
+        provider_batch=provider_batch,
+    )
+
+
 @router.get(
     "/{id}/run/",
     response_model=PaginatedResponse[ServiceRun],
@@ -1,23 +1,50 @@
+import asyncio
+from typing import AsyncIterator, Optional
+
 import pydantic
 
-from instorage.ai_models.completion_models.completion_service import (
-    CompletionService,
-    count_tokens,
+from instorage.ai_models.completion_models.batch_completion import BatchResult
+from instorage.ai_models.completion_models.completion_limiter import (
+    get_completion_limiter,
 )
+from instorage.ai_models.completion_models.completion_service import CompletionService
 from instorage.assistants.assistant_runner import RunnerDelegate
+from instorage.assistants.retrieval_query import RetrievalQuery
+from instorage.files.file_models import File
 from instorage.files.file_service import FileService
-from instorage.main.exceptions import PydanticParseError
+from instorage.main.config import get_settings
+from instorage.main.exceptions import EXCEPTION_MAP, PydanticParseError
 from instorage.main.logging import get_logger
 from instorage.main.models import ModelId
 from instorage.questions.question import QuestionAdd
+from instorage.questions.question_writer import PendingQuestion, question_writer
 from instorage.questions.questions_repo import QuestionRepository
 from instorage.services.output_parsing.output_parser import OutputParserBase
-from instorage.services.service import RunnerResult, Service
+from instorage.services.service import (
+    DatastoreResult,
+    ProviderBatch,
+    ProviderBatchItem,
+    RunnerResult,
+    Service,
+    ServiceBatchError,
+    ServiceBatchResult,
+)
 from instorage.users.user import UserInDB
 
 logger = get_logger(__name__)
 
 
+def _to_batch_error(exc: Exception):
+    for exception, (_, message, error_code) in EXCEPTION_MAP.items():
+        if isinstance(exc, exception):
+            return ServiceBatchError(
+                message=message or str(exc), intric_error_code=error_code
+            )
+
+    logger.exception("Service batch item failed:", exc_info=exc)
+    return ServiceBatchError(message="Something went wrong.")
+
+
 class ServiceRunner:
     def __init__(
         self,
@@ -39,48 +66,66 @@ class ServiceRunner:
         self.prompt = prompt
         self.file_service = file_service
 
-    async def run(
-        self,
-        input: str,
-        file_ids: list[ModelId] = [],
-    ):
-        # Get the relevant texts
-        datastore_result = await self.runner_delegate.get_references(
-            input, self.service.groups
-        )
-
-        files = await self.file_service.get_files_by_ids(file_ids)
-
-        # Query the AI models
-        ai_response = await self.completion_service.get_response(
-            question=input,
-            files=files,
-            prompt=self.prompt,
-            info_blob_chunks=datastore_result.chunks,
-            model_kwargs=self.service.completion_model_kwargs,
-        )
-
-        logger.debug(f"Service response: '{ai_response.completion}'")
+    def _to_output(self, input: str, completion: str, input_token_count: int):
+        logger.debug(f"Service response: '{completion}'")
 
         try:
-            output = self.output_parser.parse(ai_response.completion)
+            output = self.output_parser.parse(completion)
         except pydantic.ValidationError as e:
             raise PydanticParseError("Error parsing output.") from e
 
         # Count tokens
         answer = output.to_string()
-        num_tokens_answer = count_tokens(answer)
+        num_tokens_answer = self.completion_service.count_tokens(answer)
 
-        # Save
         question = QuestionAdd(
             tenant_id=self.user.tenant_id,
             question=input,
             answer=answer,
-            num_tokens_question=ai_response.total_token_count,
+            num_tokens_question=input_token_count,
             num_tokens_answer=num_tokens_answer,
             completion_model_id=self.service.completion_model.id,
             service_id=self.service.id,
         )
+
+        return output, question
+
+    async def _complete(
+        self,
+        input: str,
+        datastore_result: DatastoreResult,
+        files: list[File] = [],
+    ):
+        # Query the AI models
+        ai_response = await self.completion_service.get_response(
+            question=input,
+            files=files,
+            prompt=self.prompt,
+            info_blob_chunks=datastore_result.chunks,
+            model_kwargs=self.service.completion_model_kwargs,
+        )
+
+        output, question = self._to_output(
+            input, ai_response.completion, ai_response.input_token_count
+        )
+
+        return output, question, ai_response.total_token_count
+
+    async def run(
+        self,
+        input: str,
+        file_ids: list[ModelId] = [],
+    ):
+        # Get the relevant texts
+        datastore_result = await self.runner_delegate.get_references(
+            input, self.service.groups
+        )
+
+        files = await self.file_service.get_files_by_ids(file_ids)
+
+        output, question, _ = await self._complete(input, datastore_result, files=files)
+
+        # Save
         await self.question_repo.add(
             question,
             info_blob_chunks=datastore_result.no_duplicate_chunks,
@@ -88,3 +133,197 @@ class ServiceRunner:
         )
 
         return RunnerResult(result=output.to_value(), datastore_result=datastore_result)
+
+    async def _run_item(
+        self,
+        index: int,
+        input: str,
+        db_lock: asyncio.Lock,
+        completion_limiter: asyncio.Semaphore,
+    ):
+        try:
+            # Embedding needs no database, only the search does
+            embedding = await self.runner_delegate.embed_query(
+                RetrievalQuery(turns=[input]), self.service.groups
+            )
+            async with db_lock:
+                datastore_result = await self.runner_delegate.get_references(
+                    input, self.service.groups, embedding=embedding
+                )
+
+            async with completion_limiter:
+                output, question, total_token_count = await self._complete(
+                    input, datastore_result
+                )
+
+        except Exception as exc:
+            return ServiceBatchResult(index=index, error=_to_batch_error(exc)), None
+
+        pending = PendingQuestion(
+            question=question,
+            info_blob_chunks=datastore_result.no_duplicate_chunks,
+            input_tokens=total_token_count,
+            user_id=self.user.id,
+        )
+
+        return ServiceBatchResult(index=index, output=output.to_value()), pending
+
+    async def run_batch(
+        self, inputs: list[str], max_concurrency: Optional[int] = None
+    ) -> AsyncIterator[ServiceBatchResult]:
+        """Runs the service on every input, with this runner's service, prompt and
+        parser, and yields the results as they finish.
+
+        Up to `max_concurrency` inputs run at a time, and no more completions
+        than the provider allows for in this process, across batches. The
+        statements on the database session are made one at a time, as a session
+        can not run them concurrently. An input that fails is reported in its
+        result, and the rest of the batch goes on. The questions are handed to
+        the question writer in batches, to be written in bulk."""
+        settings = get_settings()
+        max_concurrency = min(
+            max_concurrency or settings.service_batch_concurrency,
+            settings.service_batch_concurrency,
+        )
+        semaphore = asyncio.Semaphore(max_concurrency)
+        db_lock = asyncio.Lock()
+        completion_limiter = get_completion_limiter(self.service.completion_model)
+        pending_questions: list[PendingQuestion] = []
+
+        async def run_item(index: int, input: str):
+            async with semaphore:
+                return await self._run_item(
+                    index, input, db_lock=db_lock, completion_limiter=completion_limiter
+                )
+
+        async def write_questions():
+            if not pending_questions:
+                return
+
+            async with db_lock:
+                await question_writer.add_questions(
+                    list(pending_questions), session=self.question_repo.session
+                )
+            pending_questions.clear()
+
+        tasks = [
+            asyncio.create_task(run_item(index, input))
+            for index, input in enumerate(inputs)
+        ]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                result, pending = await task
+
+                if pending is not None:
+                    pending_questions.append(pending)
+                    if len(pending_questions) >= settings.question_writer_batch_size:
+                        await write_questions()
+
+                yield result
+
+            await write_questions()
+
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def prepare_provider_batch(self, inputs: list[str]) -> ProviderBatch:
+        """Finds the references of every input and builds its request, to be
+        sent through the provider's batch interface. An input that fails here
+        is reported in the errors of the batch."""
+        batch = ProviderBatch()
+
+        for index, input in enumerate(inputs):
+            try:
+                datastore_result = await self.runner_delegate.get_references(
+                    input, self.service.groups
+                )
+                request, input_token_count, total_token_count = (
+                    await self.completion_service.get_batch_request(
+                        custom_id=str(index),
+                        question=input,
+                        prompt=self.prompt,
+                        info_blob_chunks=datastore_result.chunks,
+                        model_kwargs=self.service.completion_model_kwargs,
+                    )
+                )
+            except Exception as exc:
+                batch.errors.append(
+                    ServiceBatchResult(index=index, error=_to_batch_error(exc))
+                )
+                continue
+
+            batch.requests.append(request)
+            batch.items[request.custom_id] = ProviderBatchItem(
+                index=index,
+                input=input,
+                info_blob_chunks=datastore_result.no_duplicate_chunks,
+                input_token_count=input_token_count,
+                total_token_count=total_token_count,
+            )
+
+        return batch
+
+    async def finish_provider_batch(
+        self, batch: ProviderBatch, completions: dict[str, BatchResult]
+    ) -> list[ServiceBatchResult]:
+        """Parses what the provider completed and saves it, in the order of the
+        inputs.
+
+        The usage is that of what the provider completed, as billed by it when
+        it tells, else as counted when the batch was prepared."""
+        results = list(batch.errors)
+        pending_questions = []
+        used_tokens = 0
+
+        for custom_id, item in batch.items.items():
+            completion = completions[custom_id]
+            if completion.error is not None:
+                results.append(
+                    ServiceBatchResult(
+                        index=item.index,
+                        error=ServiceBatchError(message=completion.error),
+                    )
+                )
+                continue
+
+            input_tokens = (
+                completion.input_tokens
+                if completion.input_tokens is not None
+                else item.total_token_count
+            )
+            used_tokens += input_tokens
+
+            try:
+                output, question = self._to_output(
+                    item.input, completion.completion, item.input_token_count
+                )
+            except Exception as exc:
+                results.append(
+                    ServiceBatchResult(index=item.index, error=_to_batch_error(exc))
+                )
+                continue
+
+            results.append(
+                ServiceBatchResult(index=item.index, output=output.to_value())
+            )
+            pending_questions.append(
+                PendingQuestion(
+                    question=question,
+                    info_blob_chunks=item.info_blob_chunks,
+                    input_tokens=input_tokens,
+                    user_id=self.user.id,
+                )
+            )
+
+        await question_writer.add_questions(
+            pending_questions, session=self.question_repo.session
+        )
+        if used_tokens:
+            await question_writer.add_used_tokens(
+                self.user.id, used_tokens, session=self.question_repo.session
+            )
+
+        return sorted(results, key=lambda result: result.index)
@@ -66,5 +66,17 @@ class AskResponse(BaseModel):
     model: Optional[CompletionModelPublic] = None
 
 
+class AskResponseHeader(BaseModel):
+    session_id: UUID
+    question: str
+    files: list[FilePublic]
+    references: list[InfoBlobPublicNoText]
+    model: Optional[CompletionModelPublic] = None
+
+
+class AskResponseDelta(BaseModel):
+    answer: str
+
+
 class SessionResponse(BaseModel):
     sessions: list[SessionId]
@@ -1,3 +1,4 @@
+from typing import Optional
 from uuid import UUID
 
 from instorage.ai_models.completion_models.completion_model import CompletionModel
@@ -7,6 +8,7 @@ from instorage.info_blobs.info_blob import InfoBlobChunkInDBWithScore
 from instorage.logging.logging import LoggingDetails
 from instorage.main.exceptions import NotFoundException, UnauthorizedException
 from instorage.questions.question import QuestionAdd
+from instorage.questions.question_writer import PendingQuestion, question_writer
 from instorage.questions.questions_repo import QuestionRepository
 from instorage.sessions.session import SessionAdd, SessionFeedback, SessionInDB
 from instorage.sessions.sessions_repo import SessionRepository
@@ -34,13 +36,21 @@ class SessionService:
         if assistant_id is not None and session.assistant.id != assistant_id:
             raise NotFoundException("Session belongs to another assistant")
 
-    async def get_session_by_uuid(self, id: UUID, assistant_id: UUID = None):
-        session = await self.session_repo.get(id=id)
+    async def get_session_by_uuid(
+        self, id: UUID, assistant_id: UUID = None, with_questions: bool = True
+    ):
+        if with_questions:
+            session = await self.session_repo.get(id=id)
+        else:
+            session = await self.session_repo.get_without_questions(id)
 
         self._check_exists_and_belongs_to_user(session, assistant_id=assistant_id)
 
         return session
 
+    async def get_history(self, session: SessionInDB, max_tokens: int):
+        return await self.session_repo.get_history(session.id, max_tokens=max_tokens)
+
     async def get_sessions_by_assistant(self, assistant_id: UUID):
         return await self.session_repo.get_by_assistant(assistant_id, self.user.id)
 
@@ -61,7 +71,7 @@ class SessionService:
 
         return await self.session_repo.add(session_add)
 
-    async def add_question_to_session(
+    def _build_question(
         self,
         *,
         question: str,
@@ -70,12 +80,10 @@ class SessionService:
         num_tokens_answer: int,
         session: SessionInDB,
         completion_model: CompletionModel = None,
-        info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
-        files: list[File] = [],
         logging_details: LoggingDetails = None,
     ):
         completion_model_id = completion_model.id if completion_model else None
-        question_add = QuestionAdd(
+        return QuestionAdd(
             tenant_id=self.user.tenant_id,
             question=question,
             answer=answer,
@@ -86,10 +94,56 @@ class SessionService:
             logging_details=logging_details,
         )
 
-        await self.question_repo.add(
-            question_add,
+    def _build_pending_question(
+        self,
+        question: QuestionAdd,
+        session: SessionInDB,
+        info_blob_chunks: list[InfoBlobChunkInDBWithScore],
+        files: list[File],
+        input_tokens: Optional[int] = None,
+    ):
+        return PendingQuestion(
+            question=question,
             info_blob_chunks=info_blob_chunks,
             files=files,
+            input_tokens=input_tokens,
+            user_id=self.user.id,
+            assistant_id=session.assistant.id if session.assistant else None,
+        )
+
+    async def add_question_to_session(
+        self,
+        *,
+        question: str,
+        answer: str,
+        num_tokens_question: int,
+        num_tokens_answer: int,
+        session: SessionInDB,
+        completion_model: CompletionModel = None,
+        info_blob_chunks: list[InfoBlobChunkInDBWithScore] = [],
+        files: list[File] = [],
+        logging_details: LoggingDetails = None,
+        input_tokens: Optional[int] = None,
+    ):
+        question_add = self._build_question(
+            question=question,
+            answer=answer,
+            num_tokens_question=num_tokens_question,
+            num_tokens_answer=num_tokens_answer,
+            session=session,
+            completion_model=completion_model,
+            logging_details=logging_details,
+        )
+
+        await question_writer.write_question(
+            self._build_pending_question(
+                question_add,
+                session,
+                info_blob_chunks=info_blob_chunks,
+                files=files,
+                input_tokens=input_tokens,
+            ),
+            session=self.question_repo.session,
         )
 
     async def leave_feedback(
@@ -3,7 +3,7 @@ from typing import Optional
 from uuid import UUID
 
 import sqlalchemy as sa
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import noload, selectinload
 
 from instorage.database.database import AsyncSession
 from instorage.database.repositories.base import BaseRepositoryDelegate
@@ -12,6 +12,7 @@ from instorage.database.tables.info_blobs_table import InfoBlobs
 from instorage.database.tables.questions_table import InfoBlobReferences, Questions
 from instorage.database.tables.sessions_table import Sessions
 from instorage.database.tables.users_table import Users
+from instorage.questions.question import Question
 from instorage.sessions.session import (
     SessionAdd,
     SessionFeedback,
@@ -79,6 +80,55 @@ class SessionRepository:
 
         return await self.delegate.filter_by(conditions={Sessions.user_id: user_id})
 
+    async def get_without_questions(self, id: UUID) -> Optional[SessionInDB]:
+        stmt = (
+            sa.select(Sessions)
+            .where(Sessions.id == id)
+            .options(
+                noload(Sessions.questions),
+                selectinload(Sessions.assistant).selectinload(Assistants.user),
+            )
+        )
+        session = await self.session.scalar(stmt)
+
+        if session is None:
+            return
+
+        return SessionInDB.model_validate(session)
+
+    async def get_history(self, session_id: UUID, max_tokens: int) -> list[Question]:
+        """The latest questions of the session whose saved token counts add up to
+        at most `max_tokens`, oldest first. Only the questions, the answers and
+        the files are loaded.
+
+        Questions saved without counts (chain breaker answers) count as nothing
+        here, the completion service counts them when it fits the history to
+        the model. Older questions, whose count is unknown, count as the bytes
+        of the question, at least as many as its tokens."""
+        num_tokens_question = sa.func.coalesce(
+            Questions.num_tokens_question, sa.func.octet_length(Questions.question)
+        )
+        running_tokens = (
+            sa.func.sum(num_tokens_question + Questions.num_tokens_answer)
+            .over(order_by=[Questions.created_at.desc(), Questions.id.desc()])
+            .label("running_tokens")
+        )
+        window = (
+            sa.select(Questions.id, running_tokens)
+            .where(Questions.session_id == session_id)
+            .subquery()
+        )
+        stmt = (
+            sa.select(Questions)
+            .join(window, window.c.id == Questions.id)
+            .where(window.c.running_tokens <= max_tokens)
+            .order_by(Questions.created_at, Questions.id)
+            .options(selectinload(Questions.files), noload("*"))
+        )
+        questions = await self.session.scalars(stmt)
+
+        return [Question.model_validate(question) for question in questions]
+
     async def get_by_assistant(self, assistant_id: int, user_id: UUID = None):
         query = (
             sa.select(Sessions)
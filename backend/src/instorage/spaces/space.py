@@ -34,6 +34,35 @@ class SpacePermissionsActions(Enum):
     DELETE = "delete"
 
 
+class SpaceModelsSnapshot:
+    """The models of a space, which is all that is needed to check that an
+    assistant may run, cheap to cache between requests."""
+
+    def __init__(
+        self,
+        is_personal: bool,
+        completion_model_ids: set[UUID],
+        embedding_model_ids: set[UUID],
+    ):
+        self.is_personal = is_personal
+        self.completion_model_ids = completion_model_ids
+        self.embedding_model_ids = embedding_model_ids
+
+    @classmethod
+    def from_space(cls, space: "Space"):
+        return cls(
+            is_personal=space.is_personal(),
+            completion_model_ids={model.id for model in space.completion_models},
+            embedding_model_ids={model.id for model in space.embedding_models},
+        )
+
+    def is_embedding_model_in_space(self, embedding_model_id: UUID | None) -> bool:
+        return self.is_personal or embedding_model_id in self.embedding_model_ids
+
+    def is_completion_model_in_space(self, completion_model_id: UUID | None) -> bool:
+        return self.is_personal or completion_model_id in self.completion_model_ids
+
+
 class Space:
     def __init__(
         self,
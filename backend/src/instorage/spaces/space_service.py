@@ -13,9 +13,10 @@ from instorage.main.exceptions import (
     UnauthorizedException,
 )
 from instorage.spaces.api.space_models import SpaceMember, SpaceRole
-from instorage.spaces.space import Space
+from instorage.spaces.space import Space, SpaceModelsSnapshot
 from instorage.spaces.space_factory import SpaceFactory
 from instorage.spaces.space_repo import SpaceRepository
+from instorage.spaces.space_snapshot_cache import space_snapshot_cache
 from instorage.users.user import UserInDB
 from instorage.users.user_repo import UsersRepository
 
@@ -109,6 +110,20 @@ class SpaceService:
 
         return space
 
+    async def get_space_models_snapshot(self, id: UUID) -> SpaceModelsSnapshot:
+        key = (id, self.user.id)
+
+        snapshot = space_snapshot_cache.get(key)
+        if snapshot is None:
+            generation = space_snapshot_cache.generation
+
+            # Personal spaces allow all models, so they need not be added here
+            space = await self._get_space(id)
+            snapshot = SpaceModelsSnapshot.from_space(space)
+            space_snapshot_cache.set(key, snapshot, generation=generation)
+
+        return snapshot
+
     async def update_space(
         self,
         id: UUID,
@@ -139,8 +154,10 @@ class SpaceService:
             completion_models=completion_models,
             embedding_models=embedding_models,
         )
+        space = await self.repo.update(space)
+        space_snapshot_cache.invalidate_on_commit(self.repo.session)
 
-        return await self.repo.update(space)
+        return space
 
     async def delete_space(self, id: UUID):
         space = await self.get_space(id)
@@ -152,6 +169,7 @@ class SpaceService:
             raise UnauthorizedException("User can't delete personal space")
 
         await self.repo.delete(space.id)
+        space_snapshot_cache.invalidate_on_commit(self.repo.session)
 
     async def get_spaces(self, *, include_personal: bool = False) -> list[Space]:
         spaces = await self.repo.get_spaces(self.user.id)
@@ -199,6 +217,7 @@ class SpaceService:
         space.remove_member(user_id)
 
         await self.repo.update(space)
+        space_snapshot_cache.invalidate_on_commit(self.repo.session)
 
     async def change_role_of_member(self, id: UUID, user_id: UUID, new_role: SpaceRole):
         if user_id == self.user.id:
@@ -211,6 +230,7 @@ class SpaceService:
 
         space.change_member_role(user_id, new_role)
         space = await self.repo.update(space)
+        space_snapshot_cache.invalidate_on_commit(self.repo.session)
 
         return space.get_member(user_id)
 
@@ -0,0 +1,85 @@
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import event
+
+from instorage.database.database import AsyncSession
+from instorage.main.cache import TTLCache
+from instorage.main.config import get_settings
+from instorage.main.invalidation import InvalidationChannel
+from instorage.main.redis_client import RedisClient, redis_client
+from instorage.spaces.space import SpaceModelsSnapshot
+
+INVALIDATION_CHANNEL = "space_snapshot_cache:invalidate"
+
+# (space id, user id), as whether the space may be read depends on the user
+SnapshotKey = tuple[UUID, UUID]
+
+
+class SpaceSnapshotCache:
+    """Caches the models and members of spaces, as snapshots. Any change to
+    the models or members of a space clears every snapshot, in this process
+    and, through redis, in the others.
+
+    A snapshot read before a change and set after it is not kept, so that a
+    concurrent request can not cache the old space again."""
+
+    def __init__(self, maxsize: int, ttl: float, redis: Optional[RedisClient] = None):
+        self._cache: TTLCache[SnapshotKey, SpaceModelsSnapshot] = TTLCache(
+            maxsize=maxsize, ttl=ttl
+        )
+        self._generation = 0
+        self._channel = InvalidationChannel(
+            INVALIDATION_CHANNEL,
+            redis=redis,
+            on_message=lambda _: self.clear(),
+            on_gap=self.clear,
+        )
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key: SnapshotKey) -> Optional[SpaceModelsSnapshot]:
+        return self._cache.get(key)
+
+    def set(self, key: SnapshotKey, snapshot: SpaceModelsSnapshot, generation: int):
+        if generation != self._generation:
+            return
+
+        self._cache.set(key, snapshot)
+
+    def invalidate(self):
+        self.clear()
+        self._channel.publish({})
+
+    def invalidate_on_commit(self, session: AsyncSession):
+        """Invalidates once `session` commits, before that the old space is
+        still what other requests read."""
+        event.listen(
+            session.sync_session,
+            "after_commit",
+            lambda _: self.invalidate(),
+            once=True,
+        )
+
+    def start(self):
+        self._channel.start()
+
+    async def stop(self):
+        await self._channel.stop()
+        self.clear()
+
+    def clear(self):
+        self._generation += 1
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+space_snapshot_cache = SpaceSnapshotCache(
+    maxsize=get_settings().space_snapshot_cache_size,
+    ttl=get_settings().space_snapshot_cache_ttl,
+    redis=redis_client,
+)
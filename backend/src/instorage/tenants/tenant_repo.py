@@ -13,6 +13,7 @@ from instorage.database.tables.tenant_table import Tenants
 from instorage.main import exceptions
 from instorage.main.models import ModelId
 from instorage.tenants.tenant import TenantBase, TenantInDB, TenantUpdate
+from instorage.users.principal_cache import principal_cache
 
 
 class TenantRepository:
@@ -53,19 +54,23 @@ class TenantRepository:
         tenant = await self.session.scalar(tenant_stmt)
 
         tenant.modules = modules.all()
+        principal_cache.invalidate_on_commit(self.session, tenant_id=tenant_id)
 
         return TenantInDB.model_validate(tenant)
 
     async def update_tenant(self, tenant: TenantUpdate) -> TenantInDB:
+        principal_cache.invalidate_on_commit(self.session, tenant_id=tenant.id)
         return await self.delegate.update(tenant)
 
     async def delete_tenant_by_id(self, id: UUID) -> TenantInDB:
+        principal_cache.invalidate_on_commit(self.session, tenant_id=id)
         return await self.delegate.delete(id)
 
     async def set_privacy_policy(
         self, privacy_policy: Optional[HttpUrl], tenant_id: UUID
     ) -> TenantInDB:
         privacy_policy = str(privacy_policy) if privacy_policy is not None else None
+        principal_cache.invalidate_on_commit(self.session, tenant_id=tenant_id)
         stmt = (
             sa.update(Tenants)
             .where(Tenants.id == tenant_id)
@@ -0,0 +1,36 @@
+from datetime import date
+from enum import Enum
+from typing import NamedTuple
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class UsageDimension(str, Enum):
+    TENANT = "tenant"
+    USER = "user"
+    ASSISTANT = "assistant"
+    COMPLETION_MODEL = "completion_model"
+
+
+class UsageKey(NamedTuple):
+    day: date
+    tenant_id: UUID
+    dimension: UsageDimension
+    dimension_id: UUID
+
+
+class UsageCounts(BaseModel):
+    questions: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def add(self, other: "UsageCounts"):
+        self.questions += other.questions
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+
+
+class UsageStatistics(UsageCounts):
+    dimension: UsageDimension
+    dimension_id: UUID
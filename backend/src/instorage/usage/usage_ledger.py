@@ -0,0 +1,53 @@
+from datetime import date, datetime, timezone
+from typing import Optional
+from uuid import UUID
+
+from instorage.usage.usage import UsageCounts, UsageDimension, UsageKey
+
+
+class UsageLedger:
+    """Sums up usage in memory until it is drained and written as rollups.
+
+    Every question counts once towards each of its tenant, user, assistant and
+    completion model, so that each of them can be read without scanning the
+    questions. All of this runs on the event loop, which is why one dict is
+    enough and no locking or sharding of the counters is needed."""
+
+    def __init__(self):
+        self._counts: dict[UsageKey, UsageCounts] = {}
+
+    def __len__(self):
+        return len(self._counts)
+
+    def record(
+        self,
+        *,
+        tenant_id: UUID,
+        input_tokens: int,
+        output_tokens: int,
+        user_id: Optional[UUID] = None,
+        assistant_id: Optional[UUID] = None,
+        completion_model_id: Optional[UUID] = None,
+        day: Optional[date] = None,
+    ):
+        day = day or datetime.now(timezone.utc).date()
+        counts = UsageCounts(
+            questions=1, input_tokens=input_tokens, output_tokens=output_tokens
+        )
+
+        dimensions = {
+            UsageDimension.TENANT: tenant_id,
+            UsageDimension.USER: user_id,
+            UsageDimension.ASSISTANT: assistant_id,
+            UsageDimension.COMPLETION_MODEL: completion_model_id,
+        }
+        for dimension, dimension_id in dimensions.items():
+            if dimension_id is not None:
+                self.add(UsageKey(day, tenant_id, dimension, dimension_id), counts)
+
+    def add(self, key: UsageKey, counts: UsageCounts):
+        self._counts.setdefault(key, UsageCounts()).add(counts)
+
+    def drain(self) -> dict[UsageKey, UsageCounts]:
+        counts, self._counts = self._counts, {}
+        return counts
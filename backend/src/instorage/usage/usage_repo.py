@@ -0,0 +1,81 @@
+from datetime import date
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
+from instorage.database.database import AsyncSession
+from instorage.database.tables.usage_table import UsageRollups
+from instorage.usage.usage import (
+    UsageCounts,
+    UsageDimension,
+    UsageKey,
+    UsageStatistics,
+)
+
+
+class UsageRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add(self, counts: dict[UsageKey, UsageCounts]):
+        if not counts:
+            return
+
+        # Rows are locked in the same order by every writer, so that they can
+        # not deadlock on each other
+        values = [
+            dict(
+                day=key.day,
+                tenant_id=key.tenant_id,
+                dimension=key.dimension.value,
+                dimension_id=key.dimension_id,
+                **counts[key].model_dump(),
+            )
+            for key in sorted(counts)
+        ]
+
+        stmt = insert(UsageRollups).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                UsageRollups.day,
+                UsageRollups.tenant_id,
+                UsageRollups.dimension,
+                UsageRollups.dimension_id,
+            ],
+            set_={
+                **{
+                    column: getattr(UsageRollups, column)
+                    + getattr(stmt.excluded, column)
+                    for column in UsageCounts.model_fields
+                },
+                "updated_at": sa.func.now(),
+            },
+        )
+
+        await self.session.execute(stmt)
+
+    async def get_by_tenant(
+        self,
+        tenant_id: UUID,
+        dimension: UsageDimension,
+        start_date: date,
+        end_date: date,
+    ) -> list[UsageStatistics]:
+        stmt = (
+            sa.select(
+                UsageRollups.dimension_id,
+                sa.func.sum(UsageRollups.questions).label("questions"),
+                sa.func.sum(UsageRollups.input_tokens).label("input_tokens"),
+                sa.func.sum(UsageRollups.output_tokens).label("output_tokens"),
+            )
+            .where(UsageRollups.tenant_id == tenant_id)
+            .where(UsageRollups.dimension == dimension.value)
+            .where(UsageRollups.day.between(start_date, end_date))
+            .group_by(UsageRollups.dimension_id)
+            .order_by(sa.desc("input_tokens"))
+        )
+
+        rows = await self.session.execute(stmt)
+
+        return [UsageStatistics(dimension=dimension, **row._asdict()) for row in rows]
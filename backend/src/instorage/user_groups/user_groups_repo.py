@@ -22,6 +22,7 @@ from instorage.user_groups.user_group import (
     UserGroupInDB,
     UserGroupUpdate,
 )
+from instorage.users.principal_cache import principal_cache
 
 
 class UserGroupsRepository:
@@ -34,6 +35,7 @@ class UserGroupsRepository:
             UserGroupInDB,
             with_options=self._get_options(),
         )
+        self.session = session
 
     def _get_options(self):
         return [
@@ -71,16 +73,26 @@ class UserGroupsRepository:
 
     async def update_user_group(self, user_group: UserGroupUpdate) -> UserGroupInDB:
         try:
-            return await self.delegate.update(
+            user_group_in_db = await self.delegate.update(
                 user_group,
                 relationships=self._get_relationship_options(),
             )
+            if user_group_in_db is not None:
+                principal_cache.invalidate_on_commit(
+                    self.session, tenant_id=user_group_in_db.tenant_id
+                )
+            return user_group_in_db
 
         except IntegrityError as e:
             raise UniqueException(self.UNIQUE_EXCEPTION_MSG) from e
 
     async def delete_user_group(self, id: UUID) -> UserGroupInDB:
-        return await self.delegate.delete(id)
+        user_group_in_db = await self.delegate.delete(id)
+        if user_group_in_db is not None:
+            principal_cache.invalidate_on_commit(
+                self.session, tenant_id=user_group_in_db.tenant_id
+            )
+        return user_group_in_db
 
     async def get_all_user_groups(self, tenant_id: UUID = None) -> List[UserGroupInDB]:
         return await self.delegate.filter_by(
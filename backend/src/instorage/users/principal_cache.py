@@ -0,0 +1,160 @@
+import hashlib
+import time
+from typing import Optional
+from uuid import UUID
+
+import jwt
+from pydantic import BaseModel
+from sqlalchemy import event
+
+from instorage.database.database import AsyncSession
+from instorage.main.cache import TTLCache
+from instorage.main.config import get_settings
+from instorage.main.invalidation import InvalidationChannel
+from instorage.main.redis_client import RedisClient, redis_client
+from instorage.users.user import UserInDB
+
+INVALIDATION_CHANNEL = "principal_cache:invalidate"
+
+
+class PrincipalKey(BaseModel, frozen=True):
+    scope: str
+    digest: str
+    assistant_id: Optional[UUID] = None
+
+
+class Invalidation(BaseModel):
+    """What changed. With nothing set, every principal is invalidated."""
+
+    user_id: Optional[UUID] = None
+    tenant_id: Optional[UUID] = None
+
+    def matches(self, user: UserInDB):
+        if self.user_id is None and self.tenant_id is None:
+            return True
+
+        return user.id == self.user_id or user.tenant_id == self.tenant_id
+
+
+def _token_ttl(token: str, ttl: float):
+    """Never cache a JWT for longer than it is valid."""
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return ttl
+
+    expires_at = claims.get("exp")
+    if expires_at is None:
+        return ttl
+
+    return min(ttl, expires_at - time.time())
+
+
+class PrincipalCache:
+    """Caches the user that a token or an api key authenticates as, keyed by a
+    hash of the credential.
+
+    Entries are invalidated when the transaction that changed a user, a tenant,
+    a role or an api key commits. The invalidation is published on a redis
+    channel, so that every api worker drops the entries, and the ttl bounds
+    how stale an entry can get if a message is missed."""
+
+    def __init__(self, maxsize: int, ttl: float, redis: Optional[RedisClient] = None):
+        self.ttl = ttl
+
+        self._cache: TTLCache[PrincipalKey, UserInDB] = TTLCache(
+            maxsize=maxsize, ttl=ttl
+        )
+        # Bumped on every invalidation, so that a user loaded before it is not
+        # cached after it
+        self._generation = 0
+        self._channel = InvalidationChannel(
+            INVALIDATION_CHANNEL,
+            redis=redis,
+            on_message=lambda message: self._invalidate_locally(
+                Invalidation.model_validate(message)
+            ),
+            # Whatever was published in the meantime is lost
+            on_gap=self.clear,
+        )
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @staticmethod
+    def get_key(
+        scope: str, credential: str, assistant_id: Optional[UUID] = None
+    ) -> PrincipalKey:
+        digest = hashlib.sha256(credential.encode()).hexdigest()
+        return PrincipalKey(scope=scope, digest=digest, assistant_id=assistant_id)
+
+    def get(self, key: PrincipalKey) -> Optional[UserInDB]:
+        user = self._cache.get(key)
+        if user is None:
+            return None
+
+        # Callers are free to change the user they are handed
+        return user.model_copy(deep=True)
+
+    def set(
+        self,
+        key: PrincipalKey,
+        user: UserInDB,
+        generation: int,
+        token: Optional[str] = None,
+    ):
+        if generation != self._generation:
+            return
+
+        ttl = self.ttl if token is None else _token_ttl(token, self.ttl)
+        if ttl <= 0:
+            return
+
+        self._cache.set(key, user.model_copy(deep=True), ttl=ttl)
+
+    def _invalidate_locally(self, invalidation: Invalidation):
+        self._generation += 1
+        self._cache.delete_where(invalidation.matches)
+
+    def invalidate(self, invalidation: Invalidation):
+        self._invalidate_locally(invalidation)
+        self._channel.publish(invalidation.model_dump(mode="json"))
+
+    def invalidate_on_commit(
+        self,
+        session: AsyncSession,
+        *,
+        user_id: Optional[UUID] = None,
+        tenant_id: Optional[UUID] = None,
+    ):
+        """Invalidates once `session` commits, before that the old rows are still
+        what other requests read. With neither id given, everything is."""
+        invalidation = Invalidation(user_id=user_id, tenant_id=tenant_id)
+        event.listen(
+            session.sync_session,
+            "after_commit",
+            lambda _: self.invalidate(invalidation),
+            once=True,
+        )
+
+    def start(self):
+        self._channel.start()
+
+    async def stop(self):
+        await self._channel.stop()
+        self.clear()
+
+    def clear(self):
+        self._generation += 1
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(
+    maxsize=get_settings().principal_cache_size,
+    ttl=get_settings().principal_cache_ttl,
+    redis=redis_client,
+)
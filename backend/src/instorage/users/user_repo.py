@@ -14,6 +14,7 @@ from instorage.database.tables.users_table import Users
 from instorage.database.tables.widget_table import Widgets
 from instorage.main.exceptions import UniqueException
 from instorage.main.models import ModelId
+from instorage.users.principal_cache import principal_cache
 from instorage.users.user import UserAdd, UserInDB, UserUpdate
 
 
@@ -130,6 +131,15 @@ class UsersRepository:
         except IntegrityError as e:
             raise UniqueException("User already exists.") from e
 
+    async def add_used_tokens(self, user_id: UUID, tokens: int):
+        stmt = (
+            sa.update(Users)
+            .values(used_tokens=Users.used_tokens + tokens)
+            .where(Users.id == user_id)
+        )
+
+        await self.session.execute(stmt)
+
     async def update(self, user: UserUpdate):
         stmt = (
             sa.update(Users)
@@ -146,6 +156,8 @@ class UsersRepository:
         if entry_in_db is None:
             return
 
+        principal_cache.invalidate_on_commit(self.session, user_id=entry_in_db.id)
+
         # TODO should be refactored when we will remove int id field from tables
         if "roles" in user.model_dump(exclude_unset=True):
             entry_in_db.roles = await self._get_roles(user.roles)
@@ -158,6 +170,7 @@ class UsersRepository:
         return UserInDB.model_validate(entry_in_db)
 
     async def hard_delete(self, id: int):
+        principal_cache.invalidate_on_commit(self.session, user_id=id)
         return await self.delegate.delete(id)
 
     async def soft_delete(self, id: int):
@@ -167,6 +180,7 @@ class UsersRepository:
             .where(Users.id == id)
             .returning(Users)
         )
+        principal_cache.invalidate_on_commit(self.session, user_id=id)
         return await self.delegate.get_model_from_query(stmt)
 
     async def delete(self, id: int, soft_delete: bool = True):
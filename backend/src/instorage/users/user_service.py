@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 from uuid import UUID
 
 import jwt
@@ -18,13 +18,16 @@ from instorage.main.exceptions import (
 from instorage.main.logging import get_logger
 from instorage.main.models import ModelId
 from instorage.predefined_roles.predefined_roles_repo import PredefinedRolesRepository
+from instorage.questions.question_writer import question_writer
 from instorage.settings.settings import SettingsUpsert
 from instorage.settings.settings_repo import SettingsRepository
 from instorage.tenants.tenant_repo import TenantRepository
+from instorage.users.principal_cache import PrincipalKey, principal_cache
 from instorage.users.user import (
     UserAdd,
     UserAddSuperAdmin,
     UserBase,
+    UserInDB,
     UserUpdate,
     UserUpdatePublic,
 )
@@ -254,15 +257,43 @@ class UserService:
 
         # Else return None
 
+    async def _get_cached_user(
+        self,
+        key: PrincipalKey,
+        get_user: Callable[[], Awaitable[Optional[UserInDB]]],
+        token: Optional[str] = None,
+    ):
+        if not get_settings().using_principal_cache:
+            return await get_user()
+
+        user_in_db = principal_cache.get(key)
+        if user_in_db is not None:
+            return user_in_db
+
+        generation = principal_cache.generation
+        user_in_db = await get_user()
+
+        if user_in_db is not None:
+            principal_cache.set(key, user_in_db, generation=generation, token=token)
+
+        return user_in_db
+
     async def authenticate(
         self, token: str, api_key: str, with_quota_used: bool = False
     ):
         user_in_db = None
         if token is not None:
-            user_in_db = await self._get_user_from_token(token)
+            user_in_db = await self._get_cached_user(
+                principal_cache.get_key("token", token),
+                lambda: self._get_user_from_token(token),
+                token=token,
+            )
 
         elif api_key is not None:
-            user_in_db = await self._get_user_from_api_key(api_key)
+            user_in_db = await self._get_cached_user(
+                principal_cache.get_key("api_key", api_key),
+                lambda: self._get_user_from_api_key(api_key),
+            )
 
         if user_in_db is None:
             raise AuthenticationException("No authenticated user.")
@@ -281,11 +312,20 @@ class UserService:
     ):
         user_in_db = None
         if token is not None:
-            user_in_db = await self._get_user_from_token(token)
+            user_in_db = await self._get_cached_user(
+                principal_cache.get_key("token", token),
+                lambda: self._get_user_from_token(token),
+                token=token,
+            )
 
         elif api_key is not None:
-            user_in_db = await self._get_user_from_api_key_or_assistant_api_key(
-                api_key, assistant_id
+            user_in_db = await self._get_cached_user(
+                principal_cache.get_key(
+                    "assistant_api_key", api_key, assistant_id=assistant_id
+                ),
+                lambda: self._get_user_from_api_key_or_assistant_api_key(
+                    api_key, assistant_id
+                ),
             )
 
         if user_in_db is None:
@@ -294,10 +334,12 @@ class UserService:
         return user_in_db
 
     async def update_used_tokens(self, user_id: UUID, tokens_to_add: int):
-        user_in_db = await self.repo.get_user_by_id(user_id)
-        new_used_tokens = user_in_db.used_tokens + tokens_to_add
-        user_update = UserUpdate(id=user_in_db.id, used_tokens=new_used_tokens)
-        await self.repo.update(user_update)
+        await self.repo.add_used_tokens(user_id, tokens_to_add)
+
+    async def update_used_tokens_in_background(self, user_id: UUID, tokens_to_add: int):
+        await question_writer.add_used_tokens(
+            user_id, tokens_to_add, session=self.repo.session
+        )
 
     async def get_all_users(self):
         return await self.repo.get_all_users()
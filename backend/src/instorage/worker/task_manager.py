@@ -25,6 +25,7 @@ class TaskManager:
         self.success = None
         self._result_location = None
         self._cleanup_func = None
+        self._deferred = False
 
     @property
     def result_location(self):
@@ -42,6 +43,11 @@ class TaskManager:
     def cleanup_func(self, cleanup_func: Callable):
         self._cleanup_func = cleanup_func
 
+    def defer(self):
+        """Leaves the job in progress once the task returns, for a task that
+        the job enqueued to finish it."""
+        self._deferred = True
+
     def _log_status(self, status: JobStatus):
         logger.info(f"Status for {self.job_id}: {status}")
 
@@ -56,7 +62,8 @@ class TaskManager:
             await self.fail_job()
             self.success = False
         else:
-            await self.complete_job()
+            if not self._deferred:
+                await self.complete_job()
             self.success = True
         finally:
             if self._cleanup_func is not None:
@@ -1,9 +1,26 @@
+import asyncio
 import contextlib
 import os
 from pathlib import Path
 
-from instorage.jobs.task_models import Transcription, UploadInfoBlob
+from instorage.ai_models.completion_models.batch_completion import (
+    collect_batch,
+    submit_batch,
+)
+from instorage.jobs.job_manager import job_manager
+from instorage.jobs.job_models import Task
+from instorage.jobs.task_models import (
+    ServiceBatchPoll,
+    ServiceBatchTask,
+    Transcription,
+    UploadInfoBlob,
+)
+from instorage.main.config import get_settings
 from instorage.main.container.container import Container
+from instorage.services.service import ProviderBatch, ServiceBatchResult
+from instorage.services.service_factory import create_service_runner
+from instorage.services.service_protocol import to_batch_inputs, to_ndjson_line
+from instorage.services.service_runner import ServiceRunner
 from instorage.worker.task_manager import TaskManager
 from instorage.worker.worker_factory import task
 
@@ -58,3 +75,117 @@ async def upload_info_blob_task(
     )
 
     return f"/api/v1/info-blobs/{info_blob.id}/"
+
+
+async def _save_service_batch_results(
+    container: Container, runner: ServiceRunner, results: list[ServiceBatchResult]
+):
+    async with container.session().begin():
+        file = await container.file_service().save_text(
+            name=f"{runner.service.name} results.jsonl",
+            text="".join(to_ndjson_line(result) for result in results),
+            mimetype="application/x-ndjson",
+        )
+
+    return f"/api/v1/files/{file.id}/content/"
+
+
+async def _poll_service_batch_later(params: ServiceBatchPoll):
+    await job_manager.enqueue_later(
+        Task.POLL_SERVICE_BATCH,
+        params,
+        defer_by=get_settings().completion_batch_poll_interval,
+    )
+
+
+@task
+async def run_service_batch_task(
+    *,
+    params: ServiceBatchTask,
+    container: Container,
+    task_manager: TaskManager,
+):
+    filepath = Path(params.filepath)
+
+    # Define cleanup function
+    task_manager.cleanup_func = lambda: _remove_file(filepath)
+
+    inputs = to_batch_inputs(await asyncio.to_thread(filepath.read_bytes))
+    session = container.session()
+
+    async with session.begin():
+        runner = await create_service_runner(container=container, id=params.service_id)
+
+        if params.provider_batch:
+            batch = await runner.prepare_provider_batch(inputs)
+        else:
+            results = sorted(
+                [
+                    result
+                    async for result in runner.run_batch(
+                        inputs, max_concurrency=params.max_concurrency
+                    )
+                ],
+                key=lambda result: result.index,
+            )
+
+    if params.provider_batch and batch.requests:
+        batch_id = await submit_batch(
+            container.completion_batch_selector(), batch.requests
+        )
+
+        # The batch takes hours, so instead of this job waiting on it, jobs of
+        # their own poll for it, from what is saved here
+        async with session.begin():
+            await container.job_service().set_provider_batch(
+                task_manager.job_id,
+                batch_id,
+                batch.model_dump(mode="json", exclude={"requests"}),
+            )
+
+        await _poll_service_batch_later(
+            ServiceBatchPoll(
+                user_id=params.user_id,
+                service_id=params.service_id,
+                job_id=task_manager.job_id,
+            )
+        )
+        task_manager.defer()
+        return
+
+    if params.provider_batch:
+        async with session.begin():
+            results = await runner.finish_provider_batch(batch, {})
+
+    return await _save_service_batch_results(container, runner, results)
+
+
+@task
+async def poll_service_batch_task(
+    *,
+    params: ServiceBatchPoll,
+    container: Container,
+    task_manager: TaskManager,
+):
+    session = container.session()
+
+    async with session.begin():
+        job = await container.job_service().get_job(params.job_id)
+        runner = await create_service_runner(container=container, id=params.service_id)
+
+    batch = ProviderBatch.model_validate(job.provider_batch)
+    completions = await collect_batch(
+        container.completion_batch_selector(),
+        job.provider_batch_id,
+        custom_ids=list(batch.items),
+    )
+
+    if completions is None:
+        await _poll_service_batch_later(params)
+        task_manager.defer()
+        return
+
+    async with session.begin():
+        results = await runner.finish_provider_batch(batch, completions)
+
+    return await _save_service_batch_results(container, runner, results)
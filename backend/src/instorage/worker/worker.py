@@ -1,11 +1,21 @@
 import crochet
 from arq.connections import RedisSettings
 
-from instorage.jobs.task_models import Transcription, UploadInfoBlob
+from instorage.jobs.task_models import (
+    ServiceBatchPoll,
+    ServiceBatchTask,
+    Transcription,
+    UploadInfoBlob,
+)
 from instorage.main.config import get_settings
 from instorage.main.logging import get_logger
 from instorage.server.dependencies import lifespan
-from instorage.worker.tasks import transcription_task, upload_info_blob_task
+from instorage.worker.tasks import (
+    poll_service_batch_task,
+    run_service_batch_task,
+    transcription_task,
+    upload_info_blob_task,
+)
 
 logger = get_logger(__name__)
 
@@ -31,7 +41,18 @@ async def transcription(ctx, params: Transcription):
     return await transcription_task(job_id=job_id, params=params)
 
 
-functions = [upload_info_blob, transcription]
+async def run_service_batch(ctx, params: ServiceBatchTask):
+    job_id = ctx['job_id']
+
+    return await run_service_batch_task(job_id=job_id, params=params)
+
+
+async def poll_service_batch(ctx, params: ServiceBatchPoll):
+    # Every poll is an arq job of its own, of the job that submitted the batch
+    return await poll_service_batch_task(job_id=params.job_id, params=params)
+
+
+functions = [upload_info_blob, transcription, run_service_batch, poll_service_batch]
 cron_jobs = []
 
 if get_settings().using_intric_proprietary:
@@ -40,10 +40,12 @@ async def get_container(
                     id=website.embedding_model_id, tenant_id=user_in_db.tenant_id
                 )
             else:
-                raise ValueError("One of 'group_id' and 'website_id' is required")
+                # Resolved by the task itself, if it needs one
+                embedding_model = None
 
-        container.config.embedding_model.from_value(embedding_model.family.value)
-        container.embedding_model.override(providers.Object(embedding_model))
+        if embedding_model is not None:
+            container.config.embedding_model.from_value(embedding_model.family.value)
+            container.embedding_model.override(providers.Object(embedding_model))
         container.user.override(providers.Object(user_in_db))
         container.tenant.override(providers.Object(user_in_db.tenant))
 
@@ -63,6 +65,7 @@ def task(func: Callable):
 
     Take three keyword-only arguments as input: params, container, and task_manager.
     It should return a string, which is the result location where the resources can be found.
+    A task that leaves the job to another one calls `task_manager.defer()` instead.
     """
 
     async def _task(*, job_id: UUID, params: TaskParams):
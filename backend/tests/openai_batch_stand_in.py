@@ -0,0 +1,157 @@
+"""A stand-in for the files and batches endpoints of the OpenAI api, to run
+batch adapters against without a provider.
+
+Batches are completed after `polls_to_complete` polls. Every request is
+answered with `answer(messages)`, billed as `prompt_tokens`, but for those in
+`failing`, which end up in the error file."""
+
+import json
+import time
+import uuid
+from typing import Callable
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.responses import PlainTextResponse
+from openai import AsyncOpenAI
+
+
+def _echo(messages: list[dict]):
+    return messages[-1]["content"][0]["text"]
+
+
+class OpenAIBatchStandIn:
+    def __init__(
+        self,
+        answer: Callable[[list[dict]], str] = _echo,
+        polls_to_complete: int = 2,
+        failing: set[str] = set(),
+        prompt_tokens: int = 10,
+    ):
+        self.answer = answer
+        self.polls_to_complete = polls_to_complete
+        self.failing = failing
+        self.prompt_tokens = prompt_tokens
+
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict] = {}
+        self.polls: dict[str, int] = {}
+
+        self.app = FastAPI()
+        self.app.post("/v1/files")(self.create_file)
+        self.app.get("/v1/files/{id}/content")(self.get_file_content)
+        self.app.post("/v1/batches")(self.create_batch)
+        self.app.get("/v1/batches/{id}")(self.get_batch)
+
+    def client(self):
+        return AsyncOpenAI(
+            api_key="stand-in",
+            base_url="http://stand-in/v1",
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app)),
+        )
+
+    def _add_file(self, content: str):
+        id = f"file-{uuid.uuid4().hex}"
+        self.files[id] = content
+
+        return id
+
+    async def create_file(self, file: UploadFile):
+        content = (await file.read()).decode("utf-8")
+        id = self._add_file(content)
+
+        return {
+            "id": id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": file.filename,
+            "purpose": "batch",
+            "status": "processed",
+        }
+
+    def get_file_content(self, id: str):
+        if id not in self.files:
+            raise HTTPException(404)
+
+        return PlainTextResponse(self.files[id])
+
+    async def create_batch(self, request: Request):
+        body = await request.json()
+        if body["input_file_id"] not in self.files:
+            raise HTTPException(400)
+
+        id = f"batch-{uuid.uuid4().hex}"
+        self.batches[id] = {
+            "id": id,
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "created_at": int(time.time()),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+        }
+        self.polls[id] = 0
+
+        return self.batches[id]
+
+    def _complete(self, batch: dict):
+        output, errors = [], []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            request = json.loads(line)
+            custom_id = request["custom_id"]
+
+            if custom_id in self.failing:
+                errors.append(
+                    {
+                        "custom_id": custom_id,
+                        "response": {
+                            "status_code": 400,
+                            "body": {"error": {"message": "Request failed"}},
+                        },
+                        "error": None,
+                    }
+                )
+                continue
+
+            answer = self.answer(request["body"]["messages"])
+            output.append(
+                {
+                    "custom_id": custom_id,
+                    "response": {
+                        "status_code": 200,
+                        "body": {
+                            "model": request["body"]["model"],
+                            "choices": [{"message": {"content": answer}}],
+                            "usage": {"prompt_tokens": self.prompt_tokens},
+                        },
+                    },
+                    "error": None,
+                }
+            )
+
+        batch["status"] = "completed"
+        batch["output_file_id"] = self._add_file(
+            "\n".join(json.dumps(line) for line in output)
+        )
+        if errors:
+            batch["error_file_id"] = self._add_file(
+                "\n".join(json.dumps(line) for line in errors)
+            )
+
+    def get_batch(self, id: str):
+        if id not in self.batches:
+            raise HTTPException(404)
+
+        batch = self.batches[id]
+        self.polls[id] += 1
+
+        if batch["status"] != "completed":
+            if self.polls[id] >= self.polls_to_complete:
+                self._complete(batch)
+            else:
+                batch["status"] = "in_progress"
+
+        return batch
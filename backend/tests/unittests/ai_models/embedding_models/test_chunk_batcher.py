@@ -0,0 +1,66 @@
+from instorage.ai_models.embedding_models.embedding_model_adapters.chunk_batcher import (
+    ChunkBatcher,
+)
+from instorage.info_blobs.info_blob import InfoBlobChunk
+from tests.fixtures import TEST_UUID
+
+
+def _count_characters(texts: list[str]):
+    return [len(text) for text in texts]
+
+
+def _get_chunks(texts: list[str]):
+    return [
+        InfoBlobChunk(
+            user_id=0,
+            chunk_no=i,
+            text=text,
+            info_blob_id=TEST_UUID,
+            group_id=0,
+            tenant_id=TEST_UUID,
+        )
+        for i, text in enumerate(texts)
+    ]
+
+
+def test_batches_are_packed_up_to_the_token_limit():
+    batcher = ChunkBatcher(max_tokens=10, max_items=100, count_tokens=_count_characters)
+    chunks = _get_chunks(["a" * 4, "b" * 6, "c" * 5, "d" * 5, "e"])
+
+    batches = batcher.batch(chunks)
+
+    assert [batch.num_tokens for batch in batches] == [10, 10, 1]
+    assert [len(batch.chunks) for batch in batches] == [2, 2, 1]
+
+
+def test_batches_respect_max_items():
+    batcher = ChunkBatcher(max_tokens=100, max_items=2, count_tokens=_count_characters)
+    chunks = _get_chunks(["a"] * 5)
+
+    batches = batcher.batch(chunks)
+
+    assert [len(batch.chunks) for batch in batches] == [2, 2, 1]
+
+
+def test_oversized_first_chunk_gets_a_batch_of_its_own():
+    batcher = ChunkBatcher(max_tokens=5, max_items=100, count_tokens=_count_characters)
+    chunks = _get_chunks(["a" * 20, "b" * 2, "c" * 2])
+
+    batches = batcher.batch(chunks)
+
+    assert [batch.chunks for batch in batches] == [chunks[:1], chunks[1:]]
+
+
+def test_no_chunks_gives_no_batches():
+    batcher = ChunkBatcher(max_tokens=5, max_items=100, count_tokens=_count_characters)
+
+    assert batcher.batch([]) == []
+
+
+def test_order_of_chunks_is_preserved():
+    batcher = ChunkBatcher(max_tokens=3, max_items=100, count_tokens=_count_characters)
+    chunks = _get_chunks(["a", "bb", "c", "dd", "e"])
+
+    batches = batcher.batch(chunks)
+
+    assert [chunk for batch in batches for chunk in batch.chunks] == chunks
@@ -1,7 +1,18 @@
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
 import pytest
 
-from instorage.ai_models.embedding_models.datastore.datastore import autocut
-from instorage.info_blobs.info_blob import InfoBlobChunkWithEmbedding
+from instorage.ai_models.embedding_models.datastore.datastore import (
+    Datastore,
+    autocut,
+    combine_embeddings,
+    reciprocal_rank_fusion,
+)
+from instorage.info_blobs.info_blob import (
+    InfoBlobChunkInDBWithScore,
+    InfoBlobChunkWithEmbedding,
+)
 from tests.fixtures import TEST_UUID
 
 
@@ -29,3 +40,82 @@ def test_chunk_size_calculation():
     size_embedding = len(embedding) * 4
 
     assert chunk.size == size_text + size_embedding
+
+
+def _create_chunk_with_score(score: float):
+    return InfoBlobChunkInDBWithScore(
+        id=uuid4(),
+        text="chunk",
+        chunk_no=1,
+        info_blob_id=TEST_UUID,
+        tenant_id=TEST_UUID,
+        embedding=[1.0, 2.0, 3.0],
+        score=score,
+    )
+
+
+def test_reciprocal_rank_fusion_ranks_chunks_found_by_both_first():
+    semantic_only = _create_chunk_with_score(0.9)
+    both = _create_chunk_with_score(0.8)
+    keyword_only = _create_chunk_with_score(0.1)
+
+    fused = reciprocal_rank_fusion([[semantic_only, both], [both, keyword_only]], k=60)
+
+    assert [chunk.id for chunk in fused] == [both.id, semantic_only.id, keyword_only.id]
+    assert fused[0].score == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[1].score == pytest.approx(1 / 61)
+    assert fused[2].score == pytest.approx(1 / 62)
+
+
+def test_reciprocal_rank_fusion_of_empty_lists():
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_combined_embedding_leans_towards_the_latest():
+    combined = combine_embeddings([[1.0, 0.0], [0.0, 1.0]], decay=0.5)
+
+    assert combined[1] > combined[0]
+    assert combined == pytest.approx([1 / 5**0.5, 2 / 5**0.5])
+
+
+def test_combined_embedding_of_one_is_itself():
+    assert combine_embeddings([[0.6, 0.8]], decay=0.5) == pytest.approx([0.6, 0.8])
+
+
+async def test_conversation_is_embedded_turn_by_turn():
+    embeddings = {"first": [1.0, 0.0], "second": [0.0, 1.0]}
+    adapter = MagicMock(
+        get_embedding_for_query=AsyncMock(side_effect=lambda turn: embeddings[turn])
+    )
+    datastore = Datastore(
+        user=MagicMock(),
+        info_blob_chunk_repo=AsyncMock(),
+        embedding_model_adapter=adapter,
+    )
+
+    embedding = await datastore.embed_conversation(["first", "second"], decay=1)
+
+    assert [
+        call.args[0] for call in adapter.get_embedding_for_query.await_args_list
+    ] == [
+        "first",
+        "second",
+    ]
+    assert embedding == pytest.approx([1 / 2**0.5, 1 / 2**0.5])
+
+
+async def test_given_embedding_is_searched_with():
+    chunk_repo = AsyncMock()
+    chunk_repo.semantic_search.return_value = []
+    adapter = MagicMock(get_embedding_for_query=AsyncMock())
+    datastore = Datastore(
+        user=MagicMock(),
+        info_blob_chunk_repo=chunk_repo,
+        embedding_model_adapter=adapter,
+    )
+
+    await datastore.hybrid_search("question", embedding=[1.0, 0.0])
+
+    adapter.get_embedding_for_query.assert_not_awaited()
+    assert chunk_repo.semantic_search.await_args.args[0] == [1.0, 0.0]
+    assert chunk_repo.keyword_search.await_args.args[0] == "question"
@@ -0,0 +1,94 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from instorage.ai_models.embedding_models.embedding_model_adapters.embedding_scheduler import (
+    EmbeddingScheduler,
+    TokenBudget,
+)
+from instorage.main.exceptions import RateLimitException
+
+
+async def _collect(scheduler: EmbeddingScheduler, batches, embed):
+    return [
+        result
+        async for result in scheduler.map(batches, embed, count_tokens=lambda _: 1)
+    ]
+
+
+async def test_results_keep_the_order_of_the_batches():
+    scheduler = EmbeddingScheduler(max_in_flight=3)
+
+    async def embed(batch: list[int]):
+        # Later batches finish first
+        await asyncio.sleep(0.01 * (5 - batch[0]))
+        return [[float(i)] for i in batch]
+
+    batches = [[i] for i in range(5)]
+    results = await _collect(scheduler, batches, embed)
+
+    assert results == [([i], [[float(i)]]) for i in range(5)]
+
+
+async def test_no_more_than_max_in_flight_requests_run_at_once():
+    scheduler = EmbeddingScheduler(max_in_flight=2)
+    in_flight = 0
+    max_seen = 0
+
+    async def embed(batch):
+        nonlocal in_flight, max_seen
+        in_flight += 1
+        max_seen = max(max_seen, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [[0.0]]
+
+    await _collect(scheduler, [[i] for i in range(6)], embed)
+
+    assert max_seen == 2
+
+
+async def test_rate_limited_batches_are_retried():
+    scheduler = EmbeddingScheduler(max_in_flight=2, max_retries=2)
+    attempts = 0
+
+    async def embed(batch):
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RateLimitException()
+        return [[1.0]]
+
+    with patch("asyncio.sleep"):
+        results = await _collect(scheduler, [[1]], embed)
+
+    assert results == [([1], [[1.0]])]
+    assert attempts == 2
+
+
+async def test_rate_limit_is_raised_when_retries_run_out():
+    scheduler = EmbeddingScheduler(max_in_flight=2, max_retries=1)
+
+    async def embed(batch):
+        raise RateLimitException()
+
+    with patch("asyncio.sleep"), pytest.raises(RateLimitException):
+        await _collect(scheduler, [[1]], embed)
+
+
+async def test_token_budget_waits_for_refill():
+    now = 0.0
+    budget = TokenBudget(tokens_per_minute=60, timer=lambda: now)
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        nonlocal now
+        sleeps.append(seconds)
+        now += seconds
+
+    with patch("asyncio.sleep", fake_sleep):
+        await budget.acquire(60)
+        await budget.acquire(30)
+
+    assert sleeps == [30]
@@ -0,0 +1,99 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+
+from instorage.ai_models.embedding_models.embedding_model_adapters.query_embedding_cache import (
+    QueryEmbeddingCache,
+)
+from tests.fixtures import TEST_EMBEDDING_MODEL, TEST_EMBEDDING_MODEL_ADA
+
+
+async def test_identical_queries_are_embedded_once():
+    cache = QueryEmbeddingCache(maxsize=10, ttl=60)
+    embed = AsyncMock(return_value=[1.0, 2.0])
+
+    first = await cache.get_or_embed(TEST_EMBEDDING_MODEL, "giraffe", embed)
+    second = await cache.get_or_embed(TEST_EMBEDDING_MODEL, "  giraffe\n", embed)
+
+    assert first == second == [1.0, 2.0]
+    embed.assert_awaited_once()
+    assert cache.stats().hits == 1
+    assert cache.stats().misses == 1
+
+
+async def test_cache_is_keyed_on_model():
+    cache = QueryEmbeddingCache(maxsize=10, ttl=60)
+    embed = AsyncMock(return_value=[1.0, 2.0])
+
+    await cache.get_or_embed(TEST_EMBEDDING_MODEL, "giraffe", embed)
+    await cache.get_or_embed(TEST_EMBEDDING_MODEL_ADA, "giraffe", embed)
+
+    assert embed.await_count == 2
+
+
+async def test_concurrent_identical_queries_share_one_call():
+    cache = QueryEmbeddingCache(maxsize=10, ttl=60)
+    calls = 0
+
+    async def embed():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [1.0]
+
+    results = await asyncio.gather(
+        *[cache.get_or_embed(TEST_EMBEDDING_MODEL, "giraffe", embed) for _ in range(5)]
+    )
+
+    assert results == [[1.0]] * 5
+    assert calls == 1
+
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    cache = QueryEmbeddingCache(maxsize=10, ttl=60)
+    embedded = asyncio.Event()
+
+    async def embed():
+        await embedded.wait()
+        return [1.0]
+
+    first = asyncio.create_task(
+        cache.get_or_embed(TEST_EMBEDDING_MODEL, "giraffe", embed)
+    )
+    second = asyncio.create_task(
+        cache.get_or_embed(TEST_EMBEDDING_MODEL, "giraffe", embed)
+    )
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    embedded.set()
+
+    assert await second == [1.0]
+    assert first.cancelled()
+
+
+async def test_redis_tier_is_used_on_local_miss():
+    redis = MagicMock(is_started=True)
+    redis.return_value.get = AsyncMock(
+        return_value=np.asarray([0.5, 0.25], dtype=np.float32).tobytes()
+    )
+    cache = QueryEmbeddingCache(maxsize=10, ttl=60, redis=redis)
+    embed = AsyncMock()
+
+    embedding = await cache.get_or_embed(TEST_EMBEDDING_MODEL, "giraffe", embed)
+
+    assert embedding == [0.5, 0.25]
+    embed.assert_not_awaited()
+    assert cache.stats().redis_hits == 1
+
+
+async def test_redis_errors_fall_back_to_the_model():
+    redis = MagicMock(is_started=True)
+    redis.return_value.get = AsyncMock(side_effect=ConnectionError)
+    redis.return_value.set = AsyncMock(side_effect=ConnectionError)
+    cache = QueryEmbeddingCache(maxsize=10, ttl=60, redis=redis)
+    embed = AsyncMock(return_value=[1.0])
+
+    assert await cache.get_or_embed(TEST_EMBEDDING_MODEL, "giraffe", embed) == [1.0]
@@ -1,10 +1,11 @@
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from instorage.ai_models.completion_models.completion_model import Context
+from instorage.ai_models.completion_models.completion_model import Context, Message
 from instorage.ai_models.completion_models.completion_service import CompletionService
 from instorage.main.exceptions import QueryException
+from tests.fixtures import TEST_MODEL_GPT4
 
 
 def test_get_error_on_too_long_question():
@@ -50,3 +51,76 @@ async def test_get_number_of_questions(max_tokens, expected_result, start_count)
     )
 
     assert question_counts[-num_questions:] == expected_result
+
+
+def test_only_messages_without_saved_counts_are_tokenised():
+    service = CompletionService(AsyncMock(), AsyncMock(), MagicMock(), MagicMock())
+    tokenizer = MagicMock()
+    tokenizer.count_tokens_batch.side_effect = lambda texts: [
+        len(text.split()) for text in texts
+    ]
+    messages = [
+        Message(question="Saved question", answer="Saved answer", num_tokens=100),
+        Message(question="Three word question", answer="Two words"),
+    ]
+
+    with patch(
+        "instorage.ai_models.completion_models.completion_service"
+        ".get_tokenizer_for_completion_model",
+        return_value=tokenizer,
+    ):
+        counts = service._count_tokens_of_messages(messages)
+
+    assert counts == [100, 5]
+    tokenizer.count_tokens_batch.assert_called_once_with(
+        ["Three word question", "Two words"]
+    )
+
+
+async def test_query_is_built_once_for_the_model_and_the_logging():
+    model_adapter = MagicMock(
+        model=TEST_MODEL_GPT4,
+        get_token_limit_of_model=MagicMock(return_value=1000),
+        get_logging_details=MagicMock(return_value=None),
+        get_response=AsyncMock(return_value="answer"),
+    )
+    context_builder = MagicMock()
+    context_builder.build_context.return_value = Context(
+        input="question", prompt="prompt", prompt_token_count=1, input_token_count=1
+    )
+    service = CompletionService(
+        AsyncMock(), model_adapter, MagicMock(), context_builder
+    )
+
+    with patch(
+        "instorage.ai_models.completion_models.completion_service"
+        ".get_tokenizer_for_completion_model"
+    ):
+        await service.get_response("question", extended_logging=True)
+
+    query = model_adapter.create_query_from_context.return_value
+    model_adapter.create_query_from_context.assert_called_once()
+    assert model_adapter.get_logging_details.call_args.kwargs["query"] is query
+    assert model_adapter.get_response.await_args.kwargs["query"] is query
+
+
+async def test_batch_requests_leave_the_usage_to_the_batch_results():
+    model_adapter = MagicMock(
+        model=TEST_MODEL_GPT4, get_token_limit_of_model=MagicMock(return_value=1000)
+    )
+    context_builder = MagicMock()
+    context_builder.build_context.return_value = Context(
+        input="question", prompt="prompt", prompt_token_count=1, input_token_count=1
+    )
+    user_service = AsyncMock()
+    service = CompletionService(
+        user_service, model_adapter, MagicMock(), context_builder
+    )
+
+    with patch(
+        "instorage.ai_models.completion_models.completion_service"
+        ".get_tokenizer_for_completion_model"
+    ):
+        await service.get_batch_request("0", "question")
+
+    user_service.update_used_tokens_in_background.assert_not_awaited()
@@ -1,12 +1,18 @@
 from unittest.mock import MagicMock
 from uuid import uuid4
 
+import pytest
+
 from instorage.ai_models.completion_models.completion_model import Context, Message
-from instorage.ai_models.completion_models.context_builder import ContextBuilder
+from instorage.ai_models.completion_models.context_builder import (
+    FILES_HEADER,
+    ContextBuilder,
+)
 from instorage.ai_models.completion_models.guardrails import (
     FAIRNESS_GUARD,
     HALLUCINATION_GUARD,
 )
+from instorage.ai_models.completion_models.token_count_cache import token_count_cache
 from instorage.files.file_models import File, FileType
 
 QUESTION = "I have a question"
@@ -126,9 +132,12 @@ def test_context_with_messages():
                 question="Question 1",
                 answer="Answer 1",
                 files=[],
+                completion_model_id=None,
             ),
             MagicMock(
                 question="Question 2 with file",
+                num_tokens_question=10,
+                num_tokens_answer=5,
                 answer="Answer 2",
                 files=[file],
             ),
@@ -144,7 +153,7 @@ def test_context_with_messages():
 Question 2 with file"""  # noqa
     expected_messages = [
         Message(question="Question 1", answer="Answer 1"),
-        Message(question=expected_question_2, answer="Answer 2"),
+        Message(question=expected_question_2, answer="Answer 2", num_tokens=15),
     ]
 
     expected_context = Context(input=QUESTION, messages=expected_messages)
@@ -152,6 +161,25 @@ Question 2 with file"""  # noqa
     assert expected_context == context
 
 
+def test_questions_saved_without_their_own_count_are_counted_again():
+    builder = ContextBuilder()
+    session = MagicMock(
+        questions=[
+            MagicMock(
+                question="Question 1",
+                answer="Answer 1",
+                files=[],
+                num_tokens_question=None,
+                num_tokens_answer=5,
+            ),
+        ]
+    )
+
+    context = builder.build_context(input=QUESTION, session=session)
+
+    assert context.messages == [Message(question="Question 1", answer="Answer 1")]
+
+
 def test_context_with_images():
     builder = ContextBuilder()
 
@@ -193,9 +221,12 @@ def test_context_with_messages_and_images():
                 question="Question 1",
                 answer="Answer 1",
                 files=[],
+                completion_model_id=None,
             ),
             MagicMock(
                 question="Question 2 with image",
+                num_tokens_question=10,
+                num_tokens_answer=5,
                 answer="Answer 2",
                 files=[image],
             ),
@@ -206,9 +237,88 @@ def test_context_with_messages_and_images():
 
     expected_messages = [
         Message(question="Question 1", answer="Answer 1"),
-        Message(question="Question 2 with image", answer="Answer 2", images=[image]),
+        Message(
+            question="Question 2 with image",
+            answer="Answer 2",
+            images=[image],
+            num_tokens=15,
+        ),
     ]
 
     expected_context = Context(input=QUESTION, messages=expected_messages)
 
     assert expected_context == context
+
+
+@pytest.fixture
+def tokenizer():
+    token_count_cache.clear()
+
+    tokenizer = MagicMock()
+    tokenizer.name = "words"
+    tokenizer.count_tokens.side_effect = lambda text: len(text.split())
+    tokenizer.count_tokens_batch.side_effect = lambda texts: [
+        len(text.split()) for text in texts
+    ]
+
+    return tokenizer
+
+
+def _create_chunk(text: str):
+    return MagicMock(text=text)
+
+
+def test_context_is_counted_part_by_part(tokenizer: MagicMock):
+    builder = ContextBuilder()
+    file = File(
+        id=uuid4(),
+        text="file text",
+        name="file.txt",
+        checksum="",
+        size=0,
+        tenant_id=uuid4(),
+        user_id=uuid4(),
+        file_type=FileType.TEXT,
+    )
+
+    context = builder.build_context(
+        input=QUESTION,
+        files=[file],
+        prompt="You are a bot",
+        info_blob_chunks=[_create_chunk("first chunk"), _create_chunk("second")],
+        hallucination_guard=True,
+        tokenizer=tokenizer,
+    )
+
+    assert context.prompt_token_count == (
+        len(f"You are a bot {HALLUCINATION_GUARD}".split()) + 2 + 1
+    )
+    assert context.input_token_count == (
+        len(FILES_HEADER.split())
+        + len(builder._build_file(file).split())
+        + len(QUESTION.split())
+    )
+
+
+def test_follow_up_only_counts_what_is_new(tokenizer: MagicMock):
+    builder = ContextBuilder()
+    chunks = [_create_chunk("first chunk"), _create_chunk("second")]
+
+    builder.build_context(
+        input=QUESTION,
+        prompt="You are a bot",
+        info_blob_chunks=chunks,
+        tokenizer=tokenizer,
+    )
+    tokenizer.count_tokens_batch.reset_mock()
+
+    context = builder.build_context(
+        input="Another question",
+        prompt="You are a bot",
+        info_blob_chunks=chunks + [_create_chunk("third chunk")],
+        tokenizer=tokenizer,
+    )
+
+    tokenizer.count_tokens_batch.assert_called_once_with(['"""third chunk"""'])
+    assert context.prompt_token_count == 4 + 2 + 1 + 2
+    assert context.input_token_count == 2
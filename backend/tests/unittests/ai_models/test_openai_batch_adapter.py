@@ -0,0 +1,88 @@
+import json
+
+from instorage.ai_models.completion_models.batch_completion import (
+    BatchRequest,
+    BatchStatus,
+    collect_batch,
+    submit_batch,
+)
+from instorage.ai_models.completion_models.completion_model import ModelKwargs
+from instorage.ai_models.completion_models.completion_model_adapters.openai_batch_adapter import (
+    OpenAIBatchModelAdapter,
+)
+from tests.fixtures import TEST_MODEL_CHATGPT
+from tests.openai_batch_stand_in import OpenAIBatchStandIn
+
+
+def request(custom_id: str, text: str):
+    return BatchRequest(
+        custom_id=custom_id,
+        query=[
+            {"role": "system", "content": "prompt"},
+            {"role": "user", "content": [{"type": "text", "text": text}]},
+        ],
+        model_kwargs=ModelKwargs(temperature=0.2),
+    )
+
+
+async def test_submits_the_requests_as_one_file():
+    stand_in = OpenAIBatchStandIn()
+    adapter = OpenAIBatchModelAdapter(TEST_MODEL_CHATGPT, client=stand_in.client())
+
+    batch_id = await adapter.submit([request("0", "first"), request("1", "second")])
+
+    lines = [
+        json.loads(line)
+        for line in stand_in.files[
+            stand_in.batches[batch_id]["input_file_id"]
+        ].splitlines()
+    ]
+    assert [line["custom_id"] for line in lines] == ["0", "1"]
+    assert lines[0]["url"] == "/v1/chat/completions"
+    assert lines[0]["body"]["model"] == TEST_MODEL_CHATGPT.name
+    assert lines[0]["body"]["temperature"] == 0.2
+
+
+async def test_status_is_in_progress_until_the_batch_completes():
+    stand_in = OpenAIBatchStandIn(polls_to_complete=2)
+    adapter = OpenAIBatchModelAdapter(TEST_MODEL_CHATGPT, client=stand_in.client())
+
+    batch_id = await adapter.submit([request("0", "first")])
+
+    assert await adapter.get_status(batch_id) == BatchStatus.IN_PROGRESS
+    assert await adapter.get_status(batch_id) == BatchStatus.COMPLETE
+
+
+async def test_collect_batch_returns_a_result_for_every_request():
+    stand_in = OpenAIBatchStandIn(polls_to_complete=2, failing={"1"}, prompt_tokens=7)
+    adapter = OpenAIBatchModelAdapter(TEST_MODEL_CHATGPT, client=stand_in.client())
+    custom_ids = ["0", "1", "2"]
+
+    batch_id = await submit_batch(
+        adapter,
+        [request("0", "first"), request("1", "second"), request("2", "third")],
+    )
+
+    assert await collect_batch(adapter, batch_id, custom_ids) is None
+    results = await collect_batch(adapter, batch_id, custom_ids)
+
+    assert results["0"].completion == "first"
+    assert results["0"].input_tokens == 7
+    assert results["2"].completion == "third"
+    assert results["1"].completion is None
+    assert results["1"].error == "Request failed"
+
+
+async def test_collect_batch_reports_what_a_failed_batch_did_not_complete():
+    stand_in = OpenAIBatchStandIn()
+    adapter = OpenAIBatchModelAdapter(TEST_MODEL_CHATGPT, client=stand_in.client())
+
+    async def get_status(batch_id: str):
+        return BatchStatus.FAILED
+
+    adapter.get_status = get_status
+
+    batch_id = await submit_batch(adapter, [request("0", "first")])
+    results = await collect_batch(adapter, batch_id, ["0"])
+
+    assert results["0"].error == "Not completed, the batch is failed."
@@ -0,0 +1,179 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from instorage.ai_models.completion_models import get_response_open_ai
+from instorage.ai_models.completion_models.provider_resilience import (
+    CircuitState,
+    ProviderResilience,
+)
+from instorage.main.exceptions import (
+    BadRequestException,
+    OpenAIException,
+    ProviderUnavailableException,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.now += seconds
+
+
+def resilience(clock: Clock, **kwargs):
+    settings = dict(
+        max_attempts=3,
+        retry_budget=30,
+        window=60,
+        min_requests=4,
+        error_threshold=0.5,
+        cooldown=30,
+        timer=clock,
+        sleep=clock.sleep,
+    )
+    settings.update(kwargs)
+
+    return ProviderResilience(**settings)
+
+
+def calls_to(responses: dict[str, list]):
+    calls = []
+
+    async def request(model_name: str):
+        calls.append(model_name)
+        response = responses[model_name].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return request, calls
+
+
+def streams_to(tokens: list, fail_after: int, attempts_failing: int = 0):
+    calls = []
+
+    async def request(model_name: str):
+        calls.append(model_name)
+        if len(calls) <= attempts_failing:
+            raise OpenAIException("Connection reset")
+
+        for i, token in enumerate(tokens):
+            if i == fail_after:
+                raise OpenAIException("Connection reset")
+            yield token
+
+    return request, calls
+
+
+async def test_failed_requests_are_retried():
+    resilience_ = resilience(Clock())
+    request, calls = calls_to({"gpt": [OpenAIException("Down"), "answer"]})
+
+    assert await resilience_.call("openai", "gpt", request) == "answer"
+    assert calls == ["gpt", "gpt"]
+
+
+async def test_bad_requests_are_not_retried():
+    resilience_ = resilience(Clock())
+    request, calls = calls_to({"gpt": [BadRequestException("Invalid"), "answer"]})
+
+    with pytest.raises(BadRequestException):
+        await resilience_.call("openai", "gpt", request)
+
+    assert calls == ["gpt"]
+    assert resilience_.get_health("openai", "gpt").error_rate() == 0
+
+
+async def test_open_circuit_fails_fast_until_cooldown():
+    clock = Clock()
+    resilience_ = resilience(clock, max_attempts=1)
+    request, calls = calls_to({"gpt": [OpenAIException("Down")] * 4 + ["answer"]})
+
+    for _ in range(4):
+        with pytest.raises(OpenAIException):
+            await resilience_.call("openai", "gpt", request)
+
+    assert resilience_.get_health("openai", "gpt").state == CircuitState.OPEN
+    with pytest.raises(ProviderUnavailableException):
+        await resilience_.call("openai", "gpt", request)
+    assert len(calls) == 4
+
+    clock.now += 30
+    assert await resilience_.call("openai", "gpt", request) == "answer"
+    assert resilience_.get_health("openai", "gpt").state == CircuitState.CLOSED
+
+
+async def test_failing_model_falls_back():
+    resilience_ = resilience(
+        Clock(), max_attempts=1, fallback_models={"gpt": "gpt-fallback"}
+    )
+    request, calls = calls_to(
+        {"gpt": [OpenAIException("Down")], "gpt-fallback": ["answer"]}
+    )
+
+    assert await resilience_.call("openai", "gpt", request) == "answer"
+    assert calls == ["gpt", "gpt-fallback"]
+
+
+async def test_streams_are_retried_before_the_first_token():
+    resilience_ = resilience(Clock())
+    request, calls = streams_to(["a", "b"], fail_after=-1, attempts_failing=1)
+
+    tokens = [token async for token in resilience_.stream("openai", "gpt", request)]
+
+    assert tokens == ["a", "b"]
+    assert len(calls) == 2
+
+
+async def test_streams_are_not_retried_after_the_first_token():
+    resilience_ = resilience(Clock())
+    request, calls = streams_to(["a", "b", "c"], fail_after=1)
+
+    tokens = []
+    with pytest.raises(OpenAIException):
+        async for token in resilience_.stream("openai", "gpt", request):
+            tokens.append(token)
+
+    assert tokens == ["a"]
+    assert len(calls) == 1
+    assert resilience_.get_health("openai", "gpt").error_rate() > 0
+
+
+async def test_slow_requests_are_hedged():
+    resilience_ = resilience(Clock(), hedge=True, hedge_min_samples=1)
+    health = resilience_.get_health("openai", "gpt")
+    health.record(True, latency=0.01)
+
+    calls = []
+
+    async def request(model_name: str):
+        calls.append(model_name)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+            return "slow"
+        return "fast"
+
+    assert await resilience_.call("openai", "gpt", request) == "fast"
+    assert len(calls) == 2
+    assert health.hedged == 1
+
+
+async def test_completions_are_made_without_sdk_retries():
+    client = MagicMock(base_url="https://api.openai.com/v1/")
+    without_retries = client.with_options.return_value
+    without_retries.chat.completions.create = AsyncMock(
+        return_value=MagicMock(choices=[MagicMock(message=MagicMock(content="answer"))])
+    )
+
+    answer = await get_response_open_ai.get_response(
+        client, "gpt", messages=[], model_kwargs={}
+    )
+
+    assert answer == "answer"
+    client.with_options.assert_called_once_with(max_retries=0)
@@ -1,5 +1,8 @@
+from unittest.mock import AsyncMock, patch
 from uuid import uuid4
 
+import pytest
+
 from instorage.ai_models.embedding_models.embedding_model import (
     EmbeddingModel,
     EmbeddingModelFamily,
@@ -10,9 +13,21 @@ from instorage.ai_models.embedding_models.embedding_model_adapters.text_embeddin
     OpenAIEmbeddingAdapter,
 )
 from instorage.info_blobs.info_blob import InfoBlobChunk
+from instorage.main.exceptions import RateLimitException
 from tests.fixtures import TEST_UUID
 
 
+@pytest.fixture(autouse=True)
+def count_characters_as_tokens():
+    with patch(
+        "instorage.ai_models.embedding_models.embedding_model_adapters.base.count_tokens_batch",
+        lambda encoding, texts: [len(text) for text in texts],
+    ), patch(
+        "instorage.ai_models.embedding_models.embedding_model_adapters.base.get_encoding_for_embedding_model"
+    ):
+        yield
+
+
 def _get_adapter_with_max_limit(max_limit: int):
     model = EmbeddingModel(
         id=uuid4(),
@@ -69,3 +84,35 @@ def test_chunking_with_three_chunks():
     chunks = _get_chunks(texts)
 
     assert len(list(adapter._chunk_chunks(chunks))) == 3
+
+
+def test_chunking_does_not_yield_an_empty_first_batch():
+    adapter = _get_adapter_with_max_limit(8)
+
+    texts = ["c" * 10, "c" * 3]
+    chunks = _get_chunks(texts)
+
+    batches = adapter._chunk_chunks(chunks)
+
+    assert [len(batch.chunks) for batch in batches] == [1, 1]
+    assert [batch.num_tokens for batch in batches] == [10, 3]
+
+
+async def test_queries_are_retried_when_rate_limited():
+    adapter = _get_adapter_with_max_limit(8191)
+    adapter._create_embeddings = AsyncMock(side_effect=[RateLimitException(), [[1.0]]])
+
+    with patch("asyncio.sleep"):
+        assert await adapter._get_embeddings(["query"]) == [[1.0]]
+
+    assert adapter._create_embeddings.await_count == 2
+
+
+async def test_rate_limited_batches_are_left_to_the_scheduler():
+    adapter = _get_adapter_with_max_limit(8191)
+    adapter._create_embeddings = AsyncMock(side_effect=RateLimitException())
+
+    with pytest.raises(RateLimitException):
+        await adapter._get_embeddings_scheduled(["passage"])
+
+    adapter._create_embeddings.assert_awaited_once()
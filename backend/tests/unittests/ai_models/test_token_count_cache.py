@@ -0,0 +1,41 @@
+from unittest.mock import MagicMock
+
+from instorage.ai_models.completion_models.token_count_cache import TokenCountCache
+
+
+def word_tokenizer(name: str = "words"):
+    tokenizer = MagicMock()
+    tokenizer.name = name
+    tokenizer.count_tokens_batch.side_effect = lambda texts: [
+        len(text.split()) for text in texts
+    ]
+
+    return tokenizer
+
+
+def test_only_uncounted_texts_are_tokenised():
+    cache = TokenCountCache(maxsize=10, ttl=60)
+    tokenizer = word_tokenizer()
+
+    assert cache.count_tokens_batch(tokenizer, ["one", "two words"]) == [1, 2]
+    assert cache.count_tokens_batch(tokenizer, ["two words", "three more words"]) == [
+        2,
+        3,
+    ]
+
+    assert tokenizer.count_tokens_batch.call_args_list[1].args == (
+        ["three more words"],
+    )
+
+
+def test_counts_are_kept_per_tokenizer():
+    cache = TokenCountCache(maxsize=10, ttl=60)
+    words = word_tokenizer()
+    characters = MagicMock()
+    characters.name = "characters"
+    characters.count_tokens_batch.side_effect = lambda texts: [
+        len(text) for text in texts
+    ]
+
+    assert cache.count_tokens_batch(words, ["two words"]) == [2]
+    assert cache.count_tokens_batch(characters, ["two words"]) == [9]
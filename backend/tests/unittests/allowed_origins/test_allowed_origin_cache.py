@@ -0,0 +1,123 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from instorage.allowed_origins.allowed_origin_cache import AllowedOriginCache
+from instorage.server.middleware.cors import CORSMiddleware
+
+ORIGIN = "https://kommun.se"
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def timer():
+    return FakeTimer()
+
+
+@pytest.fixture
+def cache(timer: FakeTimer):
+    cache = AllowedOriginCache(maxsize=10, ttl=300, negative_ttl=30)
+    cache._cache.timer = timer
+    return cache
+
+
+async def test_allowed_origin_is_cached_for_the_ttl(cache, timer):
+    lookup = AsyncMock(return_value=True)
+
+    assert await cache.is_allowed(ORIGIN, lookup)
+    timer.now = 299
+    assert await cache.is_allowed(ORIGIN, lookup)
+    lookup.assert_awaited_once()
+
+    timer.now = 300
+    await cache.is_allowed(ORIGIN, lookup)
+    assert lookup.await_count == 2
+
+
+async def test_disallowed_origin_is_cached_for_the_negative_ttl(cache, timer):
+    lookup = AsyncMock(return_value=False)
+
+    assert not await cache.is_allowed(ORIGIN, lookup)
+    timer.now = 29
+    assert not await cache.is_allowed(ORIGIN, lookup)
+    lookup.assert_awaited_once()
+
+    timer.now = 30
+    await cache.is_allowed(ORIGIN, lookup)
+    assert lookup.await_count == 2
+
+
+async def test_concurrent_lookups_of_an_origin_are_shared(cache):
+    calls = 0
+
+    async def lookup(origin: str):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        return True
+
+    results = await asyncio.gather(
+        *[cache.is_allowed(ORIGIN, lookup) for _ in range(5)]
+    )
+
+    assert results == [True] * 5
+    assert calls == 1
+
+
+async def test_origin_invalidated_during_lookup_is_not_cached(cache):
+    async def lookup(origin: str):
+        cache.invalidate(origin)
+        return False
+
+    await cache.is_allowed(ORIGIN, lookup)
+
+    assert cache.stats().size == 0
+
+
+async def test_invalidate_drops_the_origin(cache):
+    await cache.is_allowed(ORIGIN, AsyncMock(return_value=False))
+
+    cache.invalidate(ORIGIN)
+
+    assert await cache.is_allowed(ORIGIN, AsyncMock(return_value=True))
+
+
+def test_cors_resolves_the_origin_once_per_request():
+    callback = AsyncMock(return_value=True)
+    app = Starlette(routes=[Route("/", lambda request: PlainTextResponse("OK"))])
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://static.se"],
+        allow_methods=["*"],
+        callback=callback,
+    )
+
+    with TestClient(app) as client:
+        response = client.get("/", headers={"Origin": ORIGIN})
+
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+    callback.assert_awaited_once_with(ORIGIN)
+
+
+async def test_origin_is_resolved_once_per_scope():
+    callback = AsyncMock(return_value=True)
+    cors = CORSMiddleware(app=None, callback=callback)
+    scope = {"type": "http"}
+
+    # As by the middleware on response start, and then by the 500 handler
+    assert await cors.is_allowed_origin_for_scope(scope, ORIGIN)
+    assert await cors.is_allowed_origin_for_scope(scope, ORIGIN)
+
+    callback.assert_awaited_once_with(ORIGIN)
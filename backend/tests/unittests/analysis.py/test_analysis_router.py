@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from instorage.analysis.analysis_router import get_token_usage
+from instorage.main.exceptions import BadRequestException
+from instorage.usage.usage import UsageDimension
+
+
+async def get_dates(**kwargs):
+    service = AsyncMock()
+    service.get_token_usage.return_value = []
+
+    await get_token_usage(
+        **{
+            "dimension": UsageDimension.USER,
+            "days_since": 30,
+            "from_date": None,
+            "to_date": None,
+            **kwargs,
+        },
+        service=service,
+    )
+
+    kwargs = service.get_token_usage.await_args.kwargs
+    return kwargs["start_date"], kwargs["end_date"]
+
+
+async def test_token_usage_defaults_to_the_last_days_since_days():
+    today = date.today()
+
+    assert await get_dates(days_since=7) == (today - timedelta(days=7), today)
+
+
+async def test_token_usage_honours_a_from_date_alone():
+    from_date = date.today() - timedelta(days=90)
+
+    assert await get_dates(from_date=from_date) == (from_date, date.today())
+
+
+async def test_token_usage_honours_a_to_date_alone():
+    to_date = date(2024, 6, 30)
+
+    assert await get_dates(to_date=to_date, days_since=10) == (
+        date(2024, 6, 20),
+        to_date,
+    )
+
+
+async def test_token_usage_rejects_a_from_date_after_the_to_date():
+    with pytest.raises(BadRequestException):
+        await get_dates(from_date=date(2024, 7, 1), to_date=date(2024, 6, 30))
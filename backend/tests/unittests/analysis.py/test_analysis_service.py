@@ -24,6 +24,7 @@ def analysis_service(user):
         question_repo=AsyncMock(),
         session_repo=AsyncMock(),
         space_service=AsyncMock(),
+        usage_repo=AsyncMock(),
         completion_service=AsyncMock(),
     )
 
@@ -0,0 +1,91 @@
+import json
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from sse_starlette.sse import ServerSentEvent
+
+from instorage.assistants.api.assistant_models import AssistantResponse
+from instorage.assistants.api.assistant_protocol import (
+    stream_deltas,
+    stream_full_responses,
+    to_ask_reponse,
+)
+from instorage.files.file_models import File, FileType
+from instorage.info_blobs.info_blob import InfoBlobMetadata, InfoBlobPublicNoText
+from instorage.sessions.session import SessionInDB
+from tests.fixtures import TEST_MODEL_GPT4, TEST_USER
+
+# Escaped in JSON, and more than one line as it is
+CHUNKS = ["Hello", ' "wörld"', "\n\t", "!"]
+
+
+async def answer():
+    for chunk in CHUNKS:
+        yield chunk
+
+
+@pytest.fixture
+def response():
+    return AssistantResponse(
+        session=SessionInDB(
+            id=uuid4(), name="session", user_id=TEST_USER.id, created_at=datetime.now()
+        ),
+        question="question",
+        files=[
+            File(
+                id=uuid4(),
+                name="file.txt",
+                text="text",
+                checksum="",
+                size=4,
+                mimetype="text/plain",
+                user_id=TEST_USER.id,
+                tenant_id=TEST_USER.tenant_id,
+                file_type=FileType.TEXT,
+            )
+        ],
+        answer=answer(),
+        info_blobs=[
+            InfoBlobPublicNoText(
+                id=uuid4(),
+                metadata=InfoBlobMetadata(
+                    title="blob", embedding_model_id=uuid4(), size=1
+                ),
+            )
+        ],
+        completion_model=TEST_MODEL_GPT4,
+    )
+
+
+async def test_full_responses_are_encoded_as_before(response: AssistantResponse):
+    expected = [
+        ServerSentEvent(
+            to_ask_reponse(
+                question=response.question,
+                files=response.files,
+                session=response.session,
+                answer=chunk,
+                info_blobs=response.info_blobs,
+                completion_model=response.completion_model,
+            ).model_dump_json()
+        ).encode()
+        for chunk in CHUNKS
+    ]
+
+    assert [event async for event in stream_full_responses(response)] == expected
+
+
+async def test_deltas_follow_a_header(response: AssistantResponse):
+    events = [event async for event in stream_deltas(response)]
+
+    header, *deltas = [event.decode().split("\r\n") for event in events]
+    assert header[0] == "event: header"
+    header_data = json.loads(header[1].removeprefix("data: "))
+    assert header_data["session_id"] == str(response.session.id)
+    assert "answer" not in header_data
+
+    assert [delta[0] for delta in deltas] == ["event: delta"] * len(CHUNKS)
+    assert [
+        json.loads(delta[1].removeprefix("data: "))["answer"] for delta in deltas
+    ] == CHUNKS
@@ -4,7 +4,10 @@ from uuid import uuid4
 import pytest
 
 from instorage.assistants.assistant_runner import AssistantRunner, RunnerDelegate
-from instorage.info_blobs.info_blob import InfoBlobChunkInDBWithScore
+from instorage.info_blobs.info_blob import (
+    InfoBlobChunkInDBWithScore,
+    InfoBlobInDBNoText,
+)
 from instorage.main.exceptions import BadRequestException
 from tests.fixtures import TEST_UUID
 
@@ -16,7 +19,7 @@ def assistant_runner_fixture():
         session_service=AsyncMock(),
         completion_service=AsyncMock(),
         file_service=AsyncMock(),
-        runner_delegate=AsyncMock(),
+        runner_delegate=AsyncMock(build_retrieval_query=MagicMock()),
         ai_models_service=AsyncMock(),
         space_service=AsyncMock(),
     )
@@ -74,39 +77,86 @@ def test_remove_duplicate_chunks_multiple_info_blobs():
     ]
 
 
-@pytest.mark.parametrize(
-    ("num_questions", "expected_answer"),
-    (
-        (1, "Question 0\nAnswer 0\nnext question"),
-        (2, "Question 0\nAnswer 0\nQuestion 1\nAnswer 1\nnext question"),
-        (0, "next question"),
-    ),
-)
-def test_concatenate_session_and_question(num_questions: int, expected_answer: str):
+def _create_info_blob(id):
+    return InfoBlobInDBNoText(
+        id=id,
+        title=f"Blob {id}",
+        embedding_model_id=TEST_UUID,
+        user_id=TEST_UUID,
+        tenant_id=TEST_UUID,
+        size=10,
+        group_id=TEST_UUID,
+    )
+
+
+async def test_info_blobs_are_fetched_at_once_in_score_order():
+    delegate = RunnerDelegate(AsyncMock(), AsyncMock())
+    blob_ids = [uuid4(), uuid4(), uuid4()]
+    delegate.info_blobs_repo.get_by_ids.return_value = [
+        _create_info_blob(id) for id in reversed(blob_ids)
+    ]
 
-    def get_questions(num_questions: int):
-        questions = []
-        for i in range(num_questions):
-            question = MagicMock()
-            question.question = f"Question {i}"
-            question.answer = f"Answer {i}"
-            questions.append(question)
+    chunks = [
+        _create_chunk_with_score(score, id)
+        for score, id in zip([0.9, 0.5, 0.1], blob_ids)
+    ]
+    info_blobs = await delegate._get_info_blobs_from_chunks(chunks)
 
-        return questions
+    delegate.info_blobs_repo.get_by_ids.assert_awaited_once_with(blob_ids)
+    assert [blob.id for blob in info_blobs] == blob_ids
+    assert info_blobs[0].metadata.title == f"Blob {blob_ids[0]}"
 
-    questions = get_questions(num_questions)
-    session = MagicMock()
-    session.questions = questions
 
+async def test_chunks_of_deleted_info_blobs_have_no_reference():
     delegate = RunnerDelegate(AsyncMock(), AsyncMock())
-    concatenated_session = delegate.concatenate_conversation(session, "next question")
-    assert concatenated_session == expected_answer
+    blob_id = uuid4()
+    delegate.info_blobs_repo.get_by_ids.return_value = [_create_info_blob(blob_id)]
+
+    chunks = [
+        _create_chunk_with_score(0.9, uuid4()),
+        _create_chunk_with_score(0.5, blob_id),
+    ]
+    info_blobs = await delegate._get_info_blobs_from_chunks(chunks)
+
+    assert [blob.id for blob in info_blobs] == [blob_id]
 
 
-def test_concatenate_session_is_null():
+async def test_previous_chunks_that_were_not_found_again_are_carried_over():
     delegate = RunnerDelegate(AsyncMock(), AsyncMock())
-    concatenated_session = delegate.concatenate_conversation(None, "next question")
-    assert concatenated_session == "next question"
+    found, found_again, not_found = [
+        _create_chunk_with_score(score).model_copy(update={"id": uuid4()})
+        for score in [0.9, 0.8, 0.7]
+    ]
+    previous = [found_again, not_found]
+
+    carried_over = delegate._get_carried_over_chunks(previous, [found, found_again])
+
+    assert carried_over == [not_found]
+
+
+async def test_chunks_the_question_before_referenced_are_carried_over():
+    delegate = RunnerDelegate(AsyncMock(), AsyncMock())
+    found, referenced = [
+        _create_chunk_with_score(score).model_copy(update={"id": uuid4()})
+        for score in [0.9, 0.7]
+    ]
+    delegate.datastore.semantic_search.return_value = [found]
+    delegate.datastore.get_referenced_chunks.return_value = [referenced]
+    delegate.info_blobs_repo.get_by_ids.return_value = []
+    groups = [MagicMock()]
+    previous_question = MagicMock(id=uuid4())
+
+    result = await delegate.get_references(
+        "follow-up",
+        groups,
+        embedding=[0.1],
+        previous_question=previous_question,
+    )
+
+    delegate.datastore.get_referenced_chunks.assert_awaited_once_with(
+        previous_question.id, groups, [], embedding=[0.1]
+    )
+    assert result.chunks == [found, referenced]
 
 
 async def test_completion_model_disabled_in_space(runner: AssistantRunner):
@@ -115,7 +165,7 @@ async def test_completion_model_disabled_in_space(runner: AssistantRunner):
 
     space = MagicMock()
     space.is_completion_model_in_space.return_value = False
-    runner.space_service.get_space.return_value = space
+    runner.space_service.get_space_models_snapshot.return_value = space
 
     with pytest.raises(BadRequestException):
         await runner.run(question="hello")
@@ -131,7 +181,7 @@ async def test_group_embedding_model_disabled_in_space(runner: AssistantRunner):
 
     space = MagicMock()
     space.is_embedding_model_in_space.return_value = False
-    runner.space_service.get_space.return_value = space
+    runner.space_service.get_space_models_snapshot.return_value = space
 
     with pytest.raises(BadRequestException):
         await runner.run(question="hello")
@@ -147,7 +197,27 @@ async def test_website_embedding_model_disabled_in_space(runner: AssistantRunner
 
     space = MagicMock()
     space.is_embedding_model_in_space.return_value = False
-    runner.space_service.get_space.return_value = space
+    runner.space_service.get_space_models_snapshot.return_value = space
 
     with pytest.raises(BadRequestException):
         await runner.run(question="hello")
+
+
+async def test_run_loads_the_history_that_fits_the_model(runner: AssistantRunner):
+    history = [MagicMock()]
+    session = MagicMock(questions=[])
+    runner.completion_service.get_max_tokens = MagicMock(return_value=1000)
+    runner.session_service.get_history.return_value = history
+    # Stop before the response is built
+    runner.completion_service.get_response.side_effect = BadRequestException()
+
+    with pytest.raises(BadRequestException):
+        await runner.run(question="hello", session=session, stream=False)
+
+    runner.session_service.get_history.assert_awaited_once_with(
+        session, max_tokens=1000
+    )
+    assert session.questions == history
+    assert (
+        runner.completion_service.get_response.await_args.kwargs["session"] is session
+    )
@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from instorage.assistants.retrieval_query import RetrievalQuery, RetrievalQueryBuilder
+
+
+def count_words(text: str):
+    return len(text.split())
+
+
+def turn(i: int):
+    return MagicMock(question=f"question {i}", answer=f"answer {i}")
+
+
+@pytest.fixture
+def builder():
+    return RetrievalQueryBuilder(max_tokens=10, count_tokens=count_words)
+
+
+def test_question_without_history(builder: RetrievalQueryBuilder):
+    query = builder.build("new question")
+
+    assert query == RetrievalQuery(turns=["new question"])
+    assert query.question == "new question"
+
+
+def test_latest_turns_that_fit_are_kept_oldest_first(builder: RetrievalQueryBuilder):
+    # Every turn is 4 words, the question 2, so two turns fit in 10
+    query = builder.build("new question", [turn(i) for i in range(5)])
+
+    assert query.turns == [
+        "question 3\nanswer 3",
+        "question 4\nanswer 4",
+        "new question",
+    ]
+    assert query.text == "question 3\nanswer 3\nquestion 4\nanswer 4\nnew question"
+
+
+def test_long_question_is_kept_without_history(builder: RetrievalQueryBuilder):
+    question = " ".join(["word"] * 20)
+
+    query = builder.build(question, [turn(0)])
+
+    assert query.turns == [question]
+
+
+def test_older_turns_are_not_counted(builder: RetrievalQueryBuilder):
+    count_tokens = MagicMock(side_effect=count_words)
+    builder.count_tokens = count_tokens
+
+    builder.build("new question", [turn(i) for i in range(100)])
+
+    # The question, the two turns that fit and the one that does not
+    assert count_tokens.call_count == 4
@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from instorage.ai_models.embedding_models.datastore.datastore import Datastore
+from instorage.files.chunk_embedding_list import ChunkEmbeddingList
 from tests.fixtures import TEST_GROUP
 
 
@@ -27,3 +28,62 @@ async def test_semantic_search(datastore: Datastore):
             search_string="giraffe", groups=[TEST_GROUP], autocut_cutoff=1
         )
         autocut_mock.assert_called_once()
+
+
+async def test_hybrid_search_fuses_semantic_and_keyword_results(datastore: Datastore):
+    shared_chunk = MagicMock(id=1)
+    semantic_chunk = MagicMock(id=2)
+    keyword_chunk = MagicMock(id=3)
+
+    datastore.chunk_repo.semantic_search.return_value = [semantic_chunk, shared_chunk]
+    datastore.chunk_repo.keyword_search.return_value = [shared_chunk, keyword_chunk]
+
+    with patch(
+        "instorage.ai_models.embedding_models.datastore.datastore.reciprocal_rank_fusion",
+    ) as rrf_mock:
+        rrf_mock.return_value = [shared_chunk, semantic_chunk, keyword_chunk]
+
+        results = await datastore.hybrid_search(
+            search_string="giraffe", groups=[TEST_GROUP], num_chunks=2
+        )
+
+    rrf_mock.assert_called_once_with(
+        [[semantic_chunk, shared_chunk], [shared_chunk, keyword_chunk]]
+    )
+    datastore.chunk_repo.keyword_search.assert_awaited_once_with(
+        "giraffe", group_ids=[TEST_GROUP.id], website_ids=[], limit=2
+    )
+    assert results == [shared_chunk, semantic_chunk]
+
+
+async def test_semantic_search_is_restricted_to_the_embedding_model(
+    datastore: Datastore,
+):
+    datastore.model_adapter.get_embedding_for_query.return_value = [0.1, 0.2]
+
+    await datastore.semantic_search(search_string="giraffe", groups=[TEST_GROUP])
+
+    datastore.chunk_repo.semantic_search.assert_awaited_once_with(
+        [0.1, 0.2],
+        embedding_model_id=datastore.model_adapter.model.id,
+        group_ids=[TEST_GROUP.id],
+        website_ids=[],
+        limit=30,
+    )
+
+
+async def test_add_inserts_chunks_in_batches(datastore: Datastore):
+    chunk_embedding_list = ChunkEmbeddingList()
+    chunk_embedding_list.add(list("abcde"), [[i, 0] for i in range(5)])
+    info_blob = MagicMock()
+
+    await datastore._add(chunk_embedding_list, info_blob, batch_size=2)
+
+    calls = datastore.chunk_repo.add.call_args_list
+    assert [call.args[0] for call in calls] == [["a", "b"], ["c", "d"], ["e"]]
+    assert [call.args[1].shape for call in calls] == [(2, 2), (2, 2), (1, 2)]
+    assert calls[0].kwargs == dict(
+        group_id=info_blob.group_id,
+        website_id=info_blob.website_id,
+        embedding_model_id=info_blob.embedding_model_id,
+    )
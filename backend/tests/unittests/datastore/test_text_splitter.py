@@ -0,0 +1,99 @@
+import re
+
+import pytest
+
+from instorage.ai_models.embedding_models.datastore.text_splitter import (
+    TokenTextSplitter,
+)
+
+
+class WordEncoding:
+    """Stands in for a tiktoken encoding, with one token per word and the
+    whitespace before it."""
+
+    def __init__(self):
+        self.pieces = []
+
+    def encode(self, text: str, disallowed_special=()):
+        pieces = re.findall(r"\s*\S+|\s+", text)
+        start = len(self.pieces)
+        self.pieces.extend(pieces)
+        return list(range(start, start + len(pieces)))
+
+    def decode_with_offsets(self, tokens: list[int]):
+        offsets = []
+        text = ""
+        for token in tokens:
+            offsets.append(len(text))
+            text += self.pieces[token]
+
+        return text, offsets
+
+
+def _splitter(chunk_size: int, chunk_overlap: int = 0):
+    return TokenTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, encoding=WordEncoding()
+    )
+
+
+def _num_tokens(text: str):
+    return len(re.findall(r"\s*\S+|\s+", text))
+
+
+def test_short_text_is_one_chunk():
+    assert _splitter(10).split_text("Just a few words.") == ["Just a few words."]
+
+
+def test_empty_text_gives_no_chunks():
+    assert _splitter(10).split_text("") == []
+
+
+def test_chunks_stay_within_the_chunk_size():
+    text = " ".join(f"word{i}" for i in range(1000))
+
+    chunks = _splitter(50, 10).split_text(text)
+
+    assert all(_num_tokens(chunk) <= 50 for chunk in chunks)
+
+
+def test_chunks_without_overlap_cover_the_text():
+    text = "\n\n".join(
+        " ".join(f"word{i}" for i in range(paragraph, paragraph + 30)) + "."
+        for paragraph in range(0, 300, 30)
+    )
+
+    chunks = _splitter(40).split_text(text)
+
+    assert "".join(chunks) == text
+
+
+def test_cuts_on_paragraph_before_sentence():
+    first = "One two three. Four five six seven."
+    second = "Eight nine ten. Eleven twelve."
+    text = f"{first}\n\n{second}"
+
+    chunks = _splitter(10).split_text(text)
+
+    assert [chunk.strip() for chunk in chunks] == [first, second]
+
+
+def test_cuts_on_sentence_before_word():
+    text = "One two three four five six. Seven eight nine ten eleven"
+
+    chunks = _splitter(8).split_text(text)
+
+    assert chunks[0] == "One two three four five six."
+
+
+def test_consecutive_chunks_overlap():
+    text = " ".join(f"word{i}" for i in range(100))
+
+    chunks = _splitter(20, 5).split_text(text)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.split()[-5:] == current.split()[:5]
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        _splitter(10, 10)
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 from instorage.files.chunk_embedding_list import ChunkEmbeddingList
@@ -41,3 +42,53 @@ def test_fails_when_the_lengths_dont_match():
 
     with pytest.raises(ChunkEmbeddingMisMatchException):
         chunk_embedding_list.add([1, 2], [[1]])
+
+
+def test_fails_when_the_dimensions_dont_match():
+    chunk_embedding_list = ChunkEmbeddingList()
+    chunk_embedding_list.add(["hello"], [[1, 2, 3]])
+
+    with pytest.raises(ChunkEmbeddingMisMatchException):
+        chunk_embedding_list.add(["there"], [[1, 2]])
+
+
+def test_embeddings_are_stored_in_one_float32_matrix():
+    chunk_embedding_list = ChunkEmbeddingList(capacity=4)
+
+    chunk_embedding_list.add(["hello", "there"], [[1, 2], [3, 4]])
+    chunk_embedding_list.add(["Henry"], [[5, 6]])
+
+    embeddings = chunk_embedding_list.embeddings
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (3, 2)
+    assert embeddings.tolist() == [[1, 2], [3, 4], [5, 6]]
+
+
+def test_grows_beyond_capacity():
+    chunk_embedding_list = ChunkEmbeddingList(capacity=1)
+
+    for i in range(5):
+        chunk_embedding_list.add([str(i)], [[i, i]])
+
+    assert len(chunk_embedding_list) == 5
+    assert chunk_embedding_list.embeddings[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_batches_are_views_into_the_matrix():
+    chunk_embedding_list = ChunkEmbeddingList(capacity=5)
+    chunks_list = ["hello", "there", "I", "am", "Henry"]
+    chunk_embedding_list.add(chunks_list, [[i, 0] for i in range(5)])
+
+    batches = list(chunk_embedding_list.batches(2))
+
+    assert [chunks for chunks, _ in batches] == [
+        ["hello", "there"],
+        ["I", "am"],
+        ["Henry"],
+    ]
+    for _, embeddings in batches:
+        assert np.shares_memory(embeddings, chunk_embedding_list.embeddings)
+
+
+def test_empty_list_has_no_batches():
+    assert list(ChunkEmbeddingList().batches(10)) == []
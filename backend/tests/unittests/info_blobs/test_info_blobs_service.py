@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, MagicMock
 import pytest
 
 from instorage.groups.group_service import GroupService
+from instorage.info_blobs.info_blob import InfoBlobUpdate
 from instorage.info_blobs.info_blob_repo import InfoBlobRepository
 from instorage.info_blobs.info_blob_service import InfoBlobService
 from instorage.main.exceptions import NameCollisionException, NotFoundException
@@ -104,3 +105,10 @@ async def test_update_fails_if_info_blob_with_same_name_exists(setup: Setup):
 
     with pytest.raises(NameCollisionException):
         await setup.service.update_info_blob(MagicMock())
+
+
+def test_info_blobs_can_not_move():
+    # The chunks hold their blob's group, website and embedding model
+    assert not {"group_id", "website_id", "embedding_model_id"} & set(
+        InfoBlobUpdate.model_fields
+    )
@@ -0,0 +1,69 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from sqlalchemy.orm import Session
+
+from instorage.database.vector_index import Pgvector
+from instorage.info_blobs.vector_index_builder import VectorIndexBuilder
+
+
+def db_session():
+    return MagicMock(sync_session=Session())
+
+
+def commit(session):
+    session.sync_session.begin()
+    session.sync_session.commit()
+
+
+async def test_index_is_built_once_the_chunks_are_committed():
+    builder = VectorIndexBuilder()
+    builder.build = AsyncMock()
+    session = db_session()
+    embedding_model_id = uuid4()
+
+    builder.build_on_commit(session, embedding_model_id)
+    builder.build_on_commit(session, embedding_model_id)
+    await asyncio.sleep(0)
+    builder.build.assert_not_awaited()
+
+    commit(session)
+    await asyncio.sleep(0)
+
+    # Once, however many chunks were added
+    builder.build.assert_awaited_once_with([embedding_model_id])
+
+
+async def test_no_index_is_built_for_a_model_known_to_have_one():
+    builder = VectorIndexBuilder()
+    builder.build = AsyncMock()
+    session = db_session()
+    embedding_model_id = uuid4()
+    builder._indexed.add(embedding_model_id)
+
+    builder.build_on_commit(session, embedding_model_id)
+    commit(session)
+    await asyncio.sleep(0)
+
+    builder.build.assert_not_awaited()
+
+
+async def test_index_held_by_another_process_is_left_to_it():
+    builder = VectorIndexBuilder()
+    connection = AsyncMock()
+    connection.scalar.return_value = False
+
+    assert not await builder._build_index(connection, uuid4(), dimensions=3)
+    connection.execute.assert_not_awaited()
+
+
+def test_iterative_scans_need_pgvector_0_8():
+    pgvector = Pgvector()
+    assert pgvector.supports_iterative_scan
+
+    pgvector.set_version("0.7.4")
+    assert not pgvector.supports_iterative_scan
+
+    pgvector.set_version("0.8.0")
+    assert pgvector.supports_iterative_scan
@@ -0,0 +1,50 @@
+from instorage.main.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_returns_value_until_it_expires():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=5, timer=timer)
+
+    cache.set("key", "value")
+
+    timer.now = 4.9
+    assert cache.get("key") == "value"
+
+    timer.now = 5
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_stats_count_hits_and_misses():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    stats = cache.stats()
+    assert stats.hits == 2
+    assert stats.misses == 1
+    assert stats.size == 1
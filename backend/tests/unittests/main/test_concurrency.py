@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from instorage.main.concurrency import gather_or_cancel
+
+
+async def test_results_are_in_order():
+    async def value(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    assert await gather_or_cancel(value(1, 0.02), value(2, 0)) == [1, 2]
+
+
+async def test_others_are_cancelled_when_one_fails():
+    cancelled = asyncio.Event()
+
+    async def fail():
+        raise ValueError()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(ValueError):
+        await gather_or_cancel(slow(), fail())
+
+    assert cancelled.is_set()
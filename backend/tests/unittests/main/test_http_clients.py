@@ -0,0 +1,117 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from instorage.main.config import get_settings
+from instorage.main.http_clients import (
+    HttpClients,
+    PooledTransport,
+    Provider,
+    ProviderPool,
+)
+
+
+async def test_pool_caps_the_requests_in_flight():
+    pool = ProviderPool(Provider.OPENAI, max_in_flight=2)
+    release = asyncio.Event()
+
+    async def request():
+        async with pool.slot():
+            await release.wait()
+
+    tasks = [asyncio.create_task(request()) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    stats = pool.stats()
+    assert stats.in_flight == 2
+    assert stats.waiting == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    stats = pool.stats()
+    assert stats.in_flight == 0
+    assert stats.waited == 1
+    assert stats.requests == 3
+
+
+class Body(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        yield b"answer"
+
+
+async def test_transport_holds_the_slot_until_the_response_is_closed():
+    pool = ProviderPool(Provider.OPENAI, max_in_flight=1)
+    transport = PooledTransport(
+        httpx.MockTransport(lambda request: httpx.Response(200, stream=Body())), pool
+    )
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "http://provider/") as response:
+            assert pool.stats().in_flight == 1
+            assert await response.aread() == b"answer"
+
+        assert pool.stats().in_flight == 0
+
+        response = await client.get("http://provider/")
+        assert response.text == "answer"
+        assert pool.stats().in_flight == 0
+
+
+async def test_transport_releases_the_slot_when_the_request_fails():
+    def fail(request):
+        raise httpx.ConnectError("refused")
+
+    pool = ProviderPool(Provider.OPENAI, max_in_flight=1)
+    transport = PooledTransport(httpx.MockTransport(fail), pool)
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.ConnectError):
+            await client.get("http://provider/")
+
+    assert pool.stats().in_flight == 0
+
+
+async def test_clients_are_shared_until_stopped():
+    clients = HttpClients()
+
+    client = clients.anthropic()
+    assert clients.anthropic() is client
+    assert Provider.ANTHROPIC in clients.stats()
+
+    await clients.stop()
+
+    assert clients.stats() == {}
+    assert clients.anthropic() is not client
+    await clients.stop()
+
+
+async def test_clients_keep_the_sdk_retries():
+    clients = HttpClients()
+
+    # Embeddings and transcriptions are not made through the resilience layer
+    assert clients.openai().max_retries == 2
+
+    await clients.stop()
+
+
+async def test_stats_are_logged_until_stopped():
+    clients = HttpClients()
+    clients.anthropic()
+    settings = get_settings().model_copy(
+        update={"llm_http_stats_log_interval": 0.01, "openai_api_key": None}
+    )
+
+    with patch("instorage.main.http_clients.get_settings", return_value=settings):
+        with patch("instorage.main.http_clients.logger") as logger:
+            clients.start()
+            await asyncio.sleep(0.05)
+            await clients.stop()
+
+            logged = logger.info.call_count
+            await asyncio.sleep(0.05)
+
+    assert logged > 0
+    assert logger.info.call_count == logged
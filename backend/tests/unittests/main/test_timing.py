@@ -0,0 +1,42 @@
+import pytest
+
+from instorage.main.timing import StageTimer
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stages_are_timed_and_summed():
+    fake_timer = FakeTimer()
+    timer = StageTimer("Test", timer=fake_timer)
+
+    with timer.stage("files"):
+        fake_timer.now += 0.1
+
+    with timer.stage("retrieval"):
+        fake_timer.now += 0.3
+
+    with timer.stage("files"):
+        fake_timer.now += 0.2
+
+    assert timer.stages == pytest.approx({"files": 0.3, "retrieval": 0.3})
+    assert timer.elapsed() == pytest.approx(0.6)
+
+
+def test_stage_is_timed_when_it_fails():
+    fake_timer = FakeTimer()
+    timer = StageTimer("Test", timer=fake_timer)
+
+    try:
+        with timer.stage("checks"):
+            fake_timer.now += 1
+            raise ValueError()
+    except ValueError:
+        pass
+
+    assert timer.stages == {"checks": 1}
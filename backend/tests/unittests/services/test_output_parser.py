@@ -0,0 +1,58 @@
+import pytest
+from langchain.schema import OutputParserException
+
+from instorage.services.output_parsing.output_parser import (
+    PydanticOutputParser,
+    compile_schema,
+)
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "description": "The name"},
+        "age": {"type": "integer", "description": "The age"},
+    },
+}
+
+
+def test_schema_is_compiled_once():
+    assert compile_schema(SCHEMA) is compile_schema(dict(SCHEMA))
+
+
+def test_changed_schema_is_compiled_anew():
+    changed = {
+        **SCHEMA,
+        "properties": {**SCHEMA["properties"], "city": {"type": "string"}},
+    }
+
+    compiled = compile_schema(changed)
+
+    assert compiled is not compile_schema(SCHEMA)
+    assert "city" in compiled.model.model_fields
+
+
+def test_schema_of_the_service_is_left_as_is():
+    schema = {**SCHEMA}
+
+    PydanticOutputParser(schema).get_format_instructions()
+
+    assert schema["type"] == "object"
+
+
+def test_parse_json():
+    output = PydanticOutputParser(SCHEMA).parse('{"name": "Ada", "age": 36}')
+
+    assert output.to_value() == {"name": "Ada", "age": 36}
+
+
+def test_parse_json_in_markdown():
+    text = 'Here you go:\n```json\n{"name": "Ada", "age": 36}\n```'
+
+    output = PydanticOutputParser(SCHEMA).parse(text)
+
+    assert output.to_value() == {"name": "Ada", "age": 36}
+
+
+def test_parse_invalid_output():
+    with pytest.raises(OutputParserException):
+        PydanticOutputParser(SCHEMA).parse("I could not say")
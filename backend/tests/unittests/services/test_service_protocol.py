@@ -0,0 +1,22 @@
+import pytest
+
+from instorage.main.exceptions import BadRequestException
+from instorage.services.service_protocol import to_batch_inputs
+
+
+def test_to_batch_inputs_reads_one_input_per_line():
+    content = b'{"input": "first"}\n\n{"input": "second"}\n'
+
+    assert to_batch_inputs(content) == ["first", "second"]
+
+
+def test_to_batch_inputs_names_the_malformed_line():
+    content = '{"input": "first"}\nnot json\n'
+
+    with pytest.raises(BadRequestException, match="Line 2"):
+        to_batch_inputs(content)
+
+
+def test_to_batch_inputs_requires_an_input():
+    with pytest.raises(BadRequestException):
+        to_batch_inputs("\n")
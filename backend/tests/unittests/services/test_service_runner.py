@@ -0,0 +1,216 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from instorage.ai_models.completion_models.batch_completion import (
+    BatchRequest,
+    BatchResult,
+)
+from instorage.main.exceptions import ErrorCodes, OpenAIException, QueryException
+from instorage.services.service import DatastoreResult
+from instorage.services.service_runner import ServiceRunner
+from tests.fixtures import TEST_MODEL_CHATGPT, TEST_USER
+
+
+def output(value: str):
+    return MagicMock(to_string=MagicMock(return_value=value), to_value=lambda: value)
+
+
+@pytest.fixture
+def question_writer():
+    with patch("instorage.services.service_runner.question_writer") as writer:
+        writer.add_questions = AsyncMock()
+        writer.add_used_tokens = AsyncMock()
+        yield writer
+
+
+@pytest.fixture
+def runner():
+    completion_service = AsyncMock()
+    completion_service.get_response.side_effect = lambda question, **_: MagicMock(
+        completion=question, input_token_count=3, total_token_count=10
+    )
+    completion_service.count_tokens = MagicMock(return_value=2)
+
+    runner_delegate = AsyncMock()
+    runner_delegate.get_references.return_value = DatastoreResult(
+        chunks=[], no_duplicate_chunks=[], info_blobs=[]
+    )
+
+    return ServiceRunner(
+        user=TEST_USER,
+        service=MagicMock(
+            id=uuid4(),
+            groups=[],
+            completion_model=TEST_MODEL_CHATGPT,
+            completion_model_kwargs=None,
+        ),
+        completion_service=completion_service,
+        file_service=AsyncMock(),
+        output_parser=MagicMock(parse=output),
+        runner_delegate=runner_delegate,
+        question_repo=MagicMock(),
+        prompt="prompt",
+    )
+
+
+async def test_run_batch_reports_failures_without_failing_the_batch(
+    runner: ServiceRunner, question_writer: MagicMock
+):
+    def get_response(question, **_):
+        if question == "bad":
+            raise OpenAIException("Rate limit exceeded")
+
+        return MagicMock(completion=question, input_token_count=3, total_token_count=10)
+
+    runner.completion_service.get_response.side_effect = get_response
+
+    results = [result async for result in runner.run_batch(["good", "bad", "fine"])]
+
+    by_index = {
+        result.index: result for result in sorted(results, key=lambda r: r.index)
+    }
+    assert by_index[0].output == "good"
+    assert by_index[2].output == "fine"
+    assert by_index[1].output is None
+    assert by_index[1].error.message == "Rate limit exceeded"
+    assert by_index[1].error.intric_error_code == ErrorCodes.OPENAI_ERROR
+
+    # Only what succeeded is saved, all at once
+    question_writer.add_questions.assert_awaited_once()
+    pendings = question_writer.add_questions.await_args.args[0]
+    assert [pending.question.question for pending in pendings] in (
+        ["good", "fine"],
+        ["fine", "good"],
+    )
+    # The usage is of the whole prompt, not only the input
+    assert all(pending.input_tokens == 10 for pending in pendings)
+
+
+async def test_run_batch_hands_questions_over_in_batches(
+    runner: ServiceRunner, question_writer: MagicMock
+):
+    with patch("instorage.services.service_runner.get_settings") as settings:
+        settings.return_value.service_batch_concurrency = 8
+        settings.return_value.question_writer_batch_size = 2
+
+        results = [result async for result in runner.run_batch(["a", "b", "c"])]
+
+    assert len(results) == 3
+    assert [
+        len(call.args[0]) for call in question_writer.add_questions.await_args_list
+    ] == [2, 1]
+
+
+async def test_run_batch_bounds_the_concurrency(
+    runner: ServiceRunner, question_writer: MagicMock
+):
+    running = 0
+    max_running = 0
+
+    async def get_response(question, **_):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+        return MagicMock(completion=question, input_token_count=3, total_token_count=10)
+
+    runner.completion_service.get_response.side_effect = get_response
+
+    results = [
+        result
+        async for result in runner.run_batch(
+            [str(i) for i in range(10)], max_concurrency=3
+        )
+    ]
+
+    assert len(results) == 10
+    assert max_running == 3
+
+
+async def test_run_batch_searches_one_at_a_time(
+    runner: ServiceRunner, question_writer: MagicMock
+):
+    searching = 0
+    max_searching = 0
+
+    async def get_references(*args, **kwargs):
+        nonlocal searching, max_searching
+        searching += 1
+        max_searching = max(max_searching, searching)
+        await asyncio.sleep(0.01)
+        searching -= 1
+
+        return DatastoreResult(chunks=[], no_duplicate_chunks=[], info_blobs=[])
+
+    runner.runner_delegate.get_references.side_effect = get_references
+
+    results = [result async for result in runner.run_batch(["a", "b", "c", "d"])]
+
+    assert len(results) == 4
+    assert max_searching == 1
+
+
+async def test_provider_batch_reports_failures_in_the_order_of_the_inputs(
+    runner: ServiceRunner, question_writer: MagicMock
+):
+    async def get_batch_request(custom_id, question, **_):
+        if question == "too long":
+            raise QueryException("Query too long")
+
+        return BatchRequest(custom_id=custom_id, query=[]), 3, 10
+
+    runner.completion_service.get_batch_request.side_effect = get_batch_request
+
+    batch = await runner.prepare_provider_batch(["good", "too long", "failing"])
+    assert [request.custom_id for request in batch.requests] == ["0", "2"]
+
+    results = await runner.finish_provider_batch(
+        batch,
+        {
+            "0": BatchResult(custom_id="0", completion="good"),
+            "2": BatchResult(custom_id="2", error="Request failed"),
+        },
+    )
+
+    assert [result.index for result in results] == [0, 1, 2]
+    assert results[0].output == "good"
+    assert results[1].error.message == "Query too long"
+    assert results[2].error.message == "Request failed"
+
+    pendings = question_writer.add_questions.await_args.args[0]
+    assert [pending.question.question for pending in pendings] == ["good"]
+    assert pendings[0].question.num_tokens_question == 3
+    assert pendings[0].input_tokens == 10
+
+
+async def test_provider_batch_usage_is_what_the_provider_completed(
+    runner: ServiceRunner, question_writer: MagicMock
+):
+    runner.completion_service.get_batch_request.side_effect = (
+        lambda custom_id, question, **_: (
+            BatchRequest(custom_id=custom_id, query=[]),
+            3,
+            10,
+        )
+    )
+
+    batch = await runner.prepare_provider_batch(["billed", "counted", "failing"])
+    await runner.finish_provider_batch(
+        batch,
+        {
+            "0": BatchResult(custom_id="0", completion="billed", input_tokens=12),
+            "1": BatchResult(custom_id="1", completion="counted"),
+            "2": BatchResult(custom_id="2", error="Request failed"),
+        },
+    )
+
+    pendings = question_writer.add_questions.await_args.args[0]
+    assert [pending.input_tokens for pending in pendings] == [12, 10]
+    question_writer.add_used_tokens.assert_awaited_once_with(
+        TEST_USER.id, 22, session=runner.question_repo.session
+    )
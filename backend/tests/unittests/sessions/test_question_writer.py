@@ -0,0 +1,240 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, call, patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import Session
+
+from instorage.questions.question import QuestionAdd
+from instorage.questions.question_writer import (
+    PendingQuestion,
+    PendingWrites,
+    QuestionWriter,
+)
+from instorage.usage.usage import UsageDimension
+from tests.fixtures import TEST_USER
+
+
+def pending_question(question: str = "question"):
+    return PendingQuestion(
+        question=QuestionAdd(
+            question=question,
+            answer="answer",
+            num_tokens_question=3,
+            num_tokens_answer=2,
+            tenant_id=TEST_USER.tenant_id,
+            session_id=uuid4(),
+        ),
+        user_id=TEST_USER.id,
+    )
+
+
+def db_session():
+    return MagicMock(sync_session=Session())
+
+
+def commit(session):
+    session.sync_session.begin()
+    session.sync_session.commit()
+
+
+@pytest.fixture
+def writer():
+    writer = QuestionWriter(
+        flush_interval=60, max_batch_size=2, max_attempts=2, retry_delay=0
+    )
+    writer._write = AsyncMock()
+    # Started, without a loop that would flush on its own
+    writer._task = MagicMock()
+
+    return writer
+
+
+async def test_writes_inline_when_not_started():
+    writer = QuestionWriter(flush_interval=60, max_batch_size=2)
+    pending = pending_question()
+    session = db_session()
+
+    with (
+        patch("instorage.questions.question_writer.QuestionRepository") as repo,
+        patch("instorage.questions.question_writer.UsersRepository") as user_repo,
+        patch("instorage.questions.question_writer.UsageRepository") as usage_repo,
+    ):
+        repo.return_value.insert_many = AsyncMock()
+        user_repo.return_value.add_used_tokens = AsyncMock()
+        usage_repo.return_value.add = AsyncMock()
+
+        await writer.add_question(pending, session=session)
+        await writer.add_used_tokens(TEST_USER.id, 10, session=session)
+
+    repo.return_value.insert_many.assert_awaited_once_with(
+        [pending.question], info_blob_chunks=[[]], files=[[]]
+    )
+    user_repo.return_value.add_used_tokens.assert_awaited_once_with(TEST_USER.id, 10)
+    assert usage_repo.return_value.add.await_args.args[0] == (
+        PendingWrites.of_questions([pending]).usage
+    )
+    assert writer.num_pending == 0
+
+
+async def test_queues_on_commit_only(writer: QuestionWriter):
+    session = db_session()
+
+    await writer.add_question(pending_question(), session=session)
+    assert writer.num_pending == 0
+
+    commit(session)
+    assert writer.num_pending == 1
+
+    # Queued once, not on every commit of the session
+    commit(session)
+    assert writer.num_pending == 1
+
+
+async def test_questions_added_together_are_queued_on_commit(writer: QuestionWriter):
+    session = db_session()
+    questions = [pending_question(str(i)) for i in range(3)]
+
+    await writer.add_questions(questions, session=session)
+    questions.clear()
+    assert writer.num_pending == 0
+
+    commit(session)
+    assert writer.num_pending == 3
+
+
+async def test_nothing_is_queued_on_rollback(writer: QuestionWriter):
+    session = db_session()
+
+    await writer.add_question(pending_question(), session=session)
+    session.sync_session.begin()
+    session.sync_session.rollback()
+
+    assert writer.num_pending == 0
+
+
+async def test_flush_writes_in_batches_and_sums_used_tokens(writer: QuestionWriter):
+    session = db_session()
+    questions = [pending_question(str(i)) for i in range(3)]
+    user_id = uuid4()
+
+    for pending in questions:
+        await writer.add_question(pending, session=session)
+    await writer.add_used_tokens(user_id, 10, session=session)
+    await writer.add_used_tokens(user_id, 5, session=session)
+    commit(session)
+
+    await writer.flush()
+
+    assert writer._write.await_args_list == [
+        call(PendingWrites.of_questions(questions[:2], used_tokens={user_id: 15})),
+        call(PendingWrites.of_questions(questions[2:])),
+    ]
+    assert writer.num_pending == 0
+
+
+def test_pending_writes_roll_up_the_usage_of_their_questions():
+    questions = [pending_question(str(i)) for i in range(3)]
+
+    usage = PendingWrites.of_questions(questions).usage
+
+    by_dimension = {key.dimension: counts for key, counts in usage.items()}
+    assert set(by_dimension) == {UsageDimension.TENANT, UsageDimension.USER}
+    assert by_dimension[UsageDimension.USER].questions == 3
+    assert by_dimension[UsageDimension.USER].input_tokens == 9
+    assert by_dimension[UsageDimension.USER].output_tokens == 6
+
+
+def test_usage_counts_the_tokens_billed_for_the_whole_prompt():
+    pending = pending_question()
+    pending.input_tokens = 40
+
+    usage = PendingWrites.of_questions([pending]).usage
+
+    assert {counts.input_tokens for counts in usage.values()} == {40}
+
+
+async def test_failed_batch_is_retried_one_by_one(writer: QuestionWriter):
+    session = db_session()
+    good, bad = pending_question("good"), pending_question("bad")
+
+    async def write(writes: PendingWrites):
+        if bad in writes.questions:
+            raise Exception("write failed")
+
+    writer._write.side_effect = write
+
+    await writer.add_question(good, session=session)
+    await writer.add_question(bad, session=session)
+    commit(session)
+
+    await writer.flush()
+
+    assert writer._write.await_args_list == [
+        call(PendingWrites.of_questions([good, bad])),
+        call(PendingWrites.of_questions([good])),
+        call(PendingWrites.of_questions([bad])),
+        call(PendingWrites.of_questions([bad])),
+    ]
+    assert writer.num_pending == 0
+
+
+async def test_stop_flushes_pending_writes():
+    writer = QuestionWriter(flush_interval=60, max_batch_size=2)
+    writer._write = AsyncMock()
+    session = db_session()
+
+    writer.start()
+    await writer.add_used_tokens(TEST_USER.id, 10, session=session)
+    commit(session)
+    await writer.stop()
+
+    writer._write.assert_awaited_once_with(
+        PendingWrites(used_tokens={TEST_USER.id: 10})
+    )
+    assert not writer.is_started
+
+
+async def test_stop_finishes_the_flush_in_progress():
+    writer = QuestionWriter(flush_interval=60, max_batch_size=2)
+    written = []
+    writing = asyncio.Event()
+
+    async def slow_write(writes: PendingWrites):
+        writing.set()
+        await asyncio.sleep(0.05)
+        written.extend(writes.questions)
+
+    writer._write = AsyncMock(side_effect=slow_write)
+    session = db_session()
+    pending = pending_question()
+
+    writer.start()
+    await writer.add_question(pending, session=session)
+    commit(session)
+    writer._wakeup.set()
+    await writing.wait()
+    await writer.stop()
+
+    assert written == [pending]
+    assert writer.num_pending == 0
+
+
+async def test_cancelled_write_is_put_back(writer: QuestionWriter):
+    session = db_session()
+    pending = pending_question()
+
+    async def cancelled_write(writes: PendingWrites):
+        raise asyncio.CancelledError()
+
+    writer._write.side_effect = cancelled_write
+
+    await writer.add_question(pending, session=session)
+    await writer.add_used_tokens(TEST_USER.id, 10, session=session)
+    commit(session)
+
+    with pytest.raises(asyncio.CancelledError):
+        await writer.flush()
+
+    assert writer._questions == [pending]
+    assert writer._used_tokens == {TEST_USER.id: 10}
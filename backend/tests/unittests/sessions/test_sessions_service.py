@@ -1,4 +1,4 @@
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 from uuid import uuid4
 
 import pytest
@@ -71,6 +71,23 @@ async def test_succeeds_with_assistant_id(service: SessionService):
     assert session_in_db == session
 
 
+async def test_get_session_without_questions(service: SessionService):
+    session = SessionInDB(
+        user_id=TEST_USER.id,
+        name="test_session",
+        assistant=TEST_ASSISTANT,
+        id=TEST_UUID,
+    )
+    service.session_repo.get_without_questions.return_value = session
+
+    session_in_db = await service.get_session_by_uuid(
+        TEST_UUID, assistant_id=TEST_ASSISTANT.id, with_questions=False
+    )
+
+    assert session_in_db == session
+    service.session_repo.get.assert_not_called()
+
+
 async def test_update_error_when_session_does_not_exist(service: SessionService):
     service.session_repo.update.return_value = None
     session_upsert = SessionUpdate(name="new_test_name", id=TEST_UUID)
@@ -107,3 +124,34 @@ async def test_delete_error_when_user_not_owner_of_session(service: SessionServi
 
     with pytest.raises(UnauthorizedException, match="belongs to other user"):
         await service.delete(1)
+
+
+async def test_questions_are_written_before_the_session_is_read_again(
+    service: SessionService,
+):
+    session = SessionInDB(
+        user_id=TEST_USER.id,
+        name="test_session",
+        assistant=TEST_ASSISTANT,
+        id=TEST_UUID,
+    )
+
+    with patch("instorage.sessions.session_service.question_writer") as writer:
+        writer.write_question = AsyncMock()
+        await service.add_question_to_session(
+            question="question",
+            answer="answer",
+            num_tokens_question=3,
+            num_tokens_answer=2,
+            session=session,
+            input_tokens=10,
+        )
+
+    # In the request's own transaction, not queued
+    pending = writer.write_question.await_args.args[0]
+    assert writer.write_question.await_args.kwargs == {
+        "session": service.question_repo.session
+    }
+    assert pending.question.session_id == session.id
+    assert pending.input_tokens == 10
+    writer.add_question.assert_not_called()
@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, MagicMock
 from uuid import uuid4
 
 import pytest
+from sqlalchemy.orm import Session
 
 from instorage.main.exceptions import (
     BadRequestException,
@@ -11,6 +12,7 @@ from instorage.main.exceptions import (
 )
 from instorage.spaces.api.space_models import SpaceRole
 from instorage.spaces.space_service import SpaceService
+from instorage.spaces.space_snapshot_cache import space_snapshot_cache
 from tests.fixtures import TEST_USER
 
 
@@ -185,3 +187,55 @@ async def test_get_spaces_and_personal_space_returns_personal_space_first(
     spaces = await service.get_spaces(include_personal=True)
 
     assert spaces == [personal_space] + other_spaces
+
+
+async def test_space_models_snapshot_is_cached_until_the_space_changes(
+    service: SpaceService,
+):
+    space_snapshot_cache.clear()
+    service.repo.session = MagicMock(sync_session=Session())
+    model = MagicMock(id=uuid4())
+    space = MagicMock(completion_models=[model], embedding_models=[])
+    space.is_personal.return_value = False
+    service.repo.get.return_value = space
+    space_id = uuid4()
+
+    snapshot = await service.get_space_models_snapshot(space_id)
+    await service.get_space_models_snapshot(space_id)
+
+    assert snapshot.is_completion_model_in_space(model.id)
+    assert not snapshot.is_completion_model_in_space(uuid4())
+    service.repo.get.assert_awaited_once()
+
+    await service.update_space(space_id, name="New name")
+    await service.get_space_models_snapshot(space_id)
+
+    # Not before the change is committed
+    assert service.repo.get.await_count == 2
+
+    service.repo.session.sync_session.begin()
+    service.repo.session.sync_session.commit()
+    await service.get_space_models_snapshot(space_id)
+
+    assert service.repo.get.await_count == 3
+
+
+async def test_space_models_snapshot_read_during_a_change_is_not_cached(
+    service: SpaceService,
+):
+    space_snapshot_cache.clear()
+    space = MagicMock(completion_models=[], embedding_models=[])
+    space.is_personal.return_value = False
+    space_id = uuid4()
+
+    async def get(id):
+        # The space changes while it is read
+        space_snapshot_cache.invalidate()
+        return space
+
+    service.repo.get.side_effect = get
+
+    await service.get_space_models_snapshot(space_id)
+    await service.get_space_models_snapshot(space_id)
+
+    assert service.repo.get.await_count == 2
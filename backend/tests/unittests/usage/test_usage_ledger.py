@@ -0,0 +1,52 @@
+from datetime import date
+from uuid import uuid4
+
+from instorage.usage.usage import UsageCounts, UsageDimension, UsageKey
+from instorage.usage.usage_ledger import UsageLedger
+
+DAY = date(2024, 9, 11)
+
+
+def test_record_counts_towards_every_dimension_given():
+    ledger = UsageLedger()
+    tenant_id, user_id, model_id = uuid4(), uuid4(), uuid4()
+
+    ledger.record(
+        tenant_id=tenant_id,
+        user_id=user_id,
+        completion_model_id=model_id,
+        input_tokens=10,
+        output_tokens=5,
+        day=DAY,
+    )
+
+    counts = UsageCounts(questions=1, input_tokens=10, output_tokens=5)
+    assert ledger.drain() == {
+        UsageKey(DAY, tenant_id, UsageDimension.TENANT, tenant_id): counts,
+        UsageKey(DAY, tenant_id, UsageDimension.USER, user_id): counts,
+        UsageKey(DAY, tenant_id, UsageDimension.COMPLETION_MODEL, model_id): counts,
+    }
+
+
+def test_record_sums_up_per_key():
+    ledger = UsageLedger()
+    tenant_id = uuid4()
+
+    for _ in range(3):
+        ledger.record(tenant_id=tenant_id, input_tokens=10, output_tokens=5, day=DAY)
+
+    assert ledger.drain() == {
+        UsageKey(DAY, tenant_id, UsageDimension.TENANT, tenant_id): UsageCounts(
+            questions=3, input_tokens=30, output_tokens=15
+        )
+    }
+
+
+def test_drain_empties_the_ledger():
+    ledger = UsageLedger()
+    ledger.record(tenant_id=uuid4(), input_tokens=1, output_tokens=1)
+
+    ledger.drain()
+
+    assert len(ledger) == 0
+    assert ledger.drain() == {}
@@ -0,0 +1,77 @@
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from instorage.usage.usage import UsageCounts, UsageDimension, UsageKey
+from instorage.usage.usage_repo import UsageRepository
+
+DAY = date(2024, 9, 11)
+
+
+def compiled(stmt):
+    return stmt.compile(dialect=postgresql.dialect())
+
+
+async def test_add_nothing_makes_no_query():
+    session = AsyncMock()
+
+    await UsageRepository(session).add({})
+
+    session.execute.assert_not_awaited()
+
+
+async def test_add_upserts_the_counts_in_key_order():
+    session = AsyncMock()
+    tenant_id, user_id = uuid4(), uuid4()
+    tenant_key = UsageKey(DAY, tenant_id, UsageDimension.TENANT, tenant_id)
+    user_key = UsageKey(DAY, tenant_id, UsageDimension.USER, user_id)
+
+    await UsageRepository(session).add(
+        {
+            user_key: UsageCounts(questions=1, input_tokens=10, output_tokens=5),
+            tenant_key: UsageCounts(questions=2, input_tokens=20, output_tokens=8),
+        }
+    )
+
+    stmt = compiled(session.execute.await_args.args[0])
+    sql = str(stmt)
+    assert "ON CONFLICT (day, tenant_id, dimension, dimension_id) DO UPDATE" in sql
+    assert "input_tokens = (usage_rollups.input_tokens + excluded.input_tokens)" in sql
+
+    # Sorted by key, the tenant dimension before the user dimension
+    assert stmt.params["dimension_m0"] == "tenant"
+    assert stmt.params["input_tokens_m0"] == 20
+    assert stmt.params["dimension_m1"] == "user"
+    assert stmt.params["input_tokens_m1"] == 10
+
+
+async def test_get_by_tenant_sums_the_days_of_the_dimension():
+    session = AsyncMock()
+    tenant_id, user_id = uuid4(), uuid4()
+    session.execute.return_value = [
+        MagicMock(
+            _asdict=lambda: dict(
+                dimension_id=user_id, questions=3, input_tokens=30, output_tokens=9
+            )
+        )
+    ]
+
+    usage = await UsageRepository(session).get_by_tenant(
+        tenant_id,
+        dimension=UsageDimension.USER,
+        start_date=DAY,
+        end_date=date(2024, 9, 30),
+    )
+
+    assert [(stats.dimension, stats.dimension_id) for stats in usage] == [
+        (UsageDimension.USER, user_id)
+    ]
+    assert usage[0].input_tokens == 30
+
+    stmt = compiled(session.execute.await_args.args[0])
+    assert "GROUP BY usage_rollups.dimension_id" in str(stmt)
+    assert stmt.params["tenant_id_1"] == tenant_id
+    assert stmt.params["dimension_1"] == "user"
+    assert (stmt.params["day_1"], stmt.params["day_2"]) == (DAY, date(2024, 9, 30))
@@ -0,0 +1,69 @@
+import time
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import jwt
+import pytest
+from sqlalchemy.orm import Session
+
+from instorage.users.principal_cache import Invalidation, PrincipalCache
+from tests.fixtures import TEST_USER, TEST_USER_2
+
+
+@pytest.fixture
+def cache():
+    return PrincipalCache(maxsize=10, ttl=60)
+
+
+def test_user_loaded_before_an_invalidation_is_not_cached(cache: PrincipalCache):
+    key = cache.get_key("api_key", "key")
+
+    generation = cache.generation
+    cache.invalidate(Invalidation(user_id=TEST_USER.id))
+    cache.set(key, TEST_USER, generation=generation)
+
+    assert cache.get(key) is None
+
+
+@pytest.mark.parametrize(
+    ["invalidation", "dropped"],
+    [
+        (Invalidation(user_id=TEST_USER.id), {"user"}),
+        (Invalidation(tenant_id=TEST_USER_2.tenant_id), {"user_2"}),
+        (Invalidation(), {"user", "user_2"}),
+        (Invalidation(user_id=uuid4()), set()),
+    ],
+)
+def test_invalidate(cache: PrincipalCache, invalidation: Invalidation, dropped: set):
+    keys = {
+        "user": cache.get_key("token", "a"),
+        "user_2": cache.get_key("token", "b"),
+    }
+    cache.set(keys["user"], TEST_USER, generation=cache.generation)
+    cache.set(keys["user_2"], TEST_USER_2, generation=cache.generation)
+
+    cache.invalidate(invalidation)
+
+    assert {name for name, key in keys.items() if cache.get(key) is None} == dropped
+
+
+def test_invalidate_on_commit_waits_for_the_commit(cache: PrincipalCache):
+    key = cache.get_key("token", "a")
+    cache.set(key, TEST_USER, generation=cache.generation)
+    session = MagicMock(sync_session=Session())
+
+    session.sync_session.begin()
+    cache.invalidate_on_commit(session, user_id=TEST_USER.id)
+    assert cache.get(key) is not None
+
+    session.sync_session.commit()
+    assert cache.get(key) is None
+
+
+def test_expired_token_is_not_cached(cache: PrincipalCache):
+    token = jwt.encode({"exp": int(time.time()) - 10}, "s" * 32)
+    key = cache.get_key("token", token)
+
+    cache.set(key, TEST_USER, generation=cache.generation, token=token)
+
+    assert cache.get(key) is None
@@ -6,11 +6,19 @@ import pytest
 from instorage.authentication.auth_models import AccessToken, ApiKeyCreated
 from instorage.main.exceptions import AuthenticationException, UniqueUserException
 from instorage.settings.settings import SettingsUpsert
-from instorage.users.user import UserAdd, UserAddSuperAdmin, UserInDB, UserUpdate
+from instorage.users.principal_cache import Invalidation, principal_cache
+from instorage.users.user import UserAdd, UserAddSuperAdmin, UserInDB
 from instorage.users.user_service import UserService
 from tests.fixtures import TEST_TENANT, TEST_USER
 
 
+@pytest.fixture(autouse=True)
+def empty_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
 @pytest.fixture(name="service")
 def service_with_mocks():
     return UserService(
@@ -144,20 +152,63 @@ async def test_register_user_creates_a_user_and_settings(service: UserService):
 
 
 async def test_update_used_tokens(service: UserService):
-    user = UserInDB(**TEST_USER.model_dump(exclude_none=True))
-    user.used_tokens = 13
-    service.repo.get_user_by_id.return_value = user
-
-    tokens_to_add = 47
-    expected_upsert = UserUpdate(
-        id=user.id, used_tokens=user.used_tokens + tokens_to_add
-    )
-
     await service.update_used_tokens(TEST_USER.id, 47)
 
-    service.repo.update.assert_awaited_with(expected_upsert)
+    service.repo.add_used_tokens.assert_awaited_with(TEST_USER.id, 47)
+    service.repo.get_user_by_id.assert_not_awaited()
 
 
 async def test_authenticate_fails_if_no_token_and_no_api_key(service: UserService):
     with pytest.raises(AuthenticationException, match="No authenticated user."):
         await service.authenticate(None, None)
+
+
+async def test_authenticate_caches_the_user_per_api_key(service: UserService):
+    service.auth_service.get_api_key.return_value = MagicMock(user_id=TEST_USER.id)
+    service.repo.get_user_by_id.return_value = TEST_USER
+
+    first = await service.authenticate(token=None, api_key="key")
+    second = await service.authenticate(token=None, api_key="key")
+
+    assert first == second == TEST_USER
+    service.repo.get_user_by_id.assert_awaited_once()
+
+    # A copy is handed out, so what the caller does to it is not cached
+    second.quota_used = 1000
+    assert (await service.authenticate(token=None, api_key="key")).quota_used == 0
+
+
+async def test_authenticate_with_assistant_api_key_is_cached_per_assistant(
+    service: UserService,
+):
+    service.auth_service.get_api_key.return_value = MagicMock(user_id=TEST_USER.id)
+    service.repo.get_user_by_id.return_value = TEST_USER
+
+    for assistant_id in [uuid4(), uuid4()]:
+        await service.authenticate_with_assistant_api_key(
+            api_key="key", token=None, assistant_id=assistant_id
+        )
+
+    assert service.repo.get_user_by_id.await_count == 2
+
+
+async def test_authenticate_reloads_the_user_after_invalidation(
+    service: UserService,
+):
+    service.auth_service.get_api_key.return_value = MagicMock(user_id=TEST_USER.id)
+    service.repo.get_user_by_id.return_value = TEST_USER
+
+    await service.authenticate(token=None, api_key="key")
+    principal_cache.invalidate(Invalidation(user_id=TEST_USER.id))
+    await service.authenticate(token=None, api_key="key")
+
+    assert service.repo.get_user_by_id.await_count == 2
+
+
+async def test_failed_authentication_is_not_cached(service: UserService):
+    service.auth_service.get_api_key.return_value = None
+
+    with pytest.raises(AuthenticationException):
+        await service.authenticate(token=None, api_key="key")
+
+    assert principal_cache.stats().size == 0